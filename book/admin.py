@@ -1,6 +1,35 @@
 from django.contrib import admin
-from .models import Publisher, Book, Author
-admin.site.register(Publisher)
-admin.site.register(Book)
-admin.site.register(Author)
+from django.db import NotSupportedError
+from .models import Publisher, Book, Author, Task
+from .search import filter_by_prefix
 
+
+class PrefixSearchAdmin(admin.ModelAdmin):
+    # Searches, including autocomplete_fields lookups from other admins, go
+    # through the FTS5 prefix index instead of a LIKE scan of the table.
+    search_fields = ['name']
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        try:
+            return filter_by_prefix(queryset, search_term), False
+        except NotSupportedError:
+            return super().get_search_results(request, queryset, search_term)
+
+
+class BookAdmin(admin.ModelAdmin):
+    autocomplete_fields = ['authors', 'publisher']
+
+
+admin.site.register(Publisher, PrefixSearchAdmin)
+admin.site.register(Book, BookAdmin)
+admin.site.register(Author, PrefixSearchAdmin)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'state', 'priority', 'attempts', 'run_after', 'finished_at']
+    list_filter = ['state', 'name']
+    readonly_fields = ['name', 'kwargs', 'key', 'attempts', 'max_attempts', 'created_at', 'started_at',
+                       'finished_at', 'worker', 'error']
@@ -0,0 +1,187 @@
+"""
+Read-only JSON API for publishers, authors and books, under ``api/v1/``.
+
+Rows go straight from model fields into a JsonResponse, with no templates
+involved. ``?fields=a,b`` limits both the output and the SELECTed columns;
+``?include=publisher,authors`` embeds a book's related rows (shaped by
+``?fields[publishers]=`` and ``?fields[authors]=``), loaded with one query per
+relation for the whole page rather than one per book. ``?ids=1,2,3`` fetches up
+to ``MAX_IDS`` rows in request order. Lists are walked by primary key with
+KeysetPaginator cursors, so every page costs the same however deep it is.
+
+Like the catalog exports, every resource, and every resource embedded with
+``?include=``, needs its ``book.view_<model>`` permission.
+"""
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+
+from book.models import Author, Book, Publisher
+from book.pagination import KeysetPaginator
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_IDS = 100
+
+# resource: (model, fields it can return)
+RESOURCES = {
+    'publishers': (Publisher, ('id', 'name', 'address', 'city', 'state_province', 'country', 'website',
+                               'book_count', 'latest_publication_date', 'updated_at')),
+    'authors': (Author, ('id', 'salutation', 'name', 'email', 'book_count', 'latest_publication_date',
+                         'updated_at')),
+    'books': (Book, ('id', 'title', 'publication_date', 'publisher', 'authors', 'updated_at')),
+}
+
+# book field: resource it embeds with ?include=
+INCLUDES = {'publisher': 'publishers', 'authors': 'authors'}
+
+
+class ApiError(Exception):
+    pass
+
+
+def _fields(resource, value):
+    allowed = RESOURCES[resource][1]
+    if not value:
+        return list(allowed)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise ApiError('Unknown %s fields: %s.' % (resource, ', '.join(unknown)))
+    # The id is always returned; it is what clients and cursors key on.
+    return ['id'] + [name for name in fields if name != 'id']
+
+
+def _ids(value):
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in value.split(',') if pk.strip()))
+    except ValueError:
+        raise ApiError('ids must be a comma-separated list of integers.')
+    if not ids or len(ids) > MAX_IDS:
+        raise ApiError('Ask for between 1 and %d ids.' % MAX_IDS)
+    return ids
+
+
+class Query:
+    """The fields, includes and page size of one API request."""
+
+    def __init__(self, resource, params):
+        self.resource = resource
+        self.model = RESOURCES[resource][0]
+        self.fields = _fields(resource, params.get('fields'))
+        self.include = [name.strip() for name in params.get('include', '').split(',') if name.strip()]
+        unknown = sorted(set(self.include) - (set(INCLUDES) if resource == 'books' else set()))
+        if unknown:
+            raise ApiError('Cannot include %s for %s.' % (', '.join(unknown), resource))
+        self.include = [name for name in self.include if name in self.fields]
+        self.include_fields = {INCLUDES[name]: _fields(INCLUDES[name], params.get('fields[%s]' % INCLUDES[name]))
+                               for name in self.include}
+        try:
+            self.limit = min(max(int(params.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ApiError('limit must be an integer.')
+
+    def queryset(self):
+        columns = [name for name in self.fields if name != 'authors']
+        return self.model.objects.only(*columns).order_by('pk')
+
+    def serialize(self, objects):
+        rows = [_row(obj, self.fields) for obj in objects]
+        if self.model is Book and rows:
+            self._add_relations(objects, rows)
+        return rows
+
+    def _add_relations(self, books, rows):
+        if 'publisher' in self.include:
+            fields = self.include_fields['publishers']
+            publishers = Publisher.objects.only(*fields).in_bulk({book.publisher_id for book in books})
+            for row in rows:
+                publisher = publishers.get(row['publisher'])
+                row['publisher'] = _row(publisher, fields) if publisher else None
+        if 'authors' in self.fields:
+            # One query for the authors of the whole page, as prefetch_related would.
+            links = Book.authors.through.objects.filter(book_id__in=[row['id'] for row in rows])
+            fields = self.include_fields.get('authors')
+            if fields:
+                links = links.select_related('author').only(
+                    'book_id', 'author_id', *['author__%s' % name for name in fields])
+            else:
+                links = links.only('book_id', 'author_id')
+            authors = {}
+            for link in links.order_by('author__name', 'author_id'):
+                authors.setdefault(link.book_id, []).append(_row(link.author, fields) if fields else link.author_id)
+            for row in rows:
+                row['authors'] = authors.get(row['id'], [])
+
+
+def _row(obj, fields):
+    row = {}
+    for name in fields:
+        if name == 'publisher':
+            row[name] = obj.publisher_id
+        elif name != 'authors':
+            row[name] = getattr(obj, name)
+    return row
+
+
+def _page_url(request, cursor):
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return '%s?%s' % (request.path, params.urlencode())
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _forbidden(user, resources):
+    for resource in resources:
+        if not user.has_perm('book.view_%s' % resource[:-1]):
+            return _error('You may not view %s.' % resource, 403)
+    return None
+
+
+@require_safe
+def resource_list(request, resource):
+    denied = _forbidden(request.user, [resource])
+    if denied:
+        return denied
+    try:
+        query = Query(resource, request.GET)
+        denied = _forbidden(request.user, query.include_fields)
+        if denied:
+            return denied
+        if 'ids' in request.GET:
+            ids = _ids(request.GET['ids'])
+            found = query.queryset().in_bulk(ids)
+            objects = [found[pk] for pk in ids if pk in found]
+            return JsonResponse({'data': query.serialize(objects), 'missing': [pk for pk in ids if pk not in found]})
+        paginator = KeysetPaginator(query.queryset(), query.limit)
+        try:
+            page = paginator.page(request.GET.get('cursor', ''))
+        except Http404:
+            raise ApiError('Invalid cursor.')
+    except ApiError as e:
+        return _error(str(e))
+    return JsonResponse({
+        'data': query.serialize(page.object_list),
+        'next': _page_url(request, page.next_cursor) if page.has_next() else None,
+        'previous': _page_url(request, page.previous_cursor) if page.has_previous() else None,
+    })
+
+
+@require_safe
+def resource_detail(request, resource, pk):
+    denied = _forbidden(request.user, [resource])
+    if denied:
+        return denied
+    try:
+        query = Query(resource, request.GET)
+    except ApiError as e:
+        return _error(str(e))
+    denied = _forbidden(request.user, query.include_fields)
+    if denied:
+        return denied
+    obj = query.queryset().filter(pk=pk).first()
+    if obj is None:
+        return _error('No %s with id %s.' % (query.model._meta.verbose_name, pk), 404)
+    return JsonResponse({'data': query.serialize([obj])[0]})
@@ -1,5 +1,49 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
 
 
 class BookConfig(AppConfig):
     name = 'book'
+
+    def ready(self):
+        from book import cache, conditional, counters, facets, queue, related, sqlite
+        from book.models import Author, Book, Publisher
+        from book.perf import flush_perf_stats
+        from book.search import create_search_index
+        from book.thumbnails import headshot_pre_save, headshot_saved
+        from book.tracking import flush_access_buffer
+        queue.autodiscover()
+        # Runs once the response has been sent, so the page itself never waits on the write.
+        request_finished.connect(flush_access_buffer, dispatch_uid='book.flush_access_buffer')
+        request_finished.connect(flush_perf_stats, dispatch_uid='book.flush_perf_stats')
+        connection_created.connect(sqlite.configure_connection, dispatch_uid='book.sqlite.configure_connection')
+        post_migrate.connect(create_search_index, sender=self, dispatch_uid='book.create_search_index')
+        pre_save.connect(headshot_pre_save, sender=Author, dispatch_uid='book.headshot_pre_save')
+        post_save.connect(headshot_saved, sender=Author, dispatch_uid='book.headshot_saved')
+        for model in (Publisher, Author, Book):
+            post_save.connect(cache.object_changed, sender=model, dispatch_uid='book.cache.saved')
+            post_delete.connect(cache.object_changed, sender=model, dispatch_uid='book.cache.deleted')
+        m2m_changed.connect(cache.book_authors_changed, sender=Book.authors.through, dispatch_uid='book.cache.authors')
+        m2m_changed.connect(conditional.book_authors_changed, sender=Book.authors.through,
+                            dispatch_uid='book.conditional.authors')
+        pre_save.connect(counters.book_pre_save, sender=Book, dispatch_uid='book.counters.pre_save')
+        post_save.connect(counters.book_saved, sender=Book, dispatch_uid='book.counters.saved')
+        pre_delete.connect(counters.book_pre_delete, sender=Book, dispatch_uid='book.counters.pre_delete')
+        post_delete.connect(counters.book_deleted, sender=Book, dispatch_uid='book.counters.deleted')
+        m2m_changed.connect(counters.book_authors_changed, sender=Book.authors.through,
+                            dispatch_uid='book.counters.authors')
+        pre_save.connect(facets.book_pre_save, sender=Book, dispatch_uid='book.facets.pre_save')
+        post_save.connect(facets.book_saved, sender=Book, dispatch_uid='book.facets.saved')
+        pre_delete.connect(facets.book_pre_delete, sender=Book, dispatch_uid='book.facets.pre_delete')
+        post_delete.connect(facets.book_deleted, sender=Book, dispatch_uid='book.facets.deleted')
+        pre_save.connect(facets.publisher_pre_save, sender=Publisher, dispatch_uid='book.facets.publisher_pre_save')
+        post_save.connect(facets.publisher_saved, sender=Publisher, dispatch_uid='book.facets.publisher_saved')
+        pre_delete.connect(related.book_pre_delete, sender=Book, dispatch_uid='book.related.pre_delete')
+        post_delete.connect(related.book_deleted, sender=Book, dispatch_uid='book.related.deleted')
+        post_save.connect(related.book_saved, sender=Book, dispatch_uid='book.related.saved')
+        m2m_changed.connect(related.book_authors_changed, sender=Book.authors.through,
+                            dispatch_uid='book.related.authors')
+        pre_delete.connect(related.author_pre_delete, sender=Author, dispatch_uid='book.related.author_pre_delete')
+        post_delete.connect(related.author_deleted, sender=Author, dispatch_uid='book.related.author_deleted')
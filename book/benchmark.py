@@ -0,0 +1,455 @@
+"""
+Synthetic catalogs and client-side benchmarks for every view in ``book.urls``.
+
+``generate_rows`` produces rows in the ``book.importer`` format, so catalogs of
+any size are loaded by the bulk importer rather than one ``save()`` per object.
+Publishers and authors are drawn from Zipf distributions, so a few publishers
+own most of the catalog and a few prolific authors appear on many books; the
+number of authors per book follows ``AUTHOR_FAN_OUT``.
+
+``run_benchmark`` requests every scenario through the Django test client,
+varying the objects it asks for, and reports throughput, latency percentiles,
+queries and response sizes per scenario as plain JSON-serializable data.
+
+``run_render`` times the list templates alone, on rows loaded beforehand, and
+splits their cost into a fixed part and a part per row, in milliseconds and
+bytes, with and without the cached template loader.
+
+``run_concurrency`` forks gunicorn-style worker processes against the same
+SQLite file, some serving detail pages and some saving books, once per set of
+``JOURNAL_MODES`` pragmas, to show how journaling affects reads under writes.
+The page cache is switched off for those runs, so every read reaches SQLite.
+"""
+import datetime
+import math
+import multiprocessing
+import platform
+import random
+import statistics
+import subprocess
+import time
+from itertools import accumulate
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import DatabaseError, NotSupportedError, connection, connections
+from django.db.models import Max, Min
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from book import perf, sqlite
+from book.cache import get_cache
+from book.models import Author, Book, Publisher
+from book.pagination import KeysetPaginator
+
+# authors per book: relative frequency
+AUTHOR_FAN_OUT = {1: 55, 2: 25, 3: 12, 4: 5, 5: 3}
+
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+
+
+def parse_size(value):
+    return SIZES.get(value.lower()) or int(value)
+
+
+def _unique(names):
+    seen = {}
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        yield name if not count else '%s %d' % (name, count + 1)
+
+
+def _zipf_weights(n, exponent):
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def generate_rows(books, seed=0, publisher_skew=1.1, author_skew=0.9):
+    """Yield ``books`` importer rows; the same ``seed`` always yields the same catalog."""
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+
+    # Faker is slow per call, so draw small pools once and combine them.
+    first_names = [fake.first_name() for _ in range(1000)]
+    last_names = [fake.last_name() for _ in range(1000)]
+    words = sorted({fake.word() for _ in range(3000)})
+    publishers = [(name[:30], fake.city(), fake.country()) for name in _unique(
+        fake.company()[:26] for _ in range(max(10, books // 200)))]
+    authors = list(_unique('%s %s' % (rng.choice(first_names), rng.choice(last_names))
+                           for _ in range(max(20, books // 3))))
+
+    publisher_weights = _zipf_weights(len(publishers), publisher_skew)
+    author_weights = _zipf_weights(len(authors), author_skew)
+    fan_out, fan_out_weights = list(AUTHOR_FAN_OUT), list(accumulate(AUTHOR_FAN_OUT.values()))
+    first_day = datetime.date(1950, 1, 1).toordinal()
+    last_day = datetime.date(2020, 12, 31).toordinal()
+
+    for _ in range(books):
+        name, city, country = rng.choices(publishers, cum_weights=publisher_weights)[0]
+        count = rng.choices(fan_out, cum_weights=fan_out_weights)[0]
+        yield {
+            'title': ' '.join(rng.choice(words) for _ in range(rng.randint(2, 5))).title()[:100],
+            'publication_date': datetime.date.fromordinal(rng.randint(first_day, last_day)),
+            'publisher': name,
+            'publisher_city': city,
+            'publisher_country': country,
+            'authors': sorted(set(rng.choices(authors, cum_weights=author_weights, k=count))),
+        }
+
+
+class Sample:
+    """Random existing rows and search terms for scenarios to pick from."""
+
+    def __init__(self, rng, size=200):
+        self.rng = rng
+        self.pks = {model: self._pks(model, size) for model in (Publisher, Author, Book)}
+        titles = Book.objects.filter(pk__in=self.pks[Book]).values_list('title', flat=True)
+        self.words = [title.split()[0].lower() for title in titles if title.split()] or ['a']
+        self.countries = list(Publisher.objects.filter(pk__in=self.pks[Publisher]).exclude(country='')
+                              .values_list('country', flat=True).distinct()) or ['']
+        self.last_book = Book._base_manager.aggregate(last=Max('pk'))['last'] or 0
+
+    def _pks(self, model, size):
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return []
+        candidates = range(bounds['low'], bounds['high'] + 1)
+        picked = self.rng.sample(candidates, min(size * 2, len(candidates)))
+        return list(model.objects.filter(pk__in=picked).values_list('pk', flat=True)[:size])
+
+    def pk(self, model):
+        return self.rng.choice(self.pks[model]) if self.pks[model] else 0
+
+    def cursor(self, model, per_page=10):
+        """A list page cursor that starts after a random ``model`` row."""
+        obj = model.objects.filter(pk=self.pk(model)).first()
+        return KeysetPaginator(model.objects.all(), per_page).encode_cursor(obj) if obj else ''
+
+    def word(self, length=None):
+        word = self.rng.choice(self.words)
+        return word[:length] if length else word
+
+
+# (label, url name, sampler returning (url kwargs, query parameters)). Every
+# URL name in book.urls must appear at least once; see missing_url_names().
+SCENARIOS = [
+    ('home', 'home', lambda s: ({}, {})),
+    ('search', 'search', lambda s: ({}, {'q': s.word()})),
+    ('browse', 'browse', lambda s: ({}, {})),
+    ('browse-country', 'browse', lambda s: ({}, {'country': s.rng.choice(s.countries)})),
+    ('autocomplete-authors', 'autocomplete', lambda s: ({'kind': 'authors'}, {'q': s.word(3)})),
+    ('autocomplete-publishers', 'autocomplete', lambda s: ({'kind': 'publishers'}, {'q': s.word(2)})),
+    ('export-recent-books', 'export',
+     lambda s: ({'kind': 'books', 'fmt': 'jsonl'}, {'since': max(0, s.last_book - 500)})),
+    ('import-form', 'import', lambda s: ({}, {})),
+    ('perf', 'perf', lambda s: ({}, {})),
+    ('api-books', 'api-list', lambda s: ({'resource': 'books'}, {'include': 'publisher,authors'})),
+    ('api-books-sparse', 'api-list', lambda s: ({'resource': 'books'}, {'fields': 'title', 'limit': 200})),
+    ('api-authors-batch', 'api-list',
+     lambda s: ({'resource': 'authors'}, {'ids': ','.join(str(s.pk(Author)) for _ in range(20))})),
+    ('api-book-detail', 'api-detail', lambda s: ({'resource': 'books', 'pk': s.pk(Book)}, {'include': 'authors'})),
+    ('publisher-list', 'publisher_list', lambda s: ({}, {})),
+    ('publisher-list-cursor', 'publisher_list', lambda s: ({}, {'cursor': ''})),
+    ('publisher-detail', 'publisher-detail', lambda s: ({'pk': s.pk(Publisher)}, {})),
+    ('publisher-books', 'publisher-books', lambda s: ({'pk': s.pk(Publisher)}, {})),
+    ('publisher-add', 'publisher-add', lambda s: ({}, {})),
+    ('publisher-update', 'publisher-update', lambda s: ({'pk': s.pk(Publisher)}, {})),
+    ('publisher-delete', 'publisher-delete', lambda s: ({'pk': s.pk(Publisher)}, {})),
+    ('publisher-delete-status', 'publisher-delete-status', lambda s: ({'pk': s.pk(Publisher)}, {})),
+    ('book-list', 'book_list', lambda s: ({}, {})),
+    ('book-list-deep-page', 'book_list', lambda s: ({}, {'cursor': s.cursor(Book)})),
+    ('book-list-country-year', 'book_list',
+     lambda s: ({}, {'country': s.rng.choice(s.countries), 'year': s.rng.randint(1950, 2020)})),
+    ('book-detail', 'book-detail', lambda s: ({'pk': s.pk(Book)}, {})),
+    ('book-add', 'book-add', lambda s: ({}, {})),
+    ('book-update', 'book-update', lambda s: ({'pk': s.pk(Book)}, {})),
+    ('book-delete', 'book-delete', lambda s: ({'pk': s.pk(Book)}, {})),
+    ('author-list', 'author-list', lambda s: ({}, {})),
+    ('author-detail', 'author-detail', lambda s: ({'pk': s.pk(Author)}, {})),
+    ('author-add', 'author-add', lambda s: ({}, {})),
+    ('author-update', 'author-update', lambda s: ({'pk': s.pk(Author)}, {})),
+    ('author-delete', 'author-delete', lambda s: ({'pk': s.pk(Author)}, {})),
+]
+
+
+def missing_url_names():
+    from book import urls
+
+    covered = {name for _, name, _ in SCENARIOS}
+    return sorted(pattern.name for pattern in urls.urlpatterns if pattern.name not in covered)
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class _QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _request(client, url, params):
+    counter = _QueryCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        response = client.get(url, params)
+        size = len(b''.join(response.streaming_content)) if response.streaming else len(response.content)
+    return time.perf_counter() - start, counter.count, size, response.status_code
+
+
+def run_benchmark(requests=50, warmup=5, seed=0, labels=None, client=None, cold=False):
+    """
+    Request every scenario (or those in ``labels``) ``requests`` times after
+    ``warmup`` unmeasured requests. ``cold`` clears the page cache before each
+    request, so every response is rendered from the database.
+    """
+    rng = random.Random(seed)
+    client = client or Client()
+    sample = Sample(rng)
+    results = {}
+    for label, name, sampler in SCENARIOS:
+        if labels and label not in labels:
+            continue
+        timings, queries, sizes, statuses = [], 0, 0, {}
+        for index in range(warmup + requests):
+            kwargs, params = sampler(sample)
+            url = reverse('books:%s' % name, kwargs=kwargs)
+            if cold:
+                get_cache().clear()
+            seconds, count, size, status = _request(client, url, params)
+            if index < warmup:
+                continue
+            timings.append(seconds * 1000)
+            queries += count
+            sizes += size
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        timings.sort()
+        results[label] = {
+            'url': url,
+            'requests': requests,
+            'throughput_rps': round(requests / (sum(timings) / 1000), 1) if sum(timings) else 0.0,
+            'mean_ms': round(sum(timings) / requests, 3) if requests else 0.0,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p90_ms': round(percentile(timings, 90), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'max_ms': round(timings[-1], 3) if timings else 0.0,
+            'queries_mean': round(queries / requests, 2) if requests else 0.0,
+            'bytes_mean': round(sizes / requests) if requests else 0,
+            'statuses': statuses,
+        }
+    return {'meta': environment(requests, warmup, seed, cold), 'results': results}
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(requests, warmup, seed, cold):
+    return {
+        'commit': _commit(),
+        'created': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connections['default'].vendor,
+        'debug': settings.DEBUG,
+        'books': Book.objects.count(),
+        'authors': Author.objects.count(),
+        'publishers': Publisher.objects.count(),
+        'requests': requests,
+        'warmup': warmup,
+        'seed': seed,
+        'cold': cold,
+    }
+
+
+def compare(baseline, current, metrics=('p50_ms', 'p99_ms', 'queries_mean'), threshold=0.1):
+    """Yield ``(label, metric, before, after, change, regressed)`` for scenarios in both reports."""
+    for label, result in current['results'].items():
+        before = baseline['results'].get(label)
+        if before is None:
+            continue
+        for metric in metrics:
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            yield label, metric, old, new, change, change > threshold
+
+
+# label: (template, context name of its rows, queryset of the rows as the view loads them)
+RENDER_TEMPLATES = {
+    'book-list': ('book/book_list.html', 'book_list', lambda: Book.objects.for_list()),
+    'author-list': ('book/author_list.html', 'author_list', lambda: Author.objects.for_list()),
+    'publisher-list': ('book/publisher_list.html', 'publisher_list', lambda: Publisher.objects.for_list()),
+}
+
+
+def _template_settings(cached):
+    loaders = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    options = dict(settings.TEMPLATES[0]['OPTIONS'], loaders=loaders, debug=False)
+    return [dict(settings.TEMPLATES[0], APP_DIRS=False, OPTIONS=options)]
+
+
+def _render(name, context, request, repeat):
+    render_to_string(name, context, request)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        html = render_to_string(name, context, request)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(html.encode())
+
+
+def run_render(rows=(10, 50), repeat=20, labels=None):
+    """
+    Render every template in ``RENDER_TEMPLATES`` (or those in ``labels``) with
+    the smallest and largest number of ``rows`` and fit the median time and the
+    size to ``base + per_row * rows``. ``uncached_ms`` is the largest render
+    with loaders that parse the templates again on every render.
+    """
+    low, high = min(rows), max(rows)
+    if low == high:
+        raise ValueError('Give two different row counts.')
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    results = {}
+    for label, (name, variable, queryset) in RENDER_TEMPLATES.items():
+        if labels and label not in labels:
+            continue
+        objects = list(queryset()[:high])
+        if len(objects) < high:
+            raise ValueError('%s needs %d rows; the database has %d.' % (label, high, len(objects)))
+        measured = {}
+        for cached, counts in ((True, (low, high)), (False, (high,))):
+            with override_settings(TEMPLATES=_template_settings(cached)):
+                for count in counts:
+                    context = {'object_list': objects[:count], variable: objects[:count], 'is_paginated': False}
+                    measured[cached, count] = _render(name, context, request, repeat)
+        ms_per_row = (measured[True, high][0] - measured[True, low][0]) / (high - low)
+        bytes_per_row = (measured[True, high][1] - measured[True, low][1]) / (high - low)
+        results[label] = {
+            'ms_per_row': round(ms_per_row, 4),
+            'bytes_per_row': round(bytes_per_row, 1),
+            'base_ms': round(measured[True, low][0] - ms_per_row * low, 3),
+            'base_bytes': round(measured[True, low][1] - bytes_per_row * low),
+            'cached_ms': round(measured[True, high][0], 3),
+            'uncached_ms': round(measured[False, high][0], 3),
+        }
+    return {'meta': {'commit': _commit(), 'python': platform.python_version(), 'django': django.get_version(),
+                     'rows': [low, high], 'repeat': repeat},
+            'results': results}
+
+
+# mode: pragmas set on every connection of a run_concurrency() pass
+JOURNAL_MODES = {
+    'default': {'journal_mode': 'delete', 'synchronous': 'full'},
+    'tuned': sqlite.PRAGMAS,
+}
+
+READ_SCENARIOS = ('book-detail', 'author-detail', 'publisher-books')
+
+UNCACHED = 'benchmark-uncached'
+DUMMY_CACHE = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+
+def _read(client, sample, rng):
+    label, name, sampler = rng.choice([scenario for scenario in SCENARIOS if scenario[0] in READ_SCENARIOS])
+    kwargs, params = sampler(sample)
+    client.get(reverse('books:%s' % name, kwargs=kwargs), params)
+
+
+def _write(client, sample, rng):
+    # Goes through the same signals as a BookUpdate save.
+    Book.objects.get(pk=sample.pk(Book)).save()
+
+
+def _worker(role, seconds, seed, host, barrier, results):
+    rng = random.Random(seed)
+    histogram, errors = perf.Histogram(perf.BOUNDS['time_ms']), 0
+    try:
+        try:
+            client, sample = Client(HTTP_HOST=host), Sample(rng)
+        except Exception:
+            # Release the other workers instead of leaving them at the barrier.
+            barrier.abort()
+            raise
+        operation = _read if role == 'read' else _write
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(client, sample, rng)
+            except DatabaseError:
+                # "database is locked" once busy_timeout runs out.
+                errors += 1
+                continue
+            histogram.record((time.perf_counter() - start) * 1000)
+    finally:
+        connections.close_all()
+        results.put((role, histogram.as_dict(), errors))
+
+
+def run_concurrency(readers=4, writers=1, seconds=10, modes=('default', 'tuned'), seed=0, host='localhost'):
+    """
+    Run ``readers`` and ``writers`` worker processes for ``seconds`` in every
+    one of ``modes`` and report the throughput and latency of each role.
+    """
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        raise NotSupportedError('The concurrency benchmark needs a SQLite database file.')
+    context = multiprocessing.get_context('fork')
+    results = {}
+    for mode in modes:
+        # Reads go to a cache that never stores anything, so every one of them
+        # reaches the database and the shared page cache is left alone.
+        with override_settings(BOOK_SQLITE_PRAGMAS=JOURNAL_MODES[mode], BOOK_CACHE_ALIAS=UNCACHED,
+                               CACHES=dict(settings.CACHES, **{UNCACHED: DUMMY_CACHE})):
+            # journal_mode only changes while no other connection is open, and it
+            # persists in the file, so set it here before the workers connect.
+            connections.close_all()
+            connection.ensure_connection()
+            connections.close_all()
+            barrier, queue = context.Barrier(readers + writers), context.Queue()
+            roles = ['read'] * readers + ['write'] * writers
+            processes = [context.Process(target=_worker, args=(role, seconds, seed + index, host, barrier, queue))
+                         for index, role in enumerate(roles)]
+            for process in processes:
+                process.start()
+            histograms = {'read': perf.Histogram(perf.BOUNDS['time_ms']),
+                          'write': perf.Histogram(perf.BOUNDS['time_ms'])}
+            errors = {'read': 0, 'write': 0}
+            for _ in processes:
+                role, data, failed = queue.get(timeout=seconds + 120)
+                histograms[role].merge(data)
+                errors[role] += failed
+            for process in processes:
+                process.join()
+        results[mode] = {}
+        for role, histogram in histograms.items():
+            results[mode]['%ss' % role] = histogram.count
+            results[mode]['%ss_per_second' % role] = round(histogram.count / seconds, 1)
+            results[mode]['%s_ms' % role] = histogram.summary()
+            results[mode]['%s_errors' % role] = errors[role]
+    report = {'meta': {'readers': readers, 'writers': writers, 'seconds': seconds, 'seed': seed,
+                       'books': Book.objects.count(), 'pragmas': {mode: JOURNAL_MODES[mode] for mode in modes}},
+              'results': results}
+    if 'default' in results and 'tuned' in results and results['default']['reads_per_second']:
+        report['read_gain'] = round(results['tuned']['reads_per_second'] / results['default']['reads_per_second'], 2)
+    return report
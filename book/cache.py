@@ -0,0 +1,166 @@
+"""
+Rendered-page caching for the catalog views with signal-driven invalidation.
+
+Every model has a version token, and so does every object. A cached page's key
+includes the tokens it depends on: the object for detail pages, the whole model
+for list pages, and the whole model for related objects the page also renders.
+Saving, deleting or relinking an object replaces its tokens, so exactly the
+pages that could show it are never looked up again; the old entries simply
+expire. Tokens are read before the page queries the database, so a write that
+lands mid-render can only cause a miss, never a stale hit.
+
+Bulk writes touch too many objects to replace a token for each: every set
+on the shared file cache lists its whole directory. Past ``OBJECT_KEY_LIMIT``
+objects they replace the model's token and its ``objects_key`` instead,
+which every detail page of the model also depends on.
+"""
+import hashlib
+import threading
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse
+
+TIMEOUT = getattr(settings, 'BOOK_PAGE_CACHE_TIMEOUT', 300)
+OBJECT_KEY_LIMIT = getattr(settings, 'BOOK_CACHE_OBJECT_KEY_LIMIT', 20)
+
+
+def get_cache():
+    return caches[getattr(settings, 'BOOK_CACHE_ALIAS', 'default')]
+
+
+def model_key(model):
+    return 'book:v:%s' % model._meta.label_lower
+
+
+def object_key(model, pk):
+    return 'book:v:%s:%s' % (model._meta.label_lower, pk)
+
+
+def objects_key(model):
+    return 'book:v:%s:*' % model._meta.label_lower
+
+
+class CacheStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(['hits', 'misses', 'bypassed', 'invalidations'], 0)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def clear(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+
+
+# Counts for this process; book.perf writes them out with its histograms.
+stats = CacheStats()
+
+
+def versions(keys):
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, '') for key in keys]
+
+
+def _bump(model, pks):
+    if len(pks) > OBJECT_KEY_LIMIT:
+        keys = [model_key(model), objects_key(model)]
+    else:
+        keys = [model_key(model)] + [object_key(model, pk) for pk in pks]
+    get_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+    stats.incr('invalidations', len(keys))
+
+
+def invalidate(model, pks=()):
+    """Forget every cached page that shows ``model`` rows, or the objects in ``pks``."""
+    pks = list(pks)
+    _bump(model, pks)
+    # Bump again once the writing transaction commits: a page rendered from the
+    # old rows in between must not be stored under the new tokens.
+    transaction.on_commit(partial(_bump, model, pks))
+
+
+def object_changed(sender, instance, **kwargs):
+    invalidate(sender, [instance.pk])
+
+
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from book.models import Book
+
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate(Book, [instance.pk])
+    elif action == 'pre_clear':
+        invalidate(Book, instance.book_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate(Book, pk_set)
+
+
+class CachedPageMixin:
+    """
+    Serve GETs of a list or detail view from the page cache.
+
+    Pages that render ``{% csrf_token %}`` set ``cache_varies_on_csrf``: they
+    are cached per CSRF cookie, and not at all for clients without one.
+    """
+    cache_related_models = ()
+    cache_varies_on_csrf = False
+
+    def get_cache_keys(self):
+        model = self.get_queryset().model
+        pk_url_kwarg = getattr(self, 'pk_url_kwarg', None)
+        if pk_url_kwarg in self.kwargs:
+            keys = [object_key(model, model._meta.pk.to_python(self.kwargs[pk_url_kwarg])), objects_key(model)]
+        else:
+            keys = [model_key(model)]
+        return keys + [model_key(related) for related in self.cache_related_models]
+
+    def get_page_key(self, request):
+        csrf = ''
+        if self.cache_varies_on_csrf:
+            csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+            if not csrf:
+                return None
+        try:
+            keys = self.get_cache_keys()
+        except ValidationError:
+            return None
+        parts = [type(self).__name__, request.get_full_path(), csrf] + versions(keys)
+        return 'book:page:' + hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_page_key(request)
+        if key is None:
+            stats.incr('bypassed')
+            return super().get(request, *args, **kwargs)
+        cached = get_cache().get(key)
+        if cached is not None:
+            stats.incr('hits')
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'hit'
+            return response
+        stats.incr('misses')
+        response = super().get(request, *args, **kwargs)
+        response['X-Cache'] = 'miss'
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: get_cache().set(key, (rendered.content, rendered['Content-Type']), TIMEOUT))
+        return response
@@ -0,0 +1,99 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from book.cache import model_key, versions
+
+
+def _latest(values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+class ConditionalGetMixin:
+    """
+    Answer GETs whose ETag or Last-Modified still match with 304 Not Modified,
+    before the page is looked up in the cache or rendered.
+
+    Detail pages are validated by the ``updated_at`` of their object and of
+    every related row listed in ``last_modified_fields``. List pages use the
+    newest ``updated_at`` of their queryset and of the ``last_modified_models``
+    whose rows they also render. All of these are single index lookups.
+    Either kind also changes with the cache version of every model in
+    ``last_modified_models``, which catches deletions.
+
+    Pages that set ``cache_varies_on_csrf`` render the client's CSRF token, so
+    their ETag also covers the CSRF cookie, clients without one get no
+    validators, and they send no Last-Modified, which could not tell two
+    cookies apart.
+    """
+    last_modified_fields = ('updated_at',)
+    last_modified_models = ()
+
+    def get_validators(self):
+        queryset = self.get_queryset().order_by()
+        pk_url_kwarg = getattr(self, 'pk_url_kwarg', None)
+        if pk_url_kwarg in self.kwargs:
+            try:
+                pk = queryset.model._meta.pk.to_python(self.kwargs[pk_url_kwarg])
+            except ValidationError:
+                return None, None
+            row = queryset.filter(pk=pk).aggregate(
+                **{'latest_%d' % i: Max(field) for i, field in enumerate(self.last_modified_fields)})
+            parts = [pk] + [row['latest_%d' % i] for i in range(len(self.last_modified_fields))]
+            parts += versions([model_key(model) for model in self.last_modified_models])
+        else:
+            models = (queryset.model,) + tuple(self.last_modified_models)
+            parts = [queryset.aggregate(latest=Max('updated_at'))['latest']] + [
+                model.objects.aggregate(latest=Max('updated_at'))['latest'] for model in models[1:]]
+            # Deleting a row leaves every updated_at as it was, but replaces the
+            # model's cache version token; that keeps COUNT(*) out of the ETag.
+            parts += versions([model_key(model) for model in models])
+        last_modified = _latest(part for part in parts if hasattr(part, 'utctimetuple'))
+        if last_modified is None:
+            # Nothing to validate against; let the view render (or 404) as usual.
+            return None, None
+        csrf = ''
+        if getattr(self, 'cache_varies_on_csrf', False):
+            csrf = self.request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+            if not csrf:
+                # The response hands out a new cookie, which the next request's ETag covers.
+                return None, None
+            last_modified = None
+        key = '\n'.join([type(self).__name__, self.request.get_full_path(), csrf] + [str(part) for part in parts])
+        etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+        return etag, last_modified and timegm(last_modified.utctimetuple())
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump ``Book.updated_at`` when a book's authors change, so its validators change too."""
+    from book.models import Book
+
+    if not reverse:
+        if not action.startswith('post_'):
+            return
+        books = Book.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        books = Book.objects.filter(authors=instance)
+    elif action in ('post_add', 'post_remove'):
+        books = Book.objects.filter(pk__in=pk_set)
+    else:
+        return
+    books.update(updated_at=timezone.now())
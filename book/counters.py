@@ -0,0 +1,122 @@
+"""
+Denormalized ``book_count`` and ``latest_publication_date`` on Publisher and Author.
+
+Signal receivers keep both columns current with single-statement updates:
+adding a book increments the count with an F() expression and raises the latest
+date with GREATEST(), so neither needs to read the books. Removing one
+decrements the count and recomputes the latest date only for the rows it might
+have lowered, which is an index lookup. Code that writes books without signals
+(bulk_create, raw batches) calls ``recount()`` for the rows it touched, and
+``manage.py recount_books`` fixes any drift.
+"""
+from django.db.models import Count, DateField, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from book.models import Author, Book, Publisher
+
+BATCH_SIZE = 500
+
+# model: the lookup from Book to that model
+RELATIONS = {Publisher: 'publisher', Author: 'authors'}
+
+
+def _batches(pks):
+    pks = list(pks)
+    for start in range(0, len(pks), BATCH_SIZE):
+        yield pks[start:start + BATCH_SIZE]
+
+
+def _latest(model):
+    books = Book._base_manager.filter(**{RELATIONS[model]: OuterRef('pk')}).order_by('-publication_date')
+    return Subquery(books.values('publication_date')[:1])
+
+
+def recount(model, pks=None):
+    """Recompute both columns from the books, for ``pks`` or every row."""
+    books = (Book._base_manager.filter(**{RELATIONS[model]: OuterRef('pk')}).order_by()
+             .values(RELATIONS[model]).annotate(count=Count('pk')).values('count'))
+    values = {'book_count': Coalesce(Subquery(books), Value(0)), 'latest_publication_date': _latest(model)}
+    # The base manager also sees publishers that book.purge is deleting.
+    if pks is None:
+        return model._base_manager.update(**values)
+    return sum(model._base_manager.filter(pk__in=batch).update(**values) for batch in _batches(set(pks)))
+
+
+def drifted(model):
+    """Return the pks whose stored columns disagree with the books."""
+    rows = (model._base_manager.order_by('pk')
+            .annotate(actual_count=Count('book'), actual_latest=Max('book__publication_date'))
+            .values_list('pk', 'book_count', 'latest_publication_date', 'actual_count', 'actual_latest'))
+    return [pk for pk, count, latest, actual_count, actual_latest in rows.iterator()
+            if (count, latest) != (actual_count, actual_latest)]
+
+
+def adjust(model, pks, delta=0, date=None):
+    """
+    Add ``delta`` to the book_count of ``pks``, and raise their latest date to
+    ``date``; without a date, recompute it from the books instead.
+    """
+    if date is None:
+        latest = _latest(model)
+    else:
+        date = Value(date, output_field=DateField())
+        latest = Greatest(Coalesce('latest_publication_date', date), date)
+    for batch in _batches(pks):
+        model._base_manager.filter(pk__in=batch).update(
+            book_count=F('book_count') + delta, latest_publication_date=latest)
+
+
+def book_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._counted = None
+        return
+    instance._counted = Book._base_manager.filter(pk=instance.pk).values_list('publisher_id', 'publication_date').first()
+
+
+def book_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counted', None)
+    if created or previous is None:
+        adjust(Publisher, [instance.publisher_id], 1, instance.publication_date)
+        return
+    publisher_id, date = previous
+    if publisher_id != instance.publisher_id:
+        adjust(Publisher, [publisher_id], -1)
+        adjust(Publisher, [instance.publisher_id], 1, instance.publication_date)
+    elif date != instance.publication_date:
+        adjust(Publisher, [publisher_id])
+    if date != instance.publication_date:
+        adjust(Author, instance.authors.values_list('pk', flat=True))
+
+
+def book_pre_delete(sender, instance, **kwargs):
+    # The collector deletes the author links without sending m2m_changed.
+    instance._counted_authors = list(Book.authors.through.objects.filter(book_id=instance.pk)
+                                     .values_list('author_id', flat=True))
+
+
+def book_deleted(sender, instance, **kwargs):
+    adjust(Publisher, [instance.publisher_id], -1)
+    adjust(Author, getattr(instance, '_counted_authors', []), -1)
+
+
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        # Only links that really exist are removed; remember them before they go.
+        links = Book.authors.through.objects.filter(**{'author_id' if reverse else 'book_id': instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{'book_id__in' if reverse else 'author_id__in': pk_set})
+        instance._counted_links = list(links.values_list('book_id' if reverse else 'author_id', flat=True))
+    elif action == 'post_add' and pk_set:
+        if reverse:
+            latest = Book._base_manager.filter(pk__in=pk_set).aggregate(latest=Max('publication_date'))['latest']
+            adjust(Author, [instance.pk], len(pk_set), latest)
+        else:
+            adjust(Author, pk_set, 1, instance.publication_date)
+    elif action in ('post_remove', 'post_clear'):
+        pks = instance.__dict__.pop('_counted_links', [])
+        if pks and reverse:
+            adjust(Author, [instance.pk], -len(pks))
+        elif pks:
+            adjust(Author, pks, -1)
@@ -0,0 +1,129 @@
+"""
+``EXPLAIN QUERY PLAN`` checks for the queries behind every view.
+
+``check_views`` requests each ``book.benchmark`` scenario with an empty page
+cache, records the SELECTs it runs and asks SQLite how it would execute each
+of them. A plan step that scans a table without an index reads every row, so
+its cost grows with the catalog; ``manage.py check_query_plans`` fails on
+those. Scans that walk an index in order (``SCAN ... USING INDEX``) are fine
+only while they stop as soon as the page is full: a COUNT, an OFFSET, an
+aggregate or a sort walks the whole index, so those fail too. So does a
+temporary B-tree that sorts more rows than the query returns, unless the rows
+it sorts were found by key (``author_id=?``, ``rowid=?``).
+"""
+import random
+import re
+
+from django.db import NotSupportedError, connection
+from django.test import Client
+from django.urls import reverse
+
+from book.benchmark import SCENARIOS, Sample
+from book.cache import get_cache
+
+SCAN = re.compile(r'^SCAN (?:TABLE )?(\S+)(.*)$')
+SEARCH = re.compile(r'^SEARCH (?:TABLE )?(\S+).*?\((\w+)[=<>]')
+STEP = re.compile(r'^(?:SCAN|SEARCH) (?:TABLE )?(\S+)(.*)$')
+# Queries that read every row they match, whatever their LIMIT.
+WHOLE = re.compile(r'\b(?:COUNT|SUM|AVG|GROUP BY|OFFSET)\b')
+# A WHERE that only leaves out the rows of a subquery, as ``Book.objects``
+# leaves out the books of publishers being deleted, lengthens a walk by the
+# rows it hides at most.
+EXCLUSION = re.compile(r' WHERE NOT \([^()]+ IN \(SELECT [^()]+\)\)(?= ORDER BY | LIMIT |$)')
+
+# SCAN steps that read something other than a stored table.
+NOT_TABLES = ('CONSTANT', 'SUBQUERY')
+
+# Summary tables holding one row per place and year rather than per book; the
+# browse page reads and ranks them whole by design.
+SUMMARY_TABLES = ('book_facetcount',)
+
+
+def plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _skipped(table, rest=''):
+    return table in NOT_TABLES or table in SUMMARY_TABLES or table.startswith('(') or 'VIRTUAL TABLE' in rest
+
+
+def full_scans(details, sql=''):
+    """Return the tables that plan ``details`` of ``sql`` reads in full."""
+    # A walk in rowid or index order stops after LIMIT rows, unless something
+    # has to see every row first.
+    stops = ' LIMIT ' in sql and not WHOLE.search(sql) and not sorts(details)
+    tables = []
+    for detail in details:
+        match = SCAN.match(detail)
+        if not match or _skipped(match.group(1), match.group(2)):
+            continue
+        if 'INDEX' in match.group(2):
+            if not stops:
+                tables.append(match.group(1))
+        elif not stops or ' WHERE ' in EXCLUSION.sub('', sql):
+            tables.append(match.group(1))
+    return tables
+
+
+def sorts(details):
+    return [detail for detail in details if 'TEMP B-TREE' in detail]
+
+
+def _keyed(detail):
+    match = SEARCH.match(detail)
+    return bool(match) and (match.group(2) in ('rowid', 'id') or match.group(2).endswith('_id'))
+
+
+def unbounded_sorts(details, sql=''):
+    """Return the sorts in plan ``details`` of ``sql`` that read more rows than the page they return."""
+    if ' LIMIT ' not in sql:
+        # It sorts exactly the rows it returns.
+        return []
+    steps = [match for match in map(STEP.match, details) if match]
+    if all(_keyed(match.group(0)) or _skipped(match.group(1), match.group(2)) for match in steps):
+        return []
+    return sorts(details)
+
+
+class _Recorder:
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def check_views(labels=None, seed=0, client=None):
+    """
+    Return ``{label: [(sql, plan, full scans, unbounded sorts)]}`` for every scenario, or
+    those in ``labels``, skipping queries whose plan has already been seen.
+    """
+    if connection.vendor != 'sqlite':
+        raise NotSupportedError('Query plans are only checked on SQLite.')
+    rng = random.Random(seed)
+    client = client or Client()
+    sample = Sample(rng)
+    seen, report = set(), {}
+    for label, name, sampler in SCENARIOS:
+        if labels and label not in labels:
+            continue
+        kwargs, params = sampler(sample)
+        get_cache().clear()
+        recorder = _Recorder()
+        with connection.execute_wrapper(recorder):
+            response = client.get(reverse('books:%s' % name, kwargs=kwargs), params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        report[label] = []
+        for sql, query_params in recorder.queries:
+            if sql in seen:
+                continue
+            seen.add(sql)
+            details = plan(sql, query_params)
+            report[label].append((sql, details, full_scans(details, sql), unbounded_sorts(details, sql)))
+    return report
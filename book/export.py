@@ -0,0 +1,142 @@
+"""
+Streaming exports of the catalog as CSV or JSON lines.
+
+Rows are read with ``QuerySet.iterator()`` and written out one at a time, so
+memory use does not grow with the size of the tables. Books are flattened with
+their publisher and author names; the authors of each chunk of books are
+fetched with one extra query per ``LOOKUP_BATCH`` books of the chunk.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from book.models import Author, Book, Publisher
+
+BOOK_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'publication_date': 'publication_date',
+    'publisher_id': 'publisher_id',
+    'publisher': 'publisher__name',
+    'publisher_city': 'publisher__city',
+    'publisher_country': 'publisher__country',
+    'updated_at': 'updated_at',
+}
+
+COLUMNS = {
+    'books': list(BOOK_COLUMNS) + ['authors'],
+    'authors': ['id', 'salutation', 'name', 'email', 'updated_at'],
+    'publishers': ['id', 'name', 'address', 'city', 'state_province', 'country', 'website', 'updated_at'],
+}
+
+FORMATS = ('csv', 'jsonl')
+
+# Book ids per author lookup; SQLite allows 999 parameters per query.
+LOOKUP_BATCH = 500
+
+
+def _book_chunk(rows):
+    if not rows:
+        return
+    # The exact keys of the chunk: with ?since= a chunk can be sparse, and a
+    # key range would read the links of every book in between.
+    pks = [row[0] for row in rows]
+    authors = {}
+    for start in range(0, len(pks), LOOKUP_BATCH):
+        links = (Book.authors.through.objects
+                 .filter(book_id__in=pks[start:start + LOOKUP_BATCH])
+                 .order_by('author__name')
+                 .values_list('book_id', 'author__name'))
+        for book_id, name in links:
+            authors.setdefault(book_id, []).append(name)
+    for row in rows:
+        record = dict(zip(BOOK_COLUMNS, row))
+        record['authors'] = authors.get(row[0], [])
+        yield record
+
+
+def _since(queryset, since):
+    if since is None:
+        return queryset
+    if isinstance(since, int):
+        return queryset.filter(pk__gt=since)
+    return queryset.filter(updated_at__gt=since)
+
+
+def book_records(since=None, chunk_size=2000):
+    books = _since(Book.objects.order_by('pk').values_list(*BOOK_COLUMNS.values()), since)
+    chunk = []
+    for row in books.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from _book_chunk(chunk)
+            chunk = []
+    yield from _book_chunk(chunk)
+
+
+def _model_records(model, kind, since=None, chunk_size=2000):
+    rows = _since(model.objects.order_by('pk').values(*COLUMNS[kind]), since)
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def records(kind, since=None, chunk_size=2000):
+    """
+    Yield the rows of ``kind`` as dicts in primary key order. ``since`` is
+    either the last id of a previous export, to get only rows added after it,
+    or a datetime, to get only rows changed after it. Deletions are not
+    reported.
+    """
+    if kind == 'books':
+        return book_records(since, chunk_size)
+    model = {'authors': Author, 'publishers': Publisher}[kind]
+    return _model_records(model, kind, since, chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def as_csv(records, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for record in records:
+        yield writer.writerow(['; '.join(value) if isinstance(value, list) else value
+                               for value in (record[column] for column in columns)])
+
+
+def as_jsonl(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def buffered(lines, size=64 * 1024):
+    # Hand the server a few large writes instead of one per row.
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, fmt, since=None, compress=False, chunk_size=2000):
+    rows = records(kind, since, chunk_size)
+    lines = buffered(as_csv(rows, COLUMNS[kind]) if fmt == 'csv' else as_jsonl(rows))
+    if compress:
+        return gzipped(lines)
+    return (chunk.encode() for chunk in lines)
@@ -0,0 +1,190 @@
+"""
+Faceted browsing of books by publisher country, city and publication year.
+
+``FacetCount`` keeps one row per (country, city, year) with the number of
+books in it. Its size depends on how many places and years the catalog spans,
+not on how many books it has, so the counts for any selection are a SUM over a
+few index-ordered rows rather than a GROUP BY over the books. Signal receivers
+keep it current on Book and Publisher saves and deletes; code that writes books
+without signals calls ``add()``, and ``manage.py rebuild_facets`` recomputes
+the table from the books.
+"""
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+from django.utils.http import urlencode
+
+from book.models import Book, FacetCount, Publisher
+
+# facet: the lookup from Book to its value
+FACETS = {'country': 'publisher__country', 'city': 'publisher__city', 'year': 'publication_date__year'}
+
+BATCH_SIZE = 500
+
+
+def selection(params):
+    """Return the facet values selected in ``params``, ignoring invalid ones."""
+    selected = {}
+    for facet in FACETS:
+        value = params.get(facet, '').strip()
+        if facet == 'year':
+            value = int(value) if value.isdigit() else None
+        if value:
+            selected[facet] = value
+    return selected
+
+
+def book_filter(selected):
+    return {FACETS[facet]: value for facet, value in selected.items()}
+
+
+def counts(selected, limit=20):
+    """
+    Return ``{facet: [(value, books)]}`` for the books matching ``selected``:
+    the ``limit`` countries and cities with the most books, and every year,
+    newest first.
+    """
+    facets = {}
+    for facet in FACETS:
+        rows = FacetCount.objects.filter(**{other: value for other, value in selected.items() if other != facet})
+        if facet != 'year':
+            # Books of publishers without a location cannot be selected.
+            rows = rows.exclude(**{facet: ''})
+        rows = (rows.values(facet).annotate(total=Sum('books')).filter(total__gt=0)
+                .order_by('-total', facet).values_list(facet, 'total'))
+        facets[facet] = sorted(rows, reverse=True) if facet == 'year' else list(rows[:limit])
+    return facets
+
+
+def total(selected, facets):
+    """Return the number of books matching ``selected``, given its ``counts()``."""
+    years = dict(facets['year'])
+    return years.get(selected['year'], 0) if 'year' in selected else sum(years.values())
+
+
+def _batches(items, size=BATCH_SIZE // 3):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def add(deltas):
+    """Add ``{(country, city, year): change}`` to the counts, in a few queries however many keys change."""
+    deltas = {key: change for key, change in deltas.items() if change}
+    existing = {}
+    for keys in _batches(deltas):
+        rows = FacetCount.objects.filter(reduce(or_, (Q(country=country, city=city, year=year)
+                                                      for country, city, year in keys)))
+        existing.update(((country, city, year), pk) for pk, country, city, year in
+                        rows.values_list('pk', 'country', 'city', 'year'))
+    by_change = {}
+    for key, pk in existing.items():
+        by_change.setdefault(deltas[key], []).append(pk)
+    for change, pks in by_change.items():
+        for batch in _batches(pks, BATCH_SIZE):
+            FacetCount.objects.filter(pk__in=batch).update(books=F('books') + change)
+            if change < 0:
+                # Keeps places and years without books out of the table.
+                FacetCount.objects.filter(pk__in=batch, books__lte=0).delete()
+    missing = [FacetCount(country=country, city=city, year=year, books=change)
+               for (country, city, year), change in deltas.items() if (country, city, year) not in existing]
+    if missing:
+        try:
+            with transaction.atomic():
+                FacetCount.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        except IntegrityError:
+            # Another process created some of them in the meantime; now they exist.
+            add({(row.country, row.city, row.year): row.books for row in missing})
+
+
+def computed():
+    """Return ``{(country, city, year): books}`` counted from the books themselves."""
+    rows = (Book._base_manager.order_by().annotate(year=ExtractYear('publication_date'))
+            .values_list('publisher__country', 'publisher__city', 'year').annotate(books=Count('pk')))
+    return {(country, city, year): books for country, city, year, books in rows.iterator()}
+
+
+def stored():
+    rows = FacetCount.objects.filter(books__gt=0).values_list('country', 'city', 'year', 'books')
+    return {(country, city, year): books for country, city, year, books in rows.iterator()}
+
+
+def rebuild():
+    """Replace the counts with ones computed from the books; return the number of rows."""
+    rows = [FacetCount(country=country, city=city, year=year, books=books)
+            for (country, city, year), books in computed().items()]
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def _location(publisher_pk):
+    # The base manager also sees publishers that book.purge is deleting.
+    return Publisher._base_manager.values_list('country', 'city').get(pk=publisher_pk)
+
+
+def book_pre_save(sender, instance, raw=False, **kwargs):
+    instance._faceted = None
+    if not raw and instance.pk is not None:
+        instance._faceted = (Book._base_manager.filter(pk=instance.pk)
+                             .values_list('publisher__country', 'publisher__city', 'publication_date').first())
+
+
+def book_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Counter({_location(instance.publisher_id) + (instance.publication_date.year,): 1})
+    previous = getattr(instance, '_faceted', None)
+    if previous is not None:
+        country, city, date = previous
+        deltas[country, city, date.year] -= 1
+    add(deltas)
+
+
+def book_pre_delete(sender, instance, **kwargs):
+    # The publisher may be deleted along with the book; read its location first.
+    instance._faceted = _location(instance.publisher_id) + (instance.publication_date.year,)
+
+
+def book_deleted(sender, instance, **kwargs):
+    if getattr(instance, '_faceted', None):
+        add({instance._faceted: -1})
+
+
+def publisher_pre_save(sender, instance, raw=False, **kwargs):
+    instance._faceted = None
+    if not raw and instance.pk is not None:
+        instance._faceted = Publisher._base_manager.filter(pk=instance.pk).values_list('country', 'city').first()
+
+
+def publisher_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_faceted', None)
+    if raw or previous is None or previous == (instance.country, instance.city):
+        return
+    # Move the publisher's books, year by year, to its new location.
+    years = (Book._base_manager.filter(publisher_id=instance.pk).order_by()
+             .annotate(year=ExtractYear('publication_date')).values_list('year').annotate(books=Count('pk')))
+    deltas = Counter()
+    for year, books in years:
+        deltas[previous + (year,)] -= books
+        deltas[instance.country, instance.city, year] += books
+    add(deltas)
+
+
+class FacetFilterMixin:
+    """Narrow a Book ListView to the books of the ``?country=&city=&year=`` selection."""
+
+    def get_queryset(self):
+        self.selected = selection(self.request.GET)
+        return super().get_queryset().filter(**book_filter(self.selected))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['selected'] = self.selected
+        context['facet_query'] = urlencode(self.selected)
+        return context
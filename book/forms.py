@@ -1,8 +1,27 @@
+from django import forms
 from django.forms import ModelForm
-from book.models import Publisher
+from book.importer import FORMATS
+from book.models import Book, Publisher
+from book.widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class MyCommentForm(ModelForm):
     class Meta:
         model = Publisher
-        fields = ['name', 'address', 'city', 'state_province', 'country', 'website']
\ No newline at end of file
+        fields = ['name', 'address', 'city', 'state_province', 'country', 'website']
+
+
+class BookForm(ModelForm):
+    class Meta:
+        model = Book
+        fields = ['title', 'authors', 'publisher', 'publication_date']
+        widgets = {
+            'authors': AutocompleteSelectMultiple('authors'),
+            'publisher': AutocompleteSelect('publishers'),
+        }
+
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or JSON lines, optionally gzipped.')
+    format = forms.ChoiceField(choices=[(fmt, fmt) for fmt in FORMATS])
+    update_existing = forms.BooleanField(required=False, initial=True)
@@ -0,0 +1,282 @@
+"""
+Batched import of books, with their publishers and authors, from CSV or JSON lines.
+
+Rows use the same columns as ``book.export`` (``title``, ``publication_date``,
+``publisher``, ``publisher_city``, ``publisher_country``, ``authors``), so an
+export can be loaded back as-is. Publishers and authors are matched by name and
+books by title and publisher through in-memory maps; everything missing is
+written with ``bulk_create`` and existing books are updated in place (upsert).
+"""
+import csv
+import datetime
+import gzip
+import io
+import json
+import time
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from book import facets, related
+from book.cache import invalidate
+from book.counters import recount
+from book.models import Author, Book, Publisher
+
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportStats:
+
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.publishers_created = 0
+        self.authors_created = 0
+        self.books_created = 0
+        self.books_updated = 0
+        self.links_created = 0
+        self.links_deleted = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        data = dict(vars(self))
+        data['rows_per_second'] = round(self.rows_per_second, 1)
+        return data
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class InvalidRow:
+    """A line of the input that could not be decoded into a row; ``_clean`` skips it."""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def read_rows(stream, fmt):
+    """Yield dicts from a binary stream of CSV or JSON lines, gzipped or not."""
+    stream = io.BufferedReader(stream) if not hasattr(stream, 'peek') else stream
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+    # Undecodable bytes become U+FFFD rather than ending the import halfway.
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+    else:
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield InvalidRow('is not valid JSON')
+
+
+class CatalogImporter:
+    max_params = 500
+
+    def __init__(self, batch_size=5000, update_existing=True):
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.stats = ImportStats()
+        self.publishers = dict(Publisher.objects.order_by().values_list('name', 'pk'))
+        self.authors = dict(Author.objects.order_by().values_list('name', 'pk'))
+
+    def run(self, rows):
+        start = time.monotonic()
+        for batch in _chunks(rows, self.batch_size):
+            with transaction.atomic():
+                self._import_batch(batch)
+        self.stats.seconds = time.monotonic() - start
+        return self.stats
+
+    def _skip(self, reason):
+        self.stats.skipped += 1
+        if len(self.stats.errors) < 20:
+            self.stats.errors.append('Row %d %s.' % (self.stats.rows, reason))
+
+    def _clean(self, row):
+        self.stats.rows += 1
+        if isinstance(row, InvalidRow):
+            return self._skip(row.reason)
+        if not isinstance(row, dict):
+            return self._skip('is not a JSON object')
+        text = ('title', 'publisher', 'publisher_city', 'publisher_country')
+        wrong = [field for field in text if not isinstance(row.get(field) or '', str)]
+        if wrong:
+            return self._skip('has non-text %s' % ', '.join(wrong))
+        authors = row.get('authors') or []
+        if isinstance(authors, str):
+            authors = authors.split(';')
+        if not isinstance(authors, list) or not all(isinstance(name, str) for name in authors):
+            return self._skip('needs authors as a list of names')
+        date = row.get('publication_date')
+        if isinstance(date, str):
+            try:
+                date = parse_date(date)
+            except ValueError:
+                date = None
+        elif not isinstance(date, datetime.date):
+            date = None
+        cleaned = {
+            'title': (row.get('title') or '').strip(),
+            'publication_date': date,
+            'publisher': (row.get('publisher') or '').strip(),
+            'publisher_city': row.get('publisher_city') or '',
+            'publisher_country': row.get('publisher_country') or '',
+            'authors': sorted({name.strip() for name in authors if name.strip()}),
+        }
+        if not (cleaned['title'] and cleaned['publisher'] and cleaned['publication_date']):
+            return self._skip('needs a title, publisher and publication_date')
+        return cleaned
+
+    def _create_missing(self, model, lookup, objects):
+        # bulk_create does not return primary keys on every backend, so read
+        # the new rows back by their (increasing) primary keys instead.
+        if not objects:
+            return 0
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        model.objects.bulk_create(objects, batch_size=self.max_params)
+        lookup.update(model.objects.filter(pk__gt=last).order_by().values_list('name', 'pk'))
+        return len(objects)
+
+    def _update_column(self, model, field, values, **extra):
+        items = list(values.items())
+        for chunk in _chunks(items, self.max_params // 3):
+            whens = [When(pk=pk, then=Value(value)) for pk, value in chunk]
+            model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                **{field: Case(*whens, output_field=model._meta.get_field(field).__class__())}, **extra)
+
+    def _import_batch(self, batch):
+        rows = [row for row in map(self._clean, batch) if row is not None]
+
+        publishers = {}
+        for row in rows:
+            if row['publisher'] not in self.publishers and row['publisher'] not in publishers:
+                publishers[row['publisher']] = Publisher(
+                    name=row['publisher'], city=row['publisher_city'], country=row['publisher_country'])
+        self.stats.publishers_created += self._create_missing(Publisher, self.publishers, list(publishers.values()))
+
+        names = {name for row in rows for name in row['authors'] if name not in self.authors}
+        self.stats.authors_created += self._create_missing(Author, self.authors, [Author(name=n) for n in names])
+
+        # The last row for a (title, publisher) pair wins within a batch.
+        wanted = {(row['title'], self.publishers[row['publisher']]): row for row in rows}
+        existing = {}
+        for titles in _chunks({title for title, _ in wanted}, self.max_params):
+            found = (Book.objects.filter(title__in=titles)
+                     .values_list('title', 'publisher_id', 'pk', 'publication_date'))
+            for title, publisher_id, pk, date in found:
+                if (title, publisher_id) in wanted:
+                    existing[title, publisher_id] = (pk, date)
+
+        new_books = [Book(title=title, publisher_id=publisher_id, publication_date=row['publication_date'])
+                     for (title, publisher_id), row in wanted.items() if (title, publisher_id) not in existing]
+        book_ids = {}
+        if new_books:
+            last = Book._base_manager.aggregate(last=Max('pk'))['last'] or 0
+            Book.objects.bulk_create(new_books, batch_size=self.max_params)
+            for title, publisher_id, pk in Book._base_manager.filter(pk__gt=last).values_list('title', 'publisher_id', 'pk'):
+                book_ids[title, publisher_id] = pk
+            self.stats.books_created += len(new_books)
+
+        links = set()
+        before, after = {}, {}
+        for key, row in wanted.items():
+            if key not in existing:
+                links.update((book_ids[key], self.authors[name]) for name in row['authors'])
+                before[book_ids[key]] = set()
+                after[book_ids[key]] = {self.authors[name] for name in row['authors']}
+
+        locations = {}
+        for pks in _chunks({publisher_id for _, publisher_id in wanted}, self.max_params):
+            locations.update((pk, (country, city)) for pk, country, city in
+                             Publisher._base_manager.filter(pk__in=pks).values_list('pk', 'country', 'city'))
+        facet_deltas = Counter(locations[key[1]] + (row['publication_date'].year,)
+                               for key, row in wanted.items() if key not in existing)
+
+        unlinked = set()
+        if self.update_existing and existing:
+            dates = {pk: wanted[key]['publication_date'] for key, (pk, date) in existing.items()
+                     if date != wanted[key]['publication_date']}
+            keys = {pk: key for key, (pk, _) in existing.items()}
+            for key, (pk, date) in existing.items():
+                if pk in dates:
+                    facet_deltas[locations[key[1]] + (date.year,)] -= 1
+                    facet_deltas[locations[key[1]] + (dates[pk].year,)] += 1
+            added, relinked, unlinked, current = self._replace_links(existing, wanted)
+            links.update(added)
+            relinked.update(book_id for book_id, _ in added)
+            for book_id in relinked:
+                before[book_id] = current.get(book_id, set())
+                after[book_id] = {self.authors[name] for name in wanted[keys[book_id]]['authors']}
+            now = timezone.now()
+            self._update_column(Book, 'publication_date', dates, updated_at=now)
+            for pks in _chunks(relinked.difference(dates), self.max_params):
+                Book.objects.filter(pk__in=pks).update(updated_at=now)
+            self.stats.books_updated += len(relinked.union(dates))
+
+        Through = Book.authors.through
+        Through.objects.bulk_create([Through(book_id=book_id, author_id=author_id) for book_id, author_id in links],
+                                    batch_size=self.max_params)
+        self.stats.links_created += len(links)
+
+        # bulk_create and update() send no signals, so recount and drop the
+        # cached pages here.
+        recount(Publisher, {publisher_id for _, publisher_id in wanted})
+        recount(Author, {self.authors[name] for row in wanted.values() for name in row['authors']} | unlinked)
+        facets.add(facet_deltas)
+        related.apply(*self._changed(before, after))
+        if publishers:
+            invalidate(Publisher)
+        if names:
+            invalidate(Author)
+        invalidate(Book, [pk for pk, _ in existing.values()] if self.update_existing else ())
+
+    @staticmethod
+    def _changed(before, after):
+        changed = [pk for pk in after if after[pk] != before[pk]]
+        return {pk: before[pk] for pk in changed}, {pk: after[pk] for pk in changed}
+
+    def _replace_links(self, existing, wanted):
+        """
+        Delete author links the import no longer lists. Return the links to
+        add, the ids of the books that lost links and of their former authors,
+        and the authors every book had before.
+        """
+        Through = Book.authors.through
+        wanted_links = {(pk, self.authors[name]) for key, (pk, _) in existing.items()
+                        for name in wanted[key]['authors']}
+        current = {}
+        for pks in _chunks([pk for pk, _ in existing.values()], self.max_params):
+            for link_id, book_id, author_id in Through.objects.filter(book_id__in=pks).values_list(
+                    'pk', 'book_id', 'author_id'):
+                current[book_id, author_id] = link_id
+        stale = [link_id for link, link_id in current.items() if link not in wanted_links]
+        for ids in _chunks(stale, self.max_params):
+            Through.objects.filter(pk__in=ids).delete()
+        self.stats.links_deleted += len(stale)
+        relinked = {link[0] for link, link_id in current.items() if link not in wanted_links}
+        unlinked = {link[1] for link, link_id in current.items() if link not in wanted_links}
+        authors = {}
+        for book_id, author_id in current:
+            authors.setdefault(book_id, set()).add(author_id)
+        return wanted_links - set(current), relinked, unlinked, authors
+
+
+def import_catalog(stream, fmt, batch_size=5000, update_existing=True):
+    return CatalogImporter(batch_size, update_existing).run(read_rows(stream, fmt))
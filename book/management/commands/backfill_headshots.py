@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from book.models import Author
+from book.thumbnails import schedule_derivatives
+
+
+class Command(BaseCommand):
+    help = ('Queue thumbnail generation for author headshots that do not have them yet; '
+            'manage.py runworker does the work.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Also re-check authors whose derivatives were already generated.')
+
+    def handle(self, *args, **options):
+        authors = Author.objects.exclude(headshot='').exclude(headshot=None)
+        if not options['all']:
+            authors = authors.filter(headshot_digest='')
+        queued = 0
+        for author in authors.only('pk').iterator():
+            schedule_derivatives(author)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS('Queued derivatives for %d headshots.' % queued))
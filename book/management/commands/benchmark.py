@@ -0,0 +1,67 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from book.benchmark import SCENARIOS, compare, missing_url_names, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of every book view against the current database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', choices=[label for label, _, _ in SCENARIOS])
+        parser.add_argument('--cold', action='store_true', help='Clear the page cache before every request.')
+        parser.add_argument('--user', help='Log in as this user, for the staff-only views.')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative slowdown reported as a regression (default 0.1).')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        missing = missing_url_names()
+        if missing:
+            raise CommandError('No benchmark scenario for: %s' % ', '.join(missing))
+        client = Client(HTTP_HOST=options['host'])
+        if options['user']:
+            try:
+                client.force_login(get_user_model()._default_manager.get_by_natural_key(options['user']))
+            except get_user_model().DoesNotExist:
+                raise CommandError('No such user: %s' % options['user'])
+        report = run_benchmark(options['requests'], options['warmup'], options['seed'], options['only'],
+                               client, options['cold'])
+        if report['meta']['debug']:
+            self.stderr.write('DEBUG is on; timings include query logging.')
+
+        self.stdout.write('%-26s %8s %9s %9s %9s %8s %10s  %s' % (
+            'scenario', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'queries', 'bytes', 'statuses'))
+        for label, result in report['results'].items():
+            self.stdout.write('%-26s %8.1f %9.2f %9.2f %9.2f %8.1f %10d  %s' % (
+                label, result['throughput_rps'], result['p50_ms'], result['p90_ms'], result['p99_ms'],
+                result['queries_mean'], result['bytes_mean'],
+                ' '.join('%s:%d' % item for item in sorted(result['statuses'].items()))))
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as source:
+                baseline = json.load(source)
+            regressions = 0
+            for label, metric, before, after, change, regressed in compare(baseline, report,
+                                                                           threshold=options['threshold']):
+                if regressed:
+                    regressions += 1
+                    self.stdout.write(self.style.WARNING('%s %s: %.2f -> %.2f (%+.0f%%)' % (
+                        label, metric, before, after, change * 100)))
+            if regressions and options['fail_on_regression']:
+                raise CommandError('%d regressions against %s.' % (regressions, options['compare']))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against %s.' % options['compare']))
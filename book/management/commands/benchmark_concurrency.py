@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
+
+from book.benchmark import JOURNAL_MODES, run_concurrency
+
+
+class Command(BaseCommand):
+    help = ('Compare read throughput of several worker processes under concurrent book saves with default '
+            'SQLite journaling and with BOOK_SQLITE_PRAGMAS-style tuning. Saves books and leaves the database '
+            'in the journal mode of the last pass, so run it against a copy.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Worker processes serving detail pages.')
+        parser.add_argument('--writers', type=int, default=1, help='Worker processes saving books.')
+        parser.add_argument('--seconds', type=float, default=10, help='Length of every pass.')
+        parser.add_argument('--modes', nargs='+', choices=list(JOURNAL_MODES), default=['default', 'tuned'])
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 1 or options['writers'] < 0:
+            raise CommandError('Need at least one reader.')
+        try:
+            report = run_concurrency(options['readers'], options['writers'], options['seconds'],
+                                     options['modes'], options['seed'], options['host'])
+        except NotSupportedError as e:
+            raise CommandError(e)
+
+        self.stdout.write('%-8s %9s %9s %9s %6s %9s %9s %6s' % (
+            'mode', 'reads/s', 'read p50', 'read p99', 'errors', 'writes/s', 'write p99', 'errors'))
+        for mode, result in report['results'].items():
+            self.stdout.write('%-8s %9.1f %9.2f %9.2f %6d %9.1f %9.2f %6d' % (
+                mode, result['reads_per_second'], result['read_ms']['p50'], result['read_ms']['p99'],
+                result['read_errors'], result['writes_per_second'], result['write_ms']['p99'],
+                result['write_errors']))
+        if 'read_gain' in report:
+            self.stdout.write(self.style.SUCCESS('Tuned reads/s: %.2fx default.' % report['read_gain']))
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2)
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from book.benchmark import RENDER_TEMPLATES, compare, run_render
+
+
+class Command(BaseCommand):
+    help = ('Render the list templates with rows from the current database and report the milliseconds and '
+            'bytes they cost per row and per page, with and without the cached template loader.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs=2, default=[10, 50], metavar=('FEW', 'MANY'),
+                            help='Row counts to fit the per-row cost between.')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per measurement; the median is kept.')
+        parser.add_argument('--only', nargs='+', metavar='TEMPLATE', choices=list(RENDER_TEMPLATES))
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run.')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_render(options['rows'], options['repeat'], options['only'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        many = max(options['rows'])
+        self.stdout.write('%-16s %9s %9s %9s %10s %12s %14s' % (
+            'template', 'ms/row', 'bytes/row', 'base ms', 'base bytes', '%d rows ms' % many, 'uncached ms'))
+        for label, result in report['results'].items():
+            self.stdout.write('%-16s %9.4f %9.1f %9.3f %10d %12.3f %14.3f' % (
+                label, result['ms_per_row'], result['bytes_per_row'], result['base_ms'], result['base_bytes'],
+                result['cached_ms'], result['uncached_ms']))
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as source:
+                baseline = json.load(source)
+            metrics = ('ms_per_row', 'bytes_per_row', 'base_ms', 'base_bytes')
+            for label, metric, before, after, change, _ in compare(baseline, report, metrics, threshold=0):
+                self.stdout.write('%s %s: %.4g -> %.4g (%+.0f%%)' % (label, metric, before, after, change * 100))
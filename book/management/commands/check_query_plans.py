@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
+from django.test import Client
+
+from book.benchmark import SCENARIOS
+from book.explain import check_views
+
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN QUERY PLAN on the queries of every book view and fail if any of them scans a '
+            'whole table or index, or sorts more rows than it returns.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', choices=[label for label, _, _ in SCENARIOS])
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+        parser.add_argument('--allow', nargs='+', default=[], metavar='TABLE',
+                            help='Tables that may be scanned, e.g. small lookup tables.')
+        parser.add_argument('--plans', action='store_true', help='Print every plan, not only the failing ones.')
+
+    def handle(self, *args, **options):
+        try:
+            report = check_views(options['only'], options['seed'], Client(HTTP_HOST=options['host']))
+        except NotSupportedError as e:
+            raise CommandError(e)
+        failures = 0
+        for label, queries in report.items():
+            for sql, details, scans, sorts in queries:
+                scans = [table for table in scans if table not in options['allow']]
+                problems = scans + (['sorts without an index'] if sorts else [])
+                failures += bool(problems)
+                if problems or options['plans']:
+                    style = self.style.ERROR if problems else self.style.MIGRATE_HEADING
+                    self.stdout.write(style('%s: %s' % (label, ', '.join(problems) or 'ok')))
+                    self.stdout.write('  %s' % sql)
+                    for detail in details:
+                        self.stdout.write('    %s' % detail)
+        if failures:
+            raise CommandError('%d queries scan whole tables or sort without an index.' % failures)
+        self.stdout.write(self.style.SUCCESS('No full scans or unindexed sorts in %d scenarios.' % len(report)))
@@ -0,0 +1,37 @@
+import sys
+
+from argparse import ArgumentTypeError
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from book.export import COLUMNS, FORMATS, export
+
+
+def _since(value):
+    since = int(value) if value.isdigit() else parse_datetime(value)
+    if since is None:
+        raise ArgumentTypeError('expected an id or an ISO 8601 timestamp')
+    return since
+
+
+class Command(BaseCommand):
+    help = 'Stream the books, authors or publishers table as CSV or JSON lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(COLUMNS))
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--since', type=_since,
+                            help='Only export rows with a greater id, or changed after an ISO 8601 timestamp.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--output', help='File to write to; defaults to stdout.')
+
+    def handle(self, *args, **options):
+        chunks = export(options['kind'], options['format'], since=options['since'],
+                        compress=options['gzip'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
@@ -0,0 +1,33 @@
+import gzip
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from book.benchmark import SIZES, generate_rows, parse_size
+from book.importer import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = 'Load a synthetic catalog with skewed publishers and authors, for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('books', type=parse_size,
+                            help='Number of books, or one of %s.' % ', '.join(SIZES))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write JSON lines (gzipped for .gz) instead of loading them.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = generate_rows(options['books'], seed=options['seed'])
+        output = options['output']
+        if output:
+            with (gzip.open if output.endswith('.gz') else open)(output, 'wt') as target:
+                for row in rows:
+                    target.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            self.stdout.write(self.style.SUCCESS('Wrote %d books to %s.' % (options['books'], output)))
+            return
+        stats = CatalogImporter(options['batch_size']).run(rows)
+        self.stdout.write(self.style.SUCCESS(
+            'Loaded %d books in %.1fs: %d books, %d authors and %d publishers created.' % (
+                stats.rows, stats.seconds, stats.books_created, stats.authors_created, stats.publishers_created)))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from book.importer import FORMATS, import_catalog
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load books, authors and publishers from CSV or JSON lines (optionally gzipped).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the file extension, or jsonl for stdin.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-update', action='store_false', dest='update_existing',
+                            help='Leave books that already exist untouched.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if '.csv' in path else 'jsonl')
+        if path == '-':
+            stats = import_catalog(sys.stdin.buffer, fmt, options['batch_size'], options['update_existing'])
+        else:
+            try:
+                with open(path, 'rb') as stream:
+                    stats = import_catalog(stream, fmt, options['batch_size'], options['update_existing'])
+            except FileNotFoundError:
+                raise CommandError('No such file: %s' % path)
+        for error in stats.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d rows in %.1fs (%.0f rows/s): %d books created, %d updated, %d publishers and '
+            '%d authors created, %d skipped.' % (
+                stats.rows, stats.seconds, stats.rows_per_second, stats.books_created, stats.books_updated,
+                stats.publishers_created, stats.authors_created, stats.skipped)))
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from book import perf
+
+COLUMNS = [
+    ('time_ms', 'p50'), ('time_ms', 'p99'), ('queries', 'mean'), ('queries', 'max'),
+    ('sql_ms', 'p99'), ('render_ms', 'p99'), ('bytes', 'mean'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Report per-view latency, query and response size percentiles recorded by PerfMiddleware, '
+            'and the page cache hit rate.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory the processes write to; defaults to BOOK_PERF_STATS_DIR.')
+        parser.add_argument('--sort', default='time_ms.p99',
+                            help='Metric to sort by, e.g. queries.mean or requests (default: time_ms.p99).')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON.')
+        parser.add_argument('--cache', action='store_true', help='Report only the page cache counts.')
+        parser.add_argument('--reset', action='store_true', help='Discard everything recorded so far.')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            perf.reset(options['dir'])
+            self.stdout.write(self.style.SUCCESS('Discarded the recorded perf stats.'))
+            return
+        if options['cache']:
+            counts = perf.load_cache_stats(options['dir'])
+            self.stdout.write(json.dumps(counts, indent=2) if options['json'] else self.cache_line(counts))
+            return
+        report = perf.summarize(perf.load(options['dir']))
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write('No requests recorded yet.')
+            return
+        metric, _, stat = options['sort'].partition('.')
+        rows = sorted(report.items(), key=lambda item: -(item[1][metric][stat] if stat else item[1][metric]))
+        width = max(len(name) for name in report)
+        self.stdout.write('%-*s %9s ' % (width, 'view', 'requests') +
+                          ' '.join('%16s' % ('%s.%s' % column) for column in COLUMNS))
+        for name, row in rows:
+            self.stdout.write('%-*s %9d ' % (width, name, row['requests']) +
+                              ' '.join('%16.1f' % row[metric][stat] for metric, stat in COLUMNS))
+        self.stdout.write(self.cache_line(perf.load_cache_stats(options['dir'])))
+
+    def cache_line(self, counts):
+        lookups = counts['hits'] + counts['misses']
+        rate = ' (%.1f%% hit rate)' % (100 * counts['hits'] / lookups) if lookups else ''
+        return 'Page cache: %d hits, %d misses%s, %d bypassed, %d invalidations.' % (
+            counts['hits'], counts['misses'], rate, counts['bypassed'], counts['invalidations'])
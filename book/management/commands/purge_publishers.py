@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from book.models import Publisher
+from book.purge import purge
+
+
+class Command(BaseCommand):
+    help = 'Finish deleting publishers marked for deletion, e.g. after a restart interrupted the worker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Books per transaction; defaults to BOOK_PURGE_BATCH_SIZE.')
+        parser.add_argument('--pause', type=float, help='Seconds between batches; defaults to BOOK_PURGE_PAUSE.')
+
+    def handle(self, *args, **options):
+        pending = Publisher._base_manager.filter(deletion_requested_at__isnull=False).values_list('pk', 'name',
+                                                                                                  'book_count')
+        for pk, name, total in pending:
+            def progress(deleted):
+                self.stdout.write('%s: %d of %d books deleted' % (name, deleted, total))
+            purge(pk, options['batch_size'], options['pause'], progress)
+            self.stdout.write(self.style.SUCCESS('Deleted publisher %s.' % name))
+        if not pending:
+            self.stdout.write('No publishers are waiting to be deleted.')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from book import facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute the book counts per publisher country, city and publication year used by browse/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report counts that drifted.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual, stored = facets.computed(), facets.stored()
+            drifted = [key for key in set(actual) | set(stored) if actual.get(key) != stored.get(key)]
+            self.stdout.write('%d facet counts drifted.' % len(drifted))
+            return
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d facet counts.' % facets.rebuild()))
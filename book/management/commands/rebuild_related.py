@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from book import related
+
+
+class Command(BaseCommand):
+    help = 'Recount the co-author graph and recompute the related books of every book.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report co-author counts that drifted.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual, stored = related.computed(), related.stored()
+            drifted = [key for key in set(actual) | set(stored) if actual.get(key) != stored.get(key)]
+            self.stdout.write('%d co-author counts drifted.' % len(drifted))
+            return
+        pairs, changed = related.rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d co-author counts; %d related lists changed.' % (pairs, changed)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from book.search import create_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every book, author and publisher in the full-text search table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        create_search_index(options['database'])
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from book.counters import drifted, recount
+from book.models import Author, Publisher
+
+
+class Command(BaseCommand):
+    help = 'Fix the book_count and latest_publication_date columns of publishers and authors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report rows that drifted.')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every row instead of looking for drift first.')
+
+    def handle(self, *args, **options):
+        for model in (Publisher, Author):
+            name = model._meta.verbose_name_plural
+            if options['all'] and not options['check']:
+                self.stdout.write('Recounted %d %s.' % (recount(model), name))
+                continue
+            pks = drifted(model)
+            if options['check'] or not pks:
+                self.stdout.write('%d %s drifted.' % (len(pks), name))
+                continue
+            recount(model, pks)
+            self.stdout.write(self.style.SUCCESS('Fixed %d %s.' % (len(pks), name)))
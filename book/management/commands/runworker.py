@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from book import queue
+from book.models import Task
+
+
+class Command(BaseCommand):
+    help = ('Run background tasks (book.queue) in a pool of worker processes until stopped with SIGTERM or '
+            'Ctrl-C; each worker finishes the task it is running first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, help='Worker processes; defaults to BOOK_TASK_WORKERS.')
+        parser.add_argument('--poll', type=float, help='Seconds between looks for due tasks when idle; '
+                                                       'defaults to BOOK_TASK_POLL_INTERVAL.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the tasks that are due in this process, then exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            queue.requeue_stale()
+            ran = queue.work(once=True)
+            counts = queue.counts()
+            self.stdout.write('Ran %d tasks; %s.' % (ran, ', '.join(
+                '%d %s' % (counts.get(state, 0), state) for state, _ in Task.STATES)))
+            return
+        self.stdout.write('Starting %s workers.' % (options['processes'] or 'the default number of'))
+        queue.run_workers(options['processes'], options['poll'])
@@ -0,0 +1,43 @@
+# Generated by Django 2.1.7 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='last_accessed',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='last_accessed',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='headshot',
+            field=models.ImageField(null=True, upload_to='author_headshots'),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='salutation',
+            field=models.CharField(max_length=30),
+        ),
+    ]
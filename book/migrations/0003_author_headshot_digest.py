@@ -0,0 +1,18 @@
+# Generated by Django 2.1.7 on 2026-10-18 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0002_access_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='headshot_digest',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0003_author_headshot_digest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'publisher'], name='book_title_publisher_idx'),
+        ),
+    ]
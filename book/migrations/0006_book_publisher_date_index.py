@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publisher', 'publication_date'], name='book_publisher_date_idx'),
+        ),
+    ]
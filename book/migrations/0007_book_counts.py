@@ -0,0 +1,47 @@
+# Generated by Django 2.1.7 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_books(apps, schema_editor):
+    Book = apps.get_model('book', 'Book')
+    for model_name, relation in (('Publisher', 'publisher'), ('Author', 'authors')):
+        model = apps.get_model('book', model_name)
+        books = Book.objects.filter(**{relation: OuterRef('pk')})
+        counts = books.order_by().values(relation).annotate(count=Count('pk')).values('count')
+        latest = books.order_by('-publication_date').values('publication_date')[:1]
+        model.objects.using(schema_editor.connection.alias).update(
+            book_count=Coalesce(Subquery(counts), Value(0)), latest_publication_date=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0006_book_publisher_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='latest_publication_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='book_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='latest_publication_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(count_books, migrations.RunPython.noop),
+    ]
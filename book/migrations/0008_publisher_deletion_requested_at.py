@@ -0,0 +1,18 @@
+# Generated by Django 2.1.7 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0007_book_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='deletion_requested_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.1.7 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0008_publisher_deletion_requested_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='author',
+            options={'ordering': ['name', 'pk']},
+        ),
+        migrations.AlterModelOptions(
+            name='book',
+            options={'ordering': ['-publication_date', '-pk']},
+        ),
+        migrations.AlterModelOptions(
+            name='publisher',
+            options={'ordering': ['-name', '-pk']},
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='publisher',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['name'], name='author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-book_count', 'name'], name='author_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publication_date'], name='book_publication_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['name'], name='publisher_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['-book_count', 'name'], name='publisher_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['deletion_requested_at'], name='publisher_deletion_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.1.7 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+
+def count_facets(apps, schema_editor):
+    Book = apps.get_model('book', 'Book')
+    FacetCount = apps.get_model('book', 'FacetCount')
+    using = schema_editor.connection.alias
+    rows = (Book.objects.using(using).order_by().annotate(year=ExtractYear('publication_date'))
+            .values_list('publisher__country', 'publisher__city', 'year').annotate(books=Count('pk')))
+    FacetCount.objects.using(using).bulk_create(
+        [FacetCount(country=country, city=city, year=year, books=books) for country, city, year, books in rows],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0009_indexes_and_orderings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(max_length=50)),
+                ('city', models.CharField(max_length=60)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('books', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='facetcount',
+            index=models.Index(fields=['city', 'year'], name='facet_city_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facetcount',
+            index=models.Index(fields=['year', 'country'], name='facet_year_country_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='facetcount',
+            unique_together={('country', 'city', 'year')},
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.1.7 on 2026-10-18 17:41
+
+from collections import Counter
+from itertools import permutations
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def count_coauthors(apps, schema_editor):
+    Book = apps.get_model('book', 'Book')
+    CoAuthor = apps.get_model('book', 'CoAuthor')
+    Task = apps.get_model('book', 'Task')
+    using = schema_editor.connection.alias
+    authors = {}
+    for book_id, author_id in Book.authors.through.objects.using(using).values_list('book_id', 'author_id'):
+        authors.setdefault(book_id, []).append(author_id)
+    pairs = Counter()
+    for book_authors in authors.values():
+        pairs.update(permutations(book_authors, 2))
+    CoAuthor.objects.using(using).bulk_create(
+        [CoAuthor(author_id=author, coauthor_id=coauthor, books=books) for (author, coauthor), books in pairs.items()],
+        batch_size=500)
+    # The related lists take a while; the workers fill them in.
+    if Book.objects.using(using).exists():
+        Task.objects.using(using).create(name='rebuild_related', kwargs='{}', priority=-10, max_attempts=3,
+                                         run_after=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0011_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('books', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='book.Author')),
+                ('coauthor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coauthorships', to='book.Author')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedBook',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='book.Book')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='book.Book')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='relatedbook',
+            index=models.Index(fields=['book', '-score', '-related'], name='related_top_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedbook',
+            unique_together={('book', 'related')},
+        ),
+        migrations.AddIndex(
+            model_name='coauthor',
+            index=models.Index(fields=['author', '-books', 'coauthor'], name='coauthor_top_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coauthor',
+            unique_together={('author', 'coauthor')},
+        ),
+        migrations.RunPython(count_coauthors, migrations.RunPython.noop),
+    ]
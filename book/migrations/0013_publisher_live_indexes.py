@@ -0,0 +1,37 @@
+# Generated by Django 2.1.7 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0012_coauthor_graph'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='publisher',
+            name='publisher_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='publisher',
+            name='publisher_popular_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='publisher',
+            name='publisher_deletion_idx',
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['deletion_requested_at', 'name'], name='publisher_live_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['deletion_requested_at', '-book_count', 'name'], name='publisher_live_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['deletion_requested_at', 'updated_at'], name='publisher_live_updated_idx'),
+        ),
+    ]
@@ -1,6 +1,65 @@
+from django.core.files.storage import default_storage
 from django.db import models
 from django.urls import reverse
 
+from book.thumbnails import SIZES, derivative_name
+
+
+class PublisherQuerySet(models.QuerySet):
+
+    def for_list(self):
+        return self.only('id', 'name', 'book_count')
+
+    def for_detail(self):
+        return self
+
+
+class PublisherManager(models.Manager.from_queryset(PublisherQuerySet)):
+
+    def get_queryset(self):
+        # Publishers being deleted by book.purge are hidden everywhere.
+        return super().get_queryset().filter(deletion_requested_at=None)
+
+
+class AuthorQuerySet(models.QuerySet):
+
+    def for_list(self):
+        return self.only('id', 'name', 'book_count')
+
+    def for_detail(self):
+        return self.only('id', 'salutation', 'name', 'email', 'headshot', 'headshot_digest',
+                         'last_accessed', 'view_count', 'book_count', 'latest_publication_date')
+
+
+class BookQuerySet(models.QuerySet):
+
+    def with_related(self):
+        # One JOIN for the publisher and one extra query for every author on
+        # the page, however many rows are rendered.
+        authors = models.Prefetch('authors', queryset=Author.objects.only('id', 'name'))
+        return self.select_related('publisher').prefetch_related(authors)
+
+    def for_list(self):
+        return self.with_related().only('id', 'title', 'publisher__name')
+
+    def for_publisher(self, publisher):
+        return self.filter(publisher=publisher).order_by('-publication_date', '-pk').only(
+            'id', 'title', 'publication_date')
+
+    def for_detail(self):
+        return self.with_related().only('id', 'title', 'publication_date', 'last_accessed', 'view_count',
+                                        'publisher__name')
+
+
+class BookManager(models.Manager.from_queryset(BookQuerySet)):
+
+    def get_queryset(self):
+        # The books of publishers being deleted are hidden along with them. A
+        # NOT IN over the few deleting publishers, rather than a filter across
+        # the join, leaves the planner free to walk the book indexes in order.
+        deleting = Publisher._base_manager.filter(deletion_requested_at__isnull=False)
+        return super().get_queryset().exclude(publisher__in=deleting)
+
 
 class Publisher(models.Model):
     name = models.CharField(max_length=30)
@@ -9,9 +68,27 @@ class Publisher(models.Model):
     state_province = models.CharField(max_length=30)
     country = models.CharField(max_length=50)
     website = models.URLField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by book.counters, never through save().
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_publication_date = models.DateField(null=True, editable=False)
+    deletion_requested_at = models.DateTimeField(null=True, editable=False)
+
+    objects = PublisherManager()
 
     class Meta:
-        ordering = ["-name"]
+        # The primary key breaks ties, so pages never overlap or skip rows.
+        ordering = ["-name", "-pk"]
+        # Every query through Publisher.objects filters on deletion_requested_at
+        # IS NULL, so each index leads with it; the ordering columns follow.
+        indexes = [
+            # Read backwards, serves the default ordering without sorting.
+            models.Index(fields=['deletion_requested_at', 'name'], name='publisher_live_name_idx'),
+            # Serves ?sort=popular, most books first.
+            models.Index(fields=['deletion_requested_at', '-book_count', 'name'], name='publisher_live_popular_idx'),
+            # MAX(updated_at) of the live publishers, for the list page's validators.
+            models.Index(fields=['deletion_requested_at', 'updated_at'], name='publisher_live_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,9 +99,37 @@ class Author(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField()
     headshot = models.ImageField(upload_to='author_headshots', null=True)
+    # Content hash of the headshot, set once book.thumbnails has written its derivatives.
+    headshot_digest = models.CharField(max_length=16, blank=True, editable=False)
+    # Maintained in bulk by book.tracking, never through save().
+    last_accessed = models.DateTimeField(null=True, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by book.counters, never through save().
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_publication_date = models.DateField(null=True, editable=False)
+
+    objects = AuthorQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name', 'pk']
+        indexes = [
+            models.Index(fields=['name'], name='author_name_idx'),
+            models.Index(fields=['-book_count', 'name'], name='author_popular_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def headshot_url(self, size, fmt='jpeg'):
+        # Serve the original until the derivatives exist.
+        if self.headshot_digest:
+            return default_storage.url(derivative_name(self.headshot_digest, size, fmt))
+        return self.headshot.url if self.headshot else ''
+
+    @property
+    def headshot_thumbnails(self):
+        return {fmt: self.headshot_url(SIZES[-1], fmt) for fmt in ('webp', 'jpeg')}
     #
     # def get_absolute_url(self):
     #     return reverse('books:author-detail', kwargs={'pk': self.pk})
@@ -35,6 +140,108 @@ class Book(models.Model):
     authors = models.ManyToManyField('Author')
     publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE)
     publication_date = models.DateField()
+    last_accessed = models.DateTimeField(null=True, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Also bumped when the book's authors change; see book.conditional.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BookManager()
+
+    class Meta:
+        # Newest first, as the catalog and every publisher page list them.
+        ordering = ['-publication_date', '-pk']
+        indexes = [
+            models.Index(fields=['publication_date'], name='book_publication_date_idx'),
+            # Lets bulk imports match incoming rows to existing books.
+            models.Index(fields=['title', 'publisher'], name='book_title_publisher_idx'),
+            # Serves a publisher's books newest first, and their count, from the index alone.
+            models.Index(fields=['publisher', 'publication_date'], name='book_publisher_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class FacetCount(models.Model):
+    """Books per publisher country, city and publication year; maintained by book.facets."""
+    country = models.CharField(max_length=50)
+    city = models.CharField(max_length=60)
+    year = models.PositiveSmallIntegerField()
+    books = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('country', 'city', 'year')]
+        indexes = [
+            # With the unique index, every facet has an index that leads with it,
+            # for both filtering by it and grouping by it.
+            models.Index(fields=['city', 'year'], name='facet_city_year_idx'),
+            models.Index(fields=['year', 'country'], name='facet_year_country_idx'),
+        ]
+
+    def __str__(self):
+        return '%s, %s, %s: %d' % (self.city, self.country, self.year, self.books)
+
+
+class CoAuthor(models.Model):
+    """How many books two authors wrote together, stored in both directions; maintained by book.related."""
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='+')
+    coauthor = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='coauthorships')
+    books = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('author', 'coauthor')]
+        indexes = [
+            # An author's most frequent collaborators, read in order.
+            models.Index(fields=['author', '-books', 'coauthor'], name='coauthor_top_idx'),
+        ]
+
+    def __str__(self):
+        return '%s & %s: %d' % (self.author_id, self.coauthor_id, self.books)
+
+
+class RelatedBook(models.Model):
+    """One of the best-scored related books of a book; maintained by book.related."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [('book', 'related')]
+        indexes = [
+            models.Index(fields=['book', '-score', '-related'], name='related_top_idx'),
+        ]
+
+    def __str__(self):
+        return '%s -> %s: %d' % (self.book_id, self.related_id, self.score)
+
+
+class Task(models.Model):
+    """A unit of background work; see book.queue."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    # JSON-encoded keyword arguments.
+    kwargs = models.TextField(default='{}')
+    priority = models.SmallIntegerField(default=0)
+    state = models.CharField(max_length=10, choices=STATES, default=QUEUED)
+    # Idempotency key, held only while the task waits to be picked up.
+    key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-pk']
+        indexes = [
+            # Workers claim the most urgent due task from this index alone.
+            models.Index(fields=['state', '-priority', 'run_after'], name='task_claim_idx'),
+        ]
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.name, self.pk, self.state)
@@ -0,0 +1,12 @@
+"""Rows for the tests: ``mommy.make_recipe('book.publisher')`` and friends."""
+from model_mommy.recipe import Recipe, foreign_key, seq
+
+from book.models import Author, Book, Publisher
+
+publisher = Recipe(
+    Publisher, name=seq('ali '), address='ryk', city='bwp', state_province='punjab', country='pak',
+    website='https://www.google.com/')
+
+author = Recipe(Author, salutation='sir', name=seq('ali '), email='shah870@gmail.com')
+
+book = Recipe(Book, title=seq('python '), publisher=foreign_key(publisher))
@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<KeysetPage of %d>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek pagination on the queryset ordering plus the primary key.
+
+    Each page is a single ``WHERE (ordering) > (last row) LIMIT n + 1`` query:
+    there is no OFFSET to walk past and no COUNT. Pages are addressed by opaque
+    cursors that encode the ordering values of the row at the page boundary.
+    Ordering fields must be non-null columns of the model itself.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = self._keyset_ordering(queryset)
+
+    def _keyset_ordering(self, queryset):
+        opts = queryset.model._meta
+        ordering = []
+        for name in queryset.query.order_by or opts.ordering:
+            if not isinstance(name, str) or name == '?':
+                raise ValueError('Keyset pagination needs plain field orderings, got %r.' % (name,))
+            descending = name.startswith('-')
+            field = opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-'))
+            ordering.append((field, descending))
+        if not any(field.primary_key for field, _ in ordering):
+            # The primary key makes every position unique, so ties on the
+            # leading columns can never repeat or skip rows between pages.
+            ordering.append((opts.pk, False))
+        return ordering
+
+    def _order_by(self, reverse):
+        return ['%s%s' % ('-' if descending != reverse else '', field.name)
+                for field, descending in self.ordering]
+
+    def _seek(self, values, reverse):
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal) & Q(**{'%s__%s' % (field.name, lookup): value})
+            equal[field.name] = value
+        return condition
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [field.value_to_string(obj) for field, _ in self.ordering]
+        data = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+            values = data['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [field.to_python(value) for (field, _), value in zip(self.ordering, values)]
+            return values, bool(data['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise Http404('Invalid cursor.')
+
+    def page(self, cursor):
+        values, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return KeysetPage(rows, self)
+        if reverse:
+            rows.reverse()
+            next_cursor = self.encode_cursor(rows[-1])
+            previous_cursor = self.encode_cursor(rows[0], reverse=True) if has_more else None
+        else:
+            next_cursor = self.encode_cursor(rows[-1]) if has_more else None
+            previous_cursor = self.encode_cursor(rows[0], reverse=True) if values is not None else None
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Serve list pages with a KeysetPaginator, starting at the first page when
+    there is no ``?cursor=``. The templates only link to the previous and next
+    pages, so nothing needs the COUNT and OFFSET of numbered pages; ``?page=``
+    requests, from links made before cursors, still get them.
+    """
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET and self.cursor_kwarg not in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg, ''))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class SortMixin:
+    """
+    Let ``?sort=`` pick one of ``sort_orderings`` instead of the default
+    ordering. Orderings should be on indexed, non-null columns so they also
+    work with keyset pagination.
+    """
+    sort_kwarg = 'sort'
+    sort_orderings = {}
+
+    def get_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get(self.sort_kwarg), super().get_ordering())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        sort = self.request.GET.get(self.sort_kwarg)
+        context['sort'] = sort if sort in self.sort_orderings else ''
+        return context
@@ -0,0 +1,290 @@
+"""
+Per-view latency and query instrumentation.
+
+``PerfMiddleware`` measures every request and records it under the URL name of
+the view that served it (``books:book_list``, ``books:publisher-detail``, ...):
+wall time, number of SQL queries, time spent in SQL, template render time and
+response size. Each measurement goes into a fixed-size log-bucketed histogram,
+so memory does not grow with traffic and percentiles stay within one bucket
+(about 19%) of the exact value.
+
+Every process periodically writes its histograms to ``BOOK_PERF_STATS_DIR``,
+along with the hit and miss counts of its page cache (``book.cache.stats``).
+Histograms with the same buckets simply add up, and so do counts, which is how
+the ``perfstats`` command and the ``perf/`` endpoint report on all processes
+at once.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from book.cache import stats as cache_stats
+
+logger = logging.getLogger(__name__)
+
+# metric: (lowest bucket bound, highest bucket bound)
+METRICS = {
+    'time_ms': (0.1, 10 ** 6),
+    'queries': (1, 10 ** 5),
+    'sql_ms': (0.1, 10 ** 6),
+    'render_ms': (0.1, 10 ** 6),
+    'bytes': (64, 2 ** 32),
+}
+
+UNRESOLVED = '<unresolved>'
+
+
+def _bounds(lowest, highest, steps_per_doubling=4):
+    bounds, bound = [], float(lowest)
+    while bound < highest:
+        bounds.append(bound)
+        bound *= 2 ** (1 / steps_per_doubling)
+    return bounds
+
+
+BOUNDS = {metric: _bounds(*limits) for metric, limits in METRICS.items()}
+
+
+class Histogram:
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One bucket per bound for values up to it, plus one for everything larger.
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {'counts': {index: count for index, count in enumerate(self.counts) if count},
+                'count': self.count, 'total': self.total, 'max': self.max}
+
+    def merge(self, data):
+        for index, count in data['counts'].items():
+            self.counts[int(index)] += count
+        self.count += data['count']
+        self.total += data['total']
+        self.max = max(self.max, data['max'])
+
+    def summary(self):
+        return {
+            'mean': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50': round(self.percentile(50), 2),
+            'p90': round(self.percentile(90), 2),
+            'p99': round(self.percentile(99), 2),
+            'max': round(self.max, 2),
+        }
+
+
+def _histograms():
+    return {metric: Histogram(bounds) for metric, bounds in BOUNDS.items()}
+
+
+def summarize(views):
+    """Turn ``{url name: {metric: Histogram}}`` into plain numbers, busiest view first."""
+    report = {}
+    for name, histograms in sorted(views.items(), key=lambda item: -item[1]['time_ms'].count):
+        report[name] = {'requests': histograms['time_ms'].count}
+        report[name].update((metric, histogram.summary()) for metric, histogram in histograms.items())
+    return report
+
+
+class PerfRegistry:
+
+    def __init__(self, flush_interval=30):
+        self.flush_interval = flush_interval
+        self.path = None
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+        self._dirty = False
+
+    def record(self, name, values):
+        with self._lock:
+            histograms = self._views.get(name)
+            if histograms is None:
+                histograms = self._views[name] = _histograms()
+            for metric, value in values.items():
+                if value is not None:
+                    histograms[metric].record(value)
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {metric: histogram.as_dict() for metric, histogram in histograms.items()}
+                    for name, histograms in self._views.items()}
+
+    def clear(self):
+        with self._lock:
+            self._views = {}
+
+    def flush(self):
+        """Write this process's histograms to ``BOOK_PERF_STATS_DIR``, if set."""
+        directory = getattr(settings, 'BOOK_PERF_STATS_DIR', None)
+        self._last_flush = time.monotonic()
+        self._dirty = False
+        if not directory:
+            return None
+        if self.path is None or os.path.dirname(self.path) != directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, 'perf-%d-%s.json' % (os.getpid(), uuid.uuid4().hex[:8]))
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as output:
+            json.dump({'views': self.snapshot(), 'cache': cache_stats.snapshot()}, output)
+        os.replace(temporary, self.path)
+        return self.path
+
+    def flush_if_due(self):
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+
+registry = PerfRegistry(getattr(settings, 'BOOK_PERF_FLUSH_INTERVAL', 30))
+
+
+def flush_perf_stats(**kwargs):
+    registry.flush_if_due()
+
+
+def _snapshots(directory):
+    directory = directory or getattr(settings, 'BOOK_PERF_STATS_DIR', None)
+    if not directory or not os.path.isdir(directory):
+        return [{'views': registry.snapshot(), 'cache': cache_stats.snapshot()}]
+    snapshots = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith('perf-') and filename.endswith('.json'):
+            try:
+                with open(os.path.join(directory, filename)) as source:
+                    snapshot = json.load(source)
+            except (OSError, ValueError):
+                logger.warning('Skipping unreadable perf stats file %r.', filename)
+                continue
+            # Files written before the cache counts were added hold only histograms.
+            snapshots.append(snapshot if 'views' in snapshot else {'views': snapshot, 'cache': {}})
+    return snapshots
+
+
+def load(directory=None):
+    """Merge the histograms of every process that wrote to ``directory``."""
+    views = {}
+    for snapshot in _snapshots(directory):
+        for name, metrics in snapshot['views'].items():
+            histograms = views.setdefault(name, _histograms())
+            for metric, data in metrics.items():
+                if metric in histograms:
+                    histograms[metric].merge(data)
+    return views
+
+
+def load_cache_stats(directory=None):
+    """Add up the page cache counts of every process that wrote to ``directory``."""
+    counts = dict.fromkeys(cache_stats.snapshot(), 0)
+    for snapshot in _snapshots(directory):
+        for name, count in snapshot['cache'].items():
+            counts[name] = counts.get(name, 0) + count
+    return counts
+
+
+def reset(directory=None):
+    registry.clear()
+    cache_stats.clear()
+    directory = directory or getattr(settings, 'BOOK_PERF_STATS_DIR', None)
+    if directory and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.startswith('perf-'):
+                os.remove(os.path.join(directory, filename))
+
+
+class _Probe:
+
+    def __init__(self, keep_sql):
+        self.keep_sql = keep_sql
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.sql = []
+        self.render_started = None
+        self.render_seconds = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.sql_seconds += duration
+            if self.keep_sql:
+                self.sql.append((duration, sql))
+
+    def rendered(self, response):
+        self.render_seconds = time.perf_counter() - self.render_started
+
+
+class PerfMiddleware:
+    """
+    Record each request in ``registry``. Set ``BOOK_PERF_SLOW_REQUEST_MS`` to
+    also log the SQL of requests slower than that. Streaming responses are
+    measured up to the first byte.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'BOOK_PERF_SLOW_REQUEST_MS', None)
+
+    def __call__(self, request):
+        probe = request._perf_probe = _Probe(keep_sql=self.slow_ms is not None)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(probe))
+            response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        name = match.view_name if match and match.url_name else UNRESOLVED
+        registry.record(name, {
+            'time_ms': elapsed_ms,
+            'queries': probe.queries,
+            'sql_ms': probe.sql_seconds * 1000,
+            'render_ms': probe.render_seconds * 1000 if probe.render_seconds is not None else None,
+            'bytes': None if response.streaming else len(response.content),
+        })
+        if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+            logger.warning(
+                'Slow request: %s %s (%s) took %.1f ms with %d queries (%.1f ms):\n%s',
+                request.method, request.get_full_path(), name, elapsed_ms, probe.queries,
+                probe.sql_seconds * 1000, '\n'.join('%8.1f ms  %s' % (duration * 1000, sql)
+                                                   for duration, sql in probe.sql))
+        return response
+
+    def process_template_response(self, request, response):
+        # Templates are rendered right after the last of these hooks returns.
+        probe = getattr(request, '_perf_probe', None)
+        if probe is not None:
+            probe.render_started = time.perf_counter()
+            response.add_post_render_callback(probe.rendered)
+        return response
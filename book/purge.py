@@ -0,0 +1,120 @@
+"""
+Background deletion of publishers with many books.
+
+Deleting a publisher through the ORM collects every book and author link into
+memory and deletes them in one transaction, holding the SQLite write lock for
+as long as that takes. Instead, ``request_deletion`` only marks the publisher,
+which hides it and its books from ``Publisher.objects`` and ``Book.objects``
+at once, and a worker then deletes its books, their author links and related
+lists in small raw batches, one short transaction each, before deleting the
+publisher row itself. The work is a ``book.queue`` task, run by
+``manage.py runworker``. ``book_count`` goes down with every batch, so it
+doubles as the progress of the deletion.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from book import facets, queue, related
+from book.cache import invalidate
+from book.counters import adjust
+from book.models import Author, Book, Publisher, RelatedBook
+
+logger = logging.getLogger(__name__)
+
+
+def batch_size():
+    return getattr(settings, 'BOOK_PURGE_BATCH_SIZE', 500)
+
+
+def request_deletion(publisher):
+    """
+    Delete ``publisher`` right away if it has at most one batch of books;
+    otherwise hide it and queue its deletion. Return whether the deletion was
+    deferred.
+    """
+    if publisher.book_count <= batch_size():
+        publisher.delete()
+        return False
+    Publisher.objects.filter(pk=publisher.pk).update(deletion_requested_at=timezone.now())
+    invalidate(Publisher, [publisher.pk])
+    # Its books disappear with it, from the lists and their own pages.
+    invalidate(Book, Book._base_manager.filter(publisher_id=publisher.pk).values_list('pk', flat=True))
+    queue.enqueue('purge_publisher', key='purge_publisher:%d' % publisher.pk, publisher_pk=publisher.pk)
+    return True
+
+
+def purge_batch(publisher_pk, size):
+    """Delete up to ``size`` books of a publisher with their author links; return how many went."""
+    using = router.db_for_write(Book)
+    with transaction.atomic(using=using):
+        rows = list(Book._base_manager.using(using).filter(publisher_id=publisher_pk)
+                    .order_by('pk').values_list('pk', 'publication_date')[:size])
+        if not rows:
+            return 0
+        pks = [pk for pk, _ in rows]
+        Through = Book.authors.through
+        before = {pk: set() for pk in pks}
+        for book_id, author_id in Through.objects.using(using).filter(book_id__in=pks).values_list(
+                'book_id', 'author_id'):
+            before[book_id].add(author_id)
+        authors = Counter(author_pk for book_authors in before.values() for author_pk in book_authors)
+        # Other publishers' books listing these need new lists.
+        listed = set(RelatedBook.objects.using(using).filter(related_id__in=pks).exclude(book_id__in=pks)
+                     .values_list('book_id', flat=True))
+        RelatedBook.objects.using(using).filter(book_id__in=pks).delete()
+        RelatedBook.objects.using(using).filter(related_id__in=pks).delete()
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connections[using].cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+                Through._meta.db_table, Through._meta.get_field('book').column, placeholders), pks)
+            cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+                Book._meta.db_table, Book._meta.pk.column, placeholders), pks)
+        by_count = {}
+        for author_pk, count in authors.items():
+            by_count.setdefault(count, []).append(author_pk)
+        for count, author_pks in by_count.items():
+            adjust(Author, author_pks, -count)
+        adjust(Publisher, [publisher_pk], -len(pks))
+        location = tuple(Publisher._base_manager.values_list('country', 'city').get(pk=publisher_pk))
+        facets.add({location + (year,): -count for year, count in Counter(date.year for _, date in rows).items()})
+        related.apply(before, {}, listed)
+        invalidate(Book, pks)
+        if authors:
+            invalidate(Author)
+    return len(pks)
+
+
+def purge(publisher_pk, size=None, pause=None, progress=None):
+    """
+    Delete a publisher marked by ``request_deletion`` batch by batch, calling
+    ``progress(deleted)`` after each one. Safe to run again after a crash.
+    """
+    if not Publisher._base_manager.filter(pk=publisher_pk, deletion_requested_at__isnull=False).exists():
+        return 0
+    size = size or batch_size()
+    pause = getattr(settings, 'BOOK_PURGE_PAUSE', 0.05) if pause is None else pause
+    deleted = 0
+    while True:
+        count = purge_batch(publisher_pk, size)
+        if not count:
+            break
+        deleted += count
+        if progress:
+            progress(deleted)
+        # Let other writers take the database lock between batches.
+        time.sleep(pause)
+    Publisher._base_manager.get(pk=publisher_pk).delete()
+    logger.info('Deleted publisher %s and its %d books.', publisher_pk, deleted)
+    return deleted
+
+
+def deletion_status(publisher):
+    if publisher.deletion_requested_at is None:
+        return {'state': 'active', 'books': publisher.book_count}
+    return {'state': 'deleting', 'requested_at': publisher.deletion_requested_at,
+            'books_remaining': publisher.book_count}
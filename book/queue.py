@@ -0,0 +1,206 @@
+"""
+A task queue with a table in the catalog database as its broker.
+
+Views ``enqueue`` slow work, such as deleting a large publisher or resizing a
+headshot, as a ``Task`` row written in the same transaction as the change that
+needs it, and return. ``manage.py runworker`` forks a few processes that each
+claim the most urgent due task with a conditional UPDATE, so no two processes
+run the same task, and run it outside any request. A task that raises is
+retried with exponential backoff until it has used its ``max_attempts``; one
+whose worker died is queued again after ``BOOK_TASK_STALE_AFTER`` seconds.
+
+Tasks are plain functions registered with ``@task`` in ``book.tasks`` and take
+JSON-serializable keyword arguments. An idempotency ``key`` keeps at most one
+copy of a piece of work waiting: enqueueing with the key of a queued task
+returns that task. A worker releases the key when it picks the task up, so
+work asked for while the task runs is queued again rather than lost.
+"""
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import traceback
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from book.models import Task
+
+logger = logging.getLogger(__name__)
+
+Registered = namedtuple('Registered', 'func priority max_attempts')
+
+# name: Registered
+TASKS = {}
+
+_stop = threading.Event()
+
+
+def task(name, priority=0, max_attempts=3):
+    """Register the decorated function as the task ``name``."""
+    def register(func):
+        TASKS[name] = Registered(func, priority, max_attempts)
+        return func
+    return register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, key=None, priority=None, delay=0, **kwargs):
+    """
+    Queue ``name(**kwargs)`` to run ``delay`` seconds from now or later. With
+    a ``key``, return the queued task holding it instead if there is one.
+    """
+    registered = TASKS[name]
+    fields = {
+        'name': name,
+        'kwargs': json.dumps(kwargs, sort_keys=True, cls=DjangoJSONEncoder),
+        'priority': registered.priority if priority is None else priority,
+        'max_attempts': registered.max_attempts,
+        'run_after': timezone.now() + datetime.timedelta(seconds=delay),
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    while True:
+        try:
+            with transaction.atomic():
+                return Task.objects.create(key=key, **fields)
+        except IntegrityError:
+            # Unless a worker picked it up in the meantime, releasing the key.
+            waiting = Task.objects.filter(key=key).first()
+            if waiting is not None:
+                return waiting
+
+
+def claim(worker=''):
+    """Mark the most urgent due task as running and return it, or None."""
+    now = timezone.now()
+    due = Task.objects.filter(state=Task.QUEUED, run_after__lte=now).order_by('-priority', 'run_after', 'pk')
+    while True:
+        pk = due.values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        # Another worker may have claimed it since; then try the next one.
+        if Task.objects.filter(pk=pk, state=Task.QUEUED).update(
+                state=Task.RUNNING, key=None, attempts=F('attempts') + 1, started_at=now, worker=worker):
+            return Task.objects.get(pk=pk)
+
+
+def run(claimed):
+    """Run a claimed task and record the outcome; return whether it succeeded."""
+    try:
+        registered = TASKS.get(claimed.name)
+        if registered is None:
+            raise LookupError('No task is registered as %r.' % claimed.name)
+        registered.func(**json.loads(claimed.kwargs))
+    except Exception:
+        logger.exception('Task %s failed on attempt %d of %d.', claimed, claimed.attempts, claimed.max_attempts)
+        _failed(Task.objects.filter(pk=claimed.pk), claimed.attempts, claimed.max_attempts, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=claimed.pk).update(state=Task.DONE, finished_at=timezone.now(), error='')
+    return True
+
+
+def _failed(tasks, attempts, max_attempts, error):
+    now = timezone.now()
+    if attempts < max_attempts:
+        delay = getattr(settings, 'BOOK_TASK_RETRY_DELAY', 10) * 2 ** (attempts - 1)
+        tasks.update(state=Task.QUEUED, run_after=now + datetime.timedelta(seconds=delay), worker='', error=error)
+    else:
+        tasks.update(state=Task.FAILED, finished_at=now, error=error)
+
+
+def requeue_stale(stale_after=None):
+    """Retry or fail tasks left running by a worker that died; return how many."""
+    stale_after = getattr(settings, 'BOOK_TASK_STALE_AFTER', 3600) if stale_after is None else stale_after
+    stale = Task.objects.filter(state=Task.RUNNING,
+                                started_at__lt=timezone.now() - datetime.timedelta(seconds=stale_after))
+    error = 'The worker stopped while running the task.'
+    retried = stale.filter(attempts__lt=F('max_attempts')).update(
+        state=Task.QUEUED, run_after=timezone.now(), worker='', error=error)
+    failed = stale.update(state=Task.FAILED, finished_at=timezone.now(), error=error)
+    return retried + failed
+
+
+def prune(days=None):
+    """Delete tasks that finished successfully more than ``days`` ago."""
+    days = getattr(settings, 'BOOK_TASK_KEEP_DAYS', 7) if days is None else days
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    return Task.objects.filter(state=Task.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def counts():
+    return dict(Task.objects.order_by().values_list('state').annotate(tasks=Count('pk')))
+
+
+def work(once=False, poll=None):
+    """
+    Claim and run due tasks until ``stop()`` is called, or with ``once`` until
+    none is due. Return how many tasks ran.
+    """
+    poll = getattr(settings, 'BOOK_TASK_POLL_INTERVAL', 1.0) if poll is None else poll
+    worker = '%s:%d' % (socket.gethostname(), os.getpid())
+    ran = 0
+    while not _stop.is_set():
+        # Long-running processes must drop broken or expired connections themselves.
+        close_old_connections()
+        claimed = claim(worker)
+        if claimed is None:
+            if once:
+                break
+            _stop.wait(poll)
+            continue
+        run(claimed)
+        ran += 1
+    return ran
+
+
+def stop(*args):
+    """Let ``work`` return after the task it is running; usable as a signal handler."""
+    _stop.set()
+
+
+def _process(poll):
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    work(poll=poll)
+    connections.close_all()
+
+
+def run_workers(processes=None, poll=None):
+    """Fork ``processes`` workers and restart any that die until SIGTERM or SIGINT."""
+    processes = processes or getattr(settings, 'BOOK_TASK_WORKERS', 2)
+    requeue_stale()
+    prune()
+    # Forked children must not share the parent's database connections.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    _stop.clear()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    children = []
+    while not _stop.is_set():
+        for child in [child for child in children if not child.is_alive()]:
+            logger.warning('Worker %s exited with %s; starting another.', child.pid, child.exitcode)
+            children.remove(child)
+        while len(children) < processes:
+            child = context.Process(target=_process, args=(poll,), daemon=True)
+            child.start()
+            children.append(child)
+        _stop.wait(1)
+    for child in children:
+        if child.is_alive():
+            os.kill(child.pid, signal.SIGTERM)
+    for child in children:
+        child.join()
@@ -0,0 +1,285 @@
+"""
+The co-authorship graph behind the "related books" and "frequent collaborators"
+sections of the book and author detail pages.
+
+``CoAuthor`` is the graph as an adjacency table: one row per ordered pair of
+authors with the number of books they wrote together, so an author's
+collaborators are one index range, read in order. Every change to a book's
+authors is recorded by diffing its author pairs before and after the change
+(``apply``): the signal receivers below do it for ``Book.authors`` and book
+deletions, and the importer and ``book.purge``, which write links without
+signals, call ``apply`` themselves.
+
+``RelatedBook`` holds the ``RELATED_LIMIT`` best books for every book. A
+candidate scores ``SHARED_AUTHOR`` for every author it shares, the number of
+books its other authors wrote with the book's authors (counting each author's
+``COLLABORATORS`` most frequent collaborators), and ``SAME_PUBLISHER`` if
+both have the same publisher. A change to one book moves the scores of every
+book by the same authors, so ``apply`` queues the ``refresh_related`` task
+for all of them; lists are never computed during a request.
+"""
+from collections import Counter
+from itertools import permutations
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from book import queue
+from book.cache import invalidate
+from book.models import Author, Book, CoAuthor, RelatedBook
+
+BATCH_SIZE = 500
+
+RELATED_LIMIT = 5
+COLLABORATOR_LIMIT = 5
+
+# Collaborators of each author whose books are candidates.
+COLLABORATORS = 10
+
+SHARED_AUTHOR = 10
+SAME_PUBLISHER = 1
+
+Through = Book.authors.through
+
+
+def _batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _pairs(authors_by_book):
+    pairs = Counter()
+    for authors in authors_by_book.values():
+        pairs.update(permutations(authors, 2))
+    return pairs
+
+
+def authors_of(book_pks):
+    """Return ``{book pk: {author pks}}`` for ``book_pks``, with an empty set for books without authors."""
+    authors = {pk: set() for pk in book_pks}
+    for batch in _batches(authors):
+        for book_id, author_id in Through.objects.filter(book_id__in=batch).values_list('book_id', 'author_id'):
+            authors[book_id].add(author_id)
+    return authors
+
+
+def add(deltas):
+    """Add ``{(author pk, coauthor pk): change}`` to the pair counts."""
+    deltas = {pair: change for pair, change in deltas.items() if change}
+    existing = {}
+    # One index range per author, matched here rather than with an OR per pair.
+    for authors in _batches(sorted({author for author, _ in deltas})):
+        rows = CoAuthor.objects.filter(author_id__in=authors).values_list('pk', 'author_id', 'coauthor_id')
+        existing.update(((author, coauthor), pk) for pk, author, coauthor in rows if (author, coauthor) in deltas)
+    by_change = {}
+    for pair, pk in existing.items():
+        by_change.setdefault(deltas[pair], []).append(pk)
+    for change, pks in by_change.items():
+        for batch in _batches(pks):
+            CoAuthor.objects.filter(pk__in=batch).update(books=F('books') + change)
+            if change < 0:
+                CoAuthor.objects.filter(pk__in=batch, books__lte=0).delete()
+    missing = [CoAuthor(author_id=author, coauthor_id=coauthor, books=change)
+               for (author, coauthor), change in deltas.items() if (author, coauthor) not in existing and change > 0]
+    if missing:
+        try:
+            with transaction.atomic():
+                CoAuthor.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        except IntegrityError:
+            # Another process created some of them in the meantime; now they exist.
+            add({(row.author_id, row.coauthor_id): row.books for row in missing})
+
+
+def apply(before, after, listed=()):
+    """
+    Record that books changed from the authors in ``before`` to those in
+    ``after`` (both ``{book pk: {author pks}}``) and queue a refresh of the
+    related lists of those books, of every book by their authors and of the
+    ``listed`` books.
+    """
+    deltas = _pairs(after)
+    deltas.subtract(_pairs(before))
+    deltas = {pair: change for pair, change in deltas.items() if change}
+    if deltas:
+        add(deltas)
+        # Their collaborators show on their own pages and on their books' pages,
+        # which follow the Author model version; one bump covers the batch.
+        changed = sorted({author for author, _ in deltas})
+        for batch in _batches(changed):
+            Author.objects.filter(pk__in=batch).update(updated_at=timezone.now())
+        invalidate(Author)
+    books = set(before) | set(after) | set(listed)
+    if books:
+        authors = set().union(*before.values(), *after.values())
+        queue.enqueue('refresh_related', book_pks=sorted(books), author_pks=sorted(authors))
+
+
+def _collaborators(author_pks):
+    collaborators = {}
+    for batch in _batches(author_pks):
+        rows = (CoAuthor.objects.filter(author_id__in=batch).order_by('author_id', '-books', 'coauthor_id')
+                .values_list('author_id', 'coauthor_id', 'books'))
+        for author, coauthor, books in rows:
+            top = collaborators.setdefault(author, [])
+            if len(top) < COLLABORATORS:
+                top.append((coauthor, books))
+    return collaborators
+
+
+def _books_by(author_pks):
+    books, publishers = {}, {}
+    for batch in _batches(author_pks):
+        rows = Through.objects.filter(author_id__in=batch).values_list('author_id', 'book_id', 'book__publisher_id')
+        for author, book, publisher in rows:
+            books.setdefault(author, []).append(book)
+            publishers[book] = publisher
+    return books, publishers
+
+
+def scored(book_pks):
+    """Return ``{book pk: [(related pk, score)]}``, best first, for the existing books in ``book_pks``."""
+    publisher_of = {}
+    for batch in _batches(book_pks):
+        publisher_of.update(Book.objects.filter(pk__in=batch).values_list('pk', 'publisher_id'))
+    authors = authors_of(publisher_of)
+    collaborators = _collaborators(set().union(*authors.values()))
+    candidates = set().union(*authors.values(), *([pk for pk, _ in top] for top in collaborators.values()))
+    books_by, publishers = _books_by(candidates)
+    lists = {}
+    for book, book_authors in authors.items():
+        weights = Counter()
+        for author in book_authors:
+            weights[author] += SHARED_AUTHOR
+            for coauthor, books in collaborators.get(author, ()):
+                if coauthor not in book_authors:
+                    weights[coauthor] += books
+        scores = Counter()
+        for author, weight in weights.items():
+            for other in books_by.get(author, ()):
+                if other != book:
+                    scores[other] += weight
+        for other in scores:
+            if publishers[other] == publisher_of[book]:
+                scores[other] += SAME_PUBLISHER
+        lists[book] = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:RELATED_LIMIT]
+    return lists
+
+
+def refresh(book_pks=(), author_pks=()):
+    """
+    Recompute the related lists of ``book_pks`` and of every book by
+    ``author_pks``; return how many lists changed.
+    """
+    books = set(book_pks)
+    for batch in _batches(set(author_pks)):
+        books.update(Through.objects.filter(author_id__in=batch).values_list('book_id', flat=True))
+    changed = 0
+    for batch in _batches(sorted(books), 100):
+        wanted = scored(batch)
+        current = {}
+        for batch_pks in _batches(wanted):
+            rows = (RelatedBook.objects.filter(book_id__in=batch_pks).order_by('book_id', '-score', '-related_id')
+                    .values_list('book_id', 'related_id', 'score'))
+            for book, related, score in rows:
+                current.setdefault(book, []).append((related, score))
+        stale = [book for book, top in wanted.items() if current.get(book, []) != top]
+        if not stale:
+            continue
+        with transaction.atomic():
+            RelatedBook.objects.filter(book_id__in=stale).delete()
+            RelatedBook.objects.bulk_create([RelatedBook(book_id=book, related_id=related, score=score)
+                                             for book in stale for related, score in wanted[book]])
+            # New validators for their detail pages; see book.conditional.
+            Book.objects.filter(pk__in=stale).update(updated_at=timezone.now())
+        invalidate(Book, stale)
+        changed += len(stale)
+    return changed
+
+
+def computed():
+    """Return the pair counts ``{(author pk, coauthor pk): books}`` counted from the links."""
+    pairs, book, authors = Counter(), None, []
+    for book_id, author_id in Through.objects.order_by('book_id').values_list('book_id', 'author_id').iterator():
+        if book_id != book:
+            pairs.update(permutations(authors, 2))
+            book, authors = book_id, []
+        authors.append(author_id)
+    pairs.update(permutations(authors, 2))
+    return dict(pairs)
+
+
+def stored():
+    return {(author, coauthor): books for author, coauthor, books in
+            CoAuthor.objects.values_list('author_id', 'coauthor_id', 'books').iterator()}
+
+
+def rebuild():
+    """Recount the graph from the links and recompute every related list; return (pairs, lists changed)."""
+    rows = [CoAuthor(author_id=author, coauthor_id=coauthor, books=books)
+            for (author, coauthor), books in computed().items()]
+    with transaction.atomic():
+        CoAuthor.objects.all().delete()
+        CoAuthor.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    invalidate(Author)
+    return len(rows), refresh(Book.objects.values_list('pk', flat=True))
+
+
+def related_books(book, limit=RELATED_LIMIT):
+    rows = (RelatedBook.objects.filter(book=book).select_related('related').only('related', 'related__title')
+            .order_by('-score', '-related_id')[:limit])
+    return [row.related for row in rows]
+
+
+def collaborators(author_pks, limit=COLLABORATOR_LIMIT):
+    """The authors with the most books written with any of ``author_pks``, annotated with ``books_together``."""
+    return list(Author.objects.filter(coauthorships__author__in=author_pks).exclude(pk__in=author_pks)
+                .annotate(books_together=Sum('coauthorships__books')).only('id', 'name')
+                .order_by('-books_together', 'name', 'pk')[:limit])
+
+
+def book_pre_delete(sender, instance, **kwargs):
+    instance._related_authors = authors_of([instance.pk])[instance.pk]
+    instance._related_listed = list(RelatedBook.objects.filter(related=instance).values_list('book_id', flat=True))
+
+
+def book_deleted(sender, instance, **kwargs):
+    apply({instance.pk: getattr(instance, '_related_authors', set())}, {},
+          getattr(instance, '_related_listed', []))
+
+
+def book_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    # A new publisher changes the book's scores; a new title shows on the pages listing it.
+    queue.enqueue('refresh_related', key='refresh_related:%d' % instance.pk, book_pks=[instance.pk], author_pks=[])
+    listed = list(RelatedBook.objects.filter(related=instance).values_list('book_id', flat=True))
+    if listed:
+        Book.objects.filter(pk__in=listed).update(updated_at=timezone.now())
+        invalidate(Book, listed)
+
+
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        if not reverse:
+            books = [instance.pk]
+        elif action == 'pre_clear':
+            books = list(Through.objects.filter(author_id=instance.pk).values_list('book_id', flat=True))
+        else:
+            books = list(pk_set)
+        instance._related_before = authors_of(books)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        before = instance.__dict__.pop('_related_before', {})
+        apply(before, authors_of(before))
+
+
+def author_pre_delete(sender, instance, **kwargs):
+    instance._related_books = list(Through.objects.filter(author_id=instance.pk).values_list('book_id', flat=True))
+
+
+def author_deleted(sender, instance, **kwargs):
+    # Its CoAuthor rows went with it; only the lists of its former books change.
+    books = getattr(instance, '_related_books', [])
+    if books:
+        queue.enqueue('refresh_related', book_pks=books, author_pks=[])
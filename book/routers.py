@@ -0,0 +1,90 @@
+"""
+Send catalog reads of list and detail pages to read replicas.
+
+``ReplicaRoutingMiddleware`` allows replica reads only while a GET or HEAD
+request is served by a ListView or DetailView; everything else, including the
+create, update and delete views, search and background workers, reads from the
+primary. Within an allowed request, ``CatalogRouter`` reads Publisher, Author
+and Book from one replica chosen for the whole request, until the request
+writes anything: from then on it reads from the primary, and the response sets
+a short-lived cookie that keeps that client on the primary for
+``BOOK_REPLICA_STICKY_SECONDS``, so it sees its own writes despite replica lag.
+
+Replicas are plain aliases in ``DATABASES`` listed in ``BOOK_READ_REPLICAS``
+(copies of the SQLite file, or Postgres standbys); Django never migrates them.
+Cached pages may be rendered from a lagging replica, so stale pages are
+possible for up to ``BOOK_PAGE_CACHE_TIMEOUT`` after a write.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.views.generic import DetailView, ListView
+
+STICKY_COOKIE = 'book_primary'
+
+_state = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'BOOK_READ_REPLICAS', ()))
+
+
+def _catalog(model):
+    return model._meta.app_label == 'book'
+
+
+class CatalogRouter:
+
+    def db_for_read(self, model, **hints):
+        if not _catalog(model):
+            return None
+        if getattr(_state, 'wrote', False):
+            # Explicitly, or Django would follow instances loaded from a replica.
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        if _catalog(model):
+            # Read everything after a write from the primary, which has it.
+            _state.wrote = True
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS} | set(replicas())
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = None
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(STICKY_COOKIE, '1', max_age=getattr(settings, 'BOOK_REPLICA_STICKY_SECONDS', 15),
+                                    httponly=True)
+            return response
+        finally:
+            _state.replica = None
+            _state.wrote = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        aliases = replicas()
+        view_class = getattr(view_func, 'view_class', None)
+        if (aliases and request.method in ('GET', 'HEAD') and STICKY_COOKIE not in request.COOKIES and
+                view_class is not None and issubclass(view_class, (ListView, DetailView))):
+            _state.replica = random.choice(aliases)
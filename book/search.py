@@ -0,0 +1,140 @@
+"""
+Full-text search over the catalog, backed by an SQLite FTS5 index.
+
+Every Book, Author and Publisher row has one document in the ``book_search``
+virtual table, kept in sync by triggers on the model tables, so bulk updates
+and cascade deletes that never reach ``save()`` are indexed too. The FTS rowid
+encodes the source row as ``id * 4 + kind``, which lets the triggers replace a
+document through the rowid index instead of scanning the table.
+"""
+import re
+from collections import namedtuple
+
+from django.db import NotSupportedError, connections, router
+
+from book.models import Author, Book, Publisher
+
+INDEX_TABLE = 'book_search'
+
+# kind: (model, title column, body expression, columns that change the document)
+SOURCES = {
+    1: (Book, 'title', "''", ['title']),
+    2: (Author, 'name', "''", ['name']),
+    3: (Publisher, 'name', "{row}.city || ' ' || {row}.country", ['name', 'city', 'country']),
+}
+
+KINDS = {source[0]: kind for kind, source in SOURCES.items()}
+
+SearchHit = namedtuple('SearchHit', ['kind', 'object', 'score'])
+
+
+def _trigger_sql(kind, model, title, body, watched):
+    table = model._meta.db_table
+    values = "(new.id * 4 + {kind}, new.{title}, {body})".format(kind=kind, title=title, body=body.format(row='new'))
+    insert = "INSERT INTO {index}(rowid, title, body) VALUES {values};".format(index=INDEX_TABLE, values=values)
+    delete = "DELETE FROM {index} WHERE rowid = old.id * 4 + {kind};".format(index=INDEX_TABLE, kind=kind)
+    prefix = 'CREATE TRIGGER IF NOT EXISTS {index}_{table}'.format(index=INDEX_TABLE, table=table)
+    return [
+        '{prefix}_ai AFTER INSERT ON {table} BEGIN {insert} END'.format(prefix=prefix, table=table, insert=insert),
+        '{prefix}_au AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END'.format(
+            prefix=prefix, columns=', '.join(watched), table=table, delete=delete, insert=insert),
+        '{prefix}_ad AFTER DELETE ON {table} BEGIN {delete} END'.format(prefix=prefix, table=table, delete=delete),
+    ]
+
+
+def _populate_sql(kind, model, title, body, watched):
+    return "INSERT INTO {index}(rowid, title, body) SELECT id * 4 + {kind}, {title}, {body} FROM {table} AS src".format(
+        index=INDEX_TABLE, kind=kind, title=title, body=body.format(row='src'), table=model._meta.db_table)
+
+
+def create_search_index(using='default', **kwargs):
+    """Create the FTS table and its triggers if missing, indexing any existing rows."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        exists = INDEX_TABLE in connection.introspection.table_names(cursor)
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+            "title, body, tokenize='unicode61 remove_diacritics 1', prefix='2 3')".format(index=INDEX_TABLE))
+        for kind, source in SOURCES.items():
+            for statement in _trigger_sql(kind, *source):
+                cursor.execute(statement)
+        if not exists:
+            for kind, source in SOURCES.items():
+                cursor.execute(_populate_sql(kind, *source))
+
+
+def rebuild_search_index(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {index}'.format(index=INDEX_TABLE))
+        for kind, source in SOURCES.items():
+            cursor.execute(_populate_sql(kind, *source))
+        cursor.execute("INSERT INTO {index}({index}) VALUES ('optimize')".format(index=INDEX_TABLE))
+
+
+def match_expression(query):
+    # Quote every word so user input can never be parsed as FTS5 syntax, and
+    # prefix-match each one so partially typed words still find results.
+    return ' '.join('"%s"*' % word for word in re.findall(r'\w+', query)[:8])
+
+
+def title_match_expression(query):
+    # Restricting every phrase to the title column keeps publisher cities and
+    # countries out of name completions.
+    return ' '.join('title : "%s"*' % word for word in re.findall(r'\w+', query)[:8])
+
+
+def _connection(model):
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != 'sqlite':
+        raise NotSupportedError('Catalog search requires the SQLite FTS5 index.')
+    return connection
+
+
+def complete(model, query, limit=10):
+    """Return up to ``limit`` ``model`` objects whose name starts with the words of ``query``, best first."""
+    match = title_match_expression(query)
+    if not match:
+        return []
+    with _connection(model).cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid / 4 FROM {index} WHERE {index} MATCH %s AND rowid %% 4 = %s '
+            'ORDER BY rank LIMIT %s'.format(index=INDEX_TABLE), [match, KINDS[model], limit])
+        pks = [pk for pk, in cursor.fetchall()]
+    objects = model.objects.for_list().in_bulk(pks)
+    return [objects[pk] for pk in pks if pk in objects]
+
+
+def filter_by_prefix(queryset, query):
+    """Narrow ``queryset`` to the rows whose name starts with the words of ``query``."""
+    match = title_match_expression(query)
+    if not match:
+        return queryset.none()
+    _connection(queryset.model)
+    where = '{table}.id IN (SELECT rowid / 4 FROM {index} WHERE {index} MATCH %s AND rowid %% 4 = %s)'.format(
+        table=queryset.model._meta.db_table, index=INDEX_TABLE)
+    return queryset.extra(where=[where], params=[match, KINDS[queryset.model]])
+
+
+def search(query, limit=20, offset=0):
+    """Return SearchHits for ``query`` ranked by BM25, with titles weighted over bodies."""
+    match = match_expression(query)
+    if not match:
+        return []
+    with _connection(Book).cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid, bm25({index}, 10.0, 1.0) AS score FROM {index} WHERE {index} MATCH %s '
+            'ORDER BY score LIMIT %s OFFSET %s'.format(index=INDEX_TABLE), [match, limit, offset])
+        rows = cursor.fetchall()
+    pks = {}
+    for rowid, _ in rows:
+        pks.setdefault(rowid % 4, []).append(rowid // 4)
+    objects = {kind: SOURCES[kind][0].objects.for_list().in_bulk(ids) for kind, ids in pks.items()}
+    hits = []
+    for rowid, score in rows:
+        obj = objects[rowid % 4].get(rowid // 4)
+        if obj is not None:
+            hits.append(SearchHit(obj._meta.model_name, obj, score))
+    return hits
@@ -0,0 +1,40 @@
+(function () {
+    'use strict';
+
+    function load(select, term) {
+        var url = select.getAttribute('data-autocomplete-url') + '?q=' + encodeURIComponent(term);
+        fetch(url, {credentials: 'same-origin'}).then(function (response) {
+            return response.json();
+        }).then(function (data) {
+            var present = {};
+            Array.prototype.slice.call(select.options).forEach(function (option) {
+                if (option.selected || !option.value) {
+                    present[option.value] = true;
+                } else {
+                    select.removeChild(option);
+                }
+            });
+            data.results.forEach(function (item) {
+                if (!present[item.id]) {
+                    select.appendChild(new Option(item.text, item.id));
+                }
+            });
+        });
+    }
+
+    function attach(select) {
+        var input = document.createElement('input');
+        var timer = null;
+        input.type = 'search';
+        input.placeholder = 'Type to search';
+        select.parentNode.insertBefore(input, select);
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { load(select, input.value); }, 200);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        Array.prototype.forEach.call(document.querySelectorAll('select[data-autocomplete-url]'), attach);
+    });
+})();
@@ -0,0 +1,121 @@
+"""
+Content-hashed, precompressed static files, served without a CDN.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` copies every
+file into ``STATIC_ROOT`` under a name containing a hash of its content, as
+``ManifestStaticFilesStorage`` does, and writes ``.gz`` and (with the
+``brotli`` package installed) ``.br`` siblings of the hashed files that
+compress well. ``serve`` hands those out as they are, picking the sibling the
+client accepts, so nothing is compressed at request time; hashed names never
+change meaning and are cached for a year.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Formats that are already compressed (images, woff fonts) gain nothing.
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.txt', '.json', '.html', '.xml')
+
+# A sibling is only kept if it saves at least this fraction of the original.
+MIN_SAVING = 0.05
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _encoders():
+    encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9))]
+    if brotli is not None:
+        quality = getattr(settings, 'BOOK_STATIC_BROTLI_QUALITY', 11)
+        encoders.insert(0, ('.br', lambda data: brotli.compress(data, quality=quality)))
+    return encoders
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        # Until collectstatic has written a manifest (in development and tests)
+        # templates link the unhashed names.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    @cached_property
+    def hashed_names(self):
+        return set(self.hashed_files.values())
+
+    def post_process(self, paths, dry_run=False, **options):
+        # Files that refer to others are hashed over several passes; the last name counts.
+        hashed = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed[name] = hashed_name
+            yield name, hashed_name, processed
+        self.__dict__.pop('hashed_names', None)
+        for name, hashed_name in sorted(hashed.items()):
+            for compressed in self.compress(hashed_name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Write the compressed siblings of ``name`` that are worth it; return their names."""
+        if not name.endswith(COMPRESSIBLE):
+            return []
+        with self.open(name) as source:
+            data = source.read()
+        written = []
+        for suffix, encode in _encoders():
+            encoded = encode(data)
+            if len(encoded) <= len(data) * (1 - MIN_SAVING):
+                with open(self.path(name + suffix), 'wb') as target:
+                    target.write(encoded)
+                written.append(name + suffix)
+        return written
+
+
+def _accepted(request):
+    codings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            codings.add(coding.strip().lower())
+    return codings
+
+
+@require_safe
+def serve(request, path):
+    """Serve ``path`` from ``STATIC_ROOT``, precompressed where the client allows."""
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path.')
+    if not os.path.isfile(full_path):
+        raise Http404('No static file %s.' % name)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accepted, encoding = _accepted(request), None
+    for suffix, coding in (('.br', 'br'), ('.gz', 'gzip')):
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            full_path, encoding = full_path + suffix, coding
+            break
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Content-Length'] = os.path.getsize(full_path)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    # Unhashed names can be replaced by the next deploy, so clients revalidate them.
+    response['Cache-Control'] = IMMUTABLE if name in getattr(staticfiles_storage, 'hashed_names', ()) else 'no-cache'
+    return response
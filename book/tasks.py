@@ -0,0 +1,25 @@
+"""Background tasks run by ``manage.py runworker``; see ``book.queue``."""
+from book import purge, related, thumbnails
+from book.queue import task
+
+
+# Someone is waiting to see the new headshot; deletions only need to finish eventually.
+@task('generate_headshots', priority=10)
+def generate_headshots(author_pk):
+    thumbnails.generate_derivatives(author_pk)
+
+
+@task('purge_publisher', priority=-10)
+def purge_publisher(publisher_pk):
+    # Resumes where an earlier, failed attempt stopped.
+    purge.purge(publisher_pk)
+
+
+@task('refresh_related')
+def refresh_related(book_pks, author_pks):
+    related.refresh(book_pks, author_pks)
+
+
+@task('rebuild_related', priority=-10)
+def rebuild_related():
+    related.rebuild()
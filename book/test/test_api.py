@@ -0,0 +1,92 @@
+import datetime
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Publisher, Author, Book
+
+
+def api(resource, pk=None):
+    if pk is None:
+        return reverse('books:api-list', kwargs={'resource': resource})
+    return reverse('books:api-detail', kwargs={'resource': resource, 'pk': pk})
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = mommy.make(Publisher, name='Penguin', city='London')
+        cls.authors = [mommy.make(Author, name=name) for name in ('Bea', 'Ali')]
+        cls.books = []
+        for day in range(1, 6):
+            book = mommy.make(Book, title='Book %d' % day, publisher=cls.publisher,
+                              publication_date=datetime.date(2001, 1, day))
+            book.authors.set(cls.authors[:day % 2 + 1])
+            cls.books.append(book)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_list_walks_cursor_pages(self):
+        seen, url = [], api('books') + '?limit=2'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(row['id'] for row in data['data'])
+            url = data['next']
+        self.assertEqual(seen, sorted(book.pk for book in self.books))
+
+    def test_default_fields(self):
+        book = self.books[0]
+        data = self.client.get(api('books', book.pk)).json()['data']
+        self.assertEqual(data, {'id': book.pk, 'title': 'Book 1', 'publication_date': '2001-01-01',
+                                'publisher': self.publisher.pk, 'updated_at': data['updated_at'],
+                                'authors': [self.authors[1].pk, self.authors[0].pk]})
+
+    def test_sparse_fields_limit_the_select(self):
+        # The session and user, then the page.
+        with self.assertNumQueries(3) as queries:
+            response = self.client.get(api('books'), {'fields': 'title'})
+        self.assertEqual(response.json()['data'][0], {'id': self.books[0].pk, 'title': 'Book 1'})
+        self.assertNotIn('publication_date', queries.captured_queries[-1]['sql'])
+
+    def test_include_loads_each_relation_once(self):
+        # The session and user, the page, its publishers and the authors of every book on it.
+        with self.assertNumQueries(5):
+            response = self.client.get(api('books'), {'include': 'publisher,authors', 'fields[publishers]': 'city',
+                                                      'fields[authors]': 'name'})
+        row = response.json()['data'][0]
+        self.assertEqual(row['publisher'], {'id': self.publisher.pk, 'city': 'London'})
+        self.assertEqual(row['authors'], [{'id': self.authors[1].pk, 'name': 'Ali'},
+                                          {'id': self.authors[0].pk, 'name': 'Bea'}])
+
+    def test_batch_fetch_keeps_request_order(self):
+        ids = [self.books[2].pk, self.books[0].pk, 999]
+        data = self.client.get(api('books'), {'ids': ','.join(map(str, ids)), 'fields': 'title'}).json()
+        self.assertEqual([row['title'] for row in data['data']], ['Book 3', 'Book 1'])
+        self.assertEqual(data['missing'], [999])
+
+    def test_errors(self):
+        for params in ({'fields': 'secret'}, {'include': 'books'}, {'ids': 'a,b'}, {'cursor': 'nope'},
+                       {'limit': 'all'}):
+            response = self.client.get(api('books'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.client.get(api('authors'), {'include': 'publisher'}).status_code, 400)
+        self.assertEqual(self.client.get(api('publishers', 999)).status_code, 404)
+        self.assertEqual(self.client.post(api('books')).status_code, 405)
+
+    def test_needs_view_permission(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(api('authors'), {'fields': 'name,email'}).status_code, 403)
+        self.assertEqual(self.client.get(api('authors', self.authors[0].pk)).status_code, 403)
+        clerk = User.objects.create_user('clerk')
+        clerk.user_permissions.add(Permission.objects.get(codename='view_book'))
+        self.client.force_login(clerk)
+        self.assertEqual(self.client.get(api('books')).status_code, 200)
+        self.assertEqual(self.client.get(api('books'), {'include': 'authors'}).status_code, 403)
+        self.assertEqual(self.client.get(api('books', self.books[0].pk), {'include': 'authors'}).status_code, 403)
+        self.assertEqual(self.client.get(api('publishers')).status_code, 403)
@@ -0,0 +1,65 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Publisher, Author, Book
+from ..search import complete, filter_by_prefix
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        self.publisher = mommy.make(Publisher, name='Penguin Random House', city='Oslo')
+        mommy.make(Publisher, name='Orbit', city='Penzance')
+        self.authors = [mommy.make(Author, name=name) for name in ('Will Vincent', 'William Gibson', 'Ali')]
+
+    def test_complete_matches_name_prefixes(self):
+        self.assertEqual([a.name for a in complete(Author, 'wil')], ['Will Vincent', 'William Gibson'])
+        self.assertEqual([a.name for a in complete(Author, 'wil gib')], ['William Gibson'])
+        # Cities are searchable, but never complete a publisher name.
+        self.assertEqual([p.name for p in complete(Publisher, 'pen')], ['Penguin Random House'])
+        self.assertEqual(complete(Author, ''), [])
+
+    def test_filter_by_prefix(self):
+        queryset = filter_by_prefix(Author.objects.order_by('name'), 'w')
+        self.assertEqual([a.name for a in queryset], ['Will Vincent', 'William Gibson'])
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('books:autocomplete', kwargs={'kind': 'publishers'}), {'q': 'peng'})
+        self.assertEqual(response.json(), {'results': [{'id': self.publisher.pk, 'text': 'Penguin Random House'}]})
+
+    def test_book_form_renders_only_selected_options(self):
+        response = self.client.get(reverse('books:book-add'))
+        self.assertNotContains(response, 'Will Vincent')
+        self.assertContains(response, 'data-autocomplete-url="/autocomplete/authors/"')
+        book = mommy.make(Book, publisher=self.publisher)
+        book.authors.add(self.authors[0])
+        response = self.client.get(reverse('books:book-update', kwargs={'pk': book.pk}))
+        self.assertContains(response, 'Will Vincent')
+        self.assertNotContains(response, 'William Gibson')
+        self.assertNotContains(response, 'Orbit')
+
+    def test_book_form_saves(self):
+        self.client.post(reverse('books:book-add'), {
+            'title': 'Neuromancer', 'authors': [self.authors[1].pk], 'publisher': self.publisher.pk,
+            'publication_date': datetime.date(1984, 7, 1)})
+        book = Book.objects.get(title='Neuromancer')
+        self.assertEqual(list(book.authors.all()), [self.authors[1]])
+
+    def test_book_form_rejects_invalid_keys(self):
+        for data in ({'publisher': 'abc', 'authors': [self.authors[0].pk]},
+                     {'publisher': self.publisher.pk, 'authors': ['zz', self.authors[0].pk]}):
+            data.update(title='Neuromancer', publication_date=datetime.date(1984, 7, 1))
+            response = self.client.post(reverse('books:book-add'), data)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['form'].errors)
+        self.assertContains(response, 'Penguin Random House')
+        self.assertFalse(Book.objects.exists())
+
+    def test_admin_autocomplete(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        response = self.client.get(reverse('admin:book_author_autocomplete'), {'term': 'william'})
+        self.assertEqual([r['text'] for r in response.json()['results']], ['William Gibson'])
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from django.test import Client, TestCase
+
+from ..benchmark import (RENDER_TEMPLATES, SCENARIOS, compare, generate_rows, missing_url_names, parse_size,
+                         run_benchmark, run_render)
+from ..importer import CatalogImporter
+from ..models import Book
+
+
+class GenerateRowsTest(TestCase):
+
+    def test_is_deterministic_and_skewed(self):
+        rows = list(generate_rows(2000, seed=3))
+        self.assertEqual(rows, list(generate_rows(2000, seed=3)))
+        publishers = Counter(row['publisher'] for row in rows)
+        self.assertGreater(publishers.most_common(1)[0][1], 3 * len(rows) / len(publishers))
+        fan_out = Counter(len(row['authors']) for row in rows)
+        self.assertGreater(fan_out[1], fan_out[2])
+        self.assertTrue(all(1 <= len(row['authors']) <= 5 for row in rows))
+
+    def test_parse_size(self):
+        self.assertEqual([parse_size(size) for size in ('10k', '1M', '250')], [10000, 1000000, 250])
+
+
+class RunBenchmarkTest(TestCase):
+
+    def test_covers_every_url(self):
+        self.assertEqual(missing_url_names(), [])
+        CatalogImporter().run(generate_rows(100))
+        self.assertGreater(Book.objects.count(), 90)
+        report = run_benchmark(requests=2, warmup=0, client=Client())
+        self.assertEqual(set(report['results']), {label for label, _, _ in SCENARIOS})
+        for label, result in report['results'].items():
+            self.assertFalse([status for status in result['statuses'] if status.startswith('5')], label)
+        self.assertEqual(report['results']['book-list']['statuses'], {'200': 2})
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {'results': {'home': {'p50_ms': 1.0, 'p99_ms': 2.0, 'queries_mean': 0}}}
+        current = {'results': {'home': {'p50_ms': 1.05, 'p99_ms': 3.0, 'queries_mean': 0}}}
+        regressed = [(label, metric) for label, metric, *_, flag in compare(baseline, current) if flag]
+        self.assertEqual(regressed, [('home', 'p99_ms')])
+
+    def test_render_costs_per_row(self):
+        CatalogImporter().run(generate_rows(200))
+        report = run_render(rows=(2, 8), repeat=1)
+        self.assertEqual(set(report['results']), set(RENDER_TEMPLATES))
+        for label, result in report['results'].items():
+            self.assertGreater(result['bytes_per_row'], 0, label)
+            self.assertGreater(result['base_bytes'], 0, label)
+        with self.assertRaises(ValueError):
+            run_render(rows=(2, 100000), repeat=1, labels=['publisher-list'])
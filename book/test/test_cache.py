@@ -0,0 +1,139 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..cache import OBJECT_KEY_LIMIT, get_cache, invalidate, object_key, stats, versions
+from ..importer import import_catalog
+from ..models import Publisher, Author, Book
+from ..purge import request_deletion
+from ..queue import work
+
+
+class PageCacheTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.publisher = mommy.make(Publisher, name='Penguin')
+        self.author = mommy.make(Author, name='Ali')
+        self.book = mommy.make(Book, title='Django', publisher=self.publisher)
+        self.book_url = reverse('books:book-detail', kwargs={'pk': self.book.pk})
+        self.publisher_url = reverse('books:publisher-detail', kwargs={'pk': self.publisher.pk})
+
+    def assertCached(self, url, cached=True):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'hit' if cached else 'miss')
+        return response
+
+    def test_detail_is_served_from_cache(self):
+        self.assertCached(self.book_url, False)
+        before = stats.snapshot()
+        # Only the ETag lookup reaches the database.
+        with self.assertNumQueries(1):
+            response = self.assertCached(self.book_url)
+        self.assertContains(response, 'Django')
+        self.assertEqual(stats.snapshot()['hits'], before['hits'] + 1)
+
+    def test_update_view_invalidates_only_that_object(self):
+        other = mommy.make(Publisher)
+        other_url = reverse('books:publisher-detail', kwargs={'pk': other.pk})
+        self.assertCached(self.publisher_url, False)
+        self.assertCached(other_url, False)
+        self.client.post(reverse('books:publisher-update', kwargs={'pk': self.publisher.pk}), {
+            'name': 'Orbit', 'address': 'a', 'city': 'b', 'state_province': 'c', 'country': 'd',
+            'website': 'https://www.google.com/'})
+        response = self.assertCached(self.publisher_url, False)
+        self.assertContains(response, 'Orbit')
+        self.assertCached(other_url)
+
+    def test_related_changes_invalidate_book_pages(self):
+        self.assertCached(self.book_url, False)
+        self.author.book_set.add(self.book)
+        self.assertContains(self.assertCached(self.book_url, False), 'Ali')
+        self.author.name = 'Bea'
+        self.author.save()
+        self.assertContains(self.assertCached(self.book_url, False), 'Bea')
+        self.author.book_set.clear()
+        self.assertNotContains(self.assertCached(self.book_url, False), 'Bea')
+
+    def test_delete_view_invalidates_lists(self):
+        url = reverse('books:publisher_list')
+        self.client.get(url)  # Receive a CSRF cookie.
+        self.assertCached(url, False)
+        self.assertCached(url)
+        self.client.post(reverse('books:publisher-delete', kwargs={'pk': self.publisher.pk}))
+        self.assertNotContains(self.assertCached(url, False), 'Penguin')
+
+    def test_csrf_pages_need_a_cookie(self):
+        url = reverse('books:book_list')
+        before = stats.snapshot()['bypassed']
+        response = self.client.get(url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(stats.snapshot()['bypassed'], before + 1)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertCached(url, False)
+        self.assertCached(url)
+
+    def test_bulk_import_invalidates(self):
+        self.assertCached(self.book_url, False)
+        import_catalog(io.BytesIO(b'{"title": "Django", "publication_date": "2001-01-01", '
+                                  b'"publisher": "Penguin", "authors": ["Ali"]}\n'), 'jsonl')
+        self.assertContains(self.assertCached(self.book_url, False), 'Ali')
+
+
+    def test_bulk_invalidation_replaces_model_tokens(self):
+        books = mommy.make(Book, publisher=self.publisher, _quantity=OBJECT_KEY_LIMIT + 1)
+        other_url = reverse('books:book-detail', kwargs={'pk': books[-1].pk})
+        self.assertCached(self.book_url, False)
+        self.assertCached(other_url, False)
+        with mock.patch.object(get_cache(), 'set_many', wraps=get_cache().set_many) as set_many:
+            invalidate(Book, [book.pk for book in books])
+        self.assertEqual([len(call[0][0]) for call in set_many.call_args_list], [2])
+        self.assertCached(self.book_url, False)
+        self.assertCached(other_url, False)
+
+
+class SharedCacheTest(TestCase):
+    """Tasks run in runworker processes; their invalidations must reach the web processes."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        # Two instances of the same backend, as in a web and a worker process.
+        override = override_settings(CACHES={'default': backend, 'worker': dict(backend)})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def run_tasks(self):
+        with override_settings(BOOK_CACHE_ALIAS='worker'):
+            work(once=True)
+
+    def test_default_backend_is_shared_between_processes(self):
+        from books import settings as project_settings
+        self.assertNotIn('locmem', project_settings.CACHES['default']['BACKEND'])
+
+    def test_purge_task_invalidates_web_pages(self):
+        publisher = mommy.make(Publisher)
+        book = mommy.make(Book, publisher=publisher, _quantity=2)[0]
+        publisher.refresh_from_db()
+        keys = [object_key(Book, book.pk)]
+        with self.settings(BOOK_PURGE_BATCH_SIZE=1):
+            self.assertTrue(request_deletion(publisher))
+            before = versions(keys)
+            self.run_tasks()
+        self.assertFalse(Book.objects.filter(pk=book.pk).exists())
+        self.assertNotEqual(versions(keys), before)
+
+    def test_related_refresh_invalidates_web_pages(self):
+        author = mommy.make(Author)
+        book, other = mommy.make(Book, authors=[author], _quantity=2)
+        url = reverse('books:book-detail', kwargs={'pk': book.pk})
+        self.assertNotContains(self.client.get(url), 'Related Books')
+        self.run_tasks()
+        self.assertContains(self.client.get(url), reverse('books:book-detail', kwargs={'pk': other.pk}))
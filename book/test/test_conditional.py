@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..cache import get_cache
+from ..models import Publisher, Author, Book
+from ..queue import work
+
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.publisher = mommy.make(Publisher, name='Penguin')
+        self.author = mommy.make(Author, name='Ali')
+        self.book = mommy.make(Book, title='Django', publisher=self.publisher)
+        self.book_url = reverse('books:book-detail', kwargs={'pk': self.book.pk})
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_detail_is_not_modified(self):
+        response = self.client.get(self.book_url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(self.book_url, response).status_code, 304)
+        since = self.client.get(self.book_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_related_changes_modify_detail(self):
+        response = self.client.get(self.book_url)
+        self.book.authors.add(self.author)
+        response = self.revalidate(self.book_url, response)
+        self.assertContains(response, 'Ali')
+        Author.objects.filter(pk=self.author.pk).update(name='Bea')
+        self.assertEqual(self.revalidate(self.book_url, response).status_code, 304)
+        self.author.name = 'Bea'
+        self.author.save()
+        self.assertContains(self.revalidate(self.book_url, response), 'Bea')
+
+    def test_collaborator_changes_modify_details(self):
+        bob = mommy.make(Author, name='Bob')
+        self.book.authors.add(self.author)
+        other = mommy.make(Book, title='Flask', publisher=self.publisher, authors=[self.author, bob])
+        work(once=True)
+        author_url = reverse('books:author-detail', kwargs={'pk': self.author.pk})
+        pages = {url: self.client.get(url) for url in (self.book_url, author_url)}
+        for url, response in pages.items():
+            self.assertContains(response, 'Bob')
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+        bob.name = 'Bea'
+        bob.save()
+        for url, response in pages.items():
+            self.assertContains(self.revalidate(url, response), 'Bea')
+        response = self.client.get(self.book_url)
+        other.title = 'Pyramid'
+        other.save()
+        self.assertContains(self.revalidate(self.book_url, response), 'Pyramid')
+
+    def test_delete_modifies_list(self):
+        url = reverse('books:publisher_list')
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        mommy.make(Publisher, name='Orbit').delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_csrf_list_validators_follow_the_cookie(self):
+        url = reverse('books:publisher_list')
+        self.assertNotIn('ETag', self.client.get(url))
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_missing_object_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('books:book-detail', kwargs={'pk': 999})).status_code, 404)
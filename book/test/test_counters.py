@@ -0,0 +1,113 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..counters import drifted
+from ..importer import import_catalog
+from ..models import Publisher, Author, Book
+
+
+def day(n):
+    return datetime.date(2001, 1, n)
+
+
+class CounterTest(TestCase):
+
+    def setUp(self):
+        self.publisher = mommy.make(Publisher)
+        self.authors = mommy.make(Author, _quantity=2)
+
+    def assertCounts(self, obj, count, latest):
+        obj.refresh_from_db()
+        self.assertEqual((obj.book_count, obj.latest_publication_date), (count, latest))
+
+    def assertNoDrift(self):
+        self.assertEqual(drifted(Publisher), [])
+        self.assertEqual(drifted(Author), [])
+
+    def test_book_create_update_delete(self):
+        first = mommy.make(Book, publisher=self.publisher, publication_date=day(1))
+        second = mommy.make(Book, publisher=self.publisher, publication_date=day(5))
+        self.assertCounts(self.publisher, 2, day(5))
+        second.publication_date = day(3)
+        second.save()
+        self.assertCounts(self.publisher, 2, day(3))
+        other = mommy.make(Publisher)
+        second.publisher = other
+        second.save()
+        self.assertCounts(self.publisher, 1, day(1))
+        self.assertCounts(other, 1, day(3))
+        first.delete()
+        self.assertCounts(self.publisher, 0, None)
+        self.assertNoDrift()
+
+    def test_author_links_in_both_directions(self):
+        ali, bea = self.authors
+        books = [mommy.make(Book, publisher=self.publisher, publication_date=day(n)) for n in (1, 2, 3)]
+        books[0].authors.add(ali, bea)
+        ali.book_set.add(books[1], books[2])
+        self.assertCounts(ali, 3, day(3))
+        self.assertCounts(bea, 1, day(1))
+        ali.book_set.remove(books[2], books[2])
+        books[0].authors.remove(bea, bea)
+        self.assertCounts(ali, 2, day(2))
+        self.assertCounts(bea, 0, None)
+        books[1].publication_date = day(9)
+        books[1].save()
+        self.assertCounts(ali, 2, day(9))
+        books[1].authors.set([bea])
+        self.assertCounts(ali, 1, day(1))
+        self.assertCounts(bea, 1, day(9))
+        ali.book_set.clear()
+        books[1].authors.clear()
+        self.assertCounts(ali, 0, None)
+        self.assertCounts(bea, 0, None)
+        self.assertNoDrift()
+
+    def test_cascade_delete(self):
+        book = mommy.make(Book, publisher=self.publisher, publication_date=day(1))
+        book.authors.set(self.authors)
+        self.publisher.delete()
+        self.assertCounts(self.authors[0], 0, None)
+        self.assertNoDrift()
+
+    def test_import_keeps_counts(self):
+        import_catalog(io.BytesIO(
+            b'{"title": "A", "publication_date": "2001-01-02", "publisher": "P", "authors": ["X", "Y"]}\n'
+            b'{"title": "B", "publication_date": "2001-01-04", "publisher": "P", "authors": ["X"]}\n'), 'jsonl')
+        import_catalog(io.BytesIO(
+            b'{"title": "B", "publication_date": "2001-01-03", "publisher": "P", "authors": ["Y"]}\n'), 'jsonl')
+        self.assertCounts(Publisher.objects.get(name='P'), 2, day(3))
+        self.assertCounts(Author.objects.get(name='X'), 1, day(2))
+        self.assertCounts(Author.objects.get(name='Y'), 2, day(3))
+        self.assertNoDrift()
+
+    def test_command_fixes_drift(self):
+        mommy.make(Book, publisher=self.publisher, publication_date=day(1))
+        Publisher.objects.update(book_count=7)
+        out = io.StringIO()
+        call_command('recount_books', '--check', stdout=out)
+        self.assertIn('1 publishers drifted', out.getvalue())
+        call_command('recount_books', stdout=out)
+        self.assertCounts(self.publisher, 1, day(1))
+        self.assertNoDrift()
+
+
+class PopularSortTest(TestCase):
+
+    def test_sorts_by_count_without_aggregating(self):
+        for count in (2, 0, 5):
+            publisher = mommy.make(Publisher)
+            for _ in range(count):
+                mommy.make(Book, publisher=publisher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('books:publisher_list'), {'sort': 'popular', 'cursor': ''})
+        self.assertEqual([p.book_count for p in response.context['publisher_list']], [5, 2, 0])
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertContains(response, '5</td>')
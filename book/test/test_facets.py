@@ -0,0 +1,98 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from .. import facets
+from ..importer import import_catalog
+from ..models import Publisher, Book, FacetCount
+from ..purge import purge, request_deletion
+
+
+def year(n):
+    return datetime.date(n, 6, 1)
+
+
+class FacetCountTest(TestCase):
+
+    def setUp(self):
+        self.paris = mommy.make(Publisher, country='France', city='Paris')
+        self.lyon = mommy.make(Publisher, country='France', city='Lyon')
+
+    def assertNoDrift(self):
+        self.assertEqual(facets.stored(), facets.computed())
+
+    def test_book_and_publisher_changes(self):
+        book = mommy.make(Book, publisher=self.paris, publication_date=year(2001))
+        mommy.make(Book, publisher=self.paris, publication_date=year(2001))
+        self.assertEqual(facets.stored(), {('France', 'Paris', 2001): 2})
+        book.publication_date = year(2002)
+        book.publisher = self.lyon
+        book.save()
+        self.assertEqual(facets.stored(), {('France', 'Paris', 2001): 1, ('France', 'Lyon', 2002): 1})
+        self.paris.city = 'Nice'
+        self.paris.save()
+        self.assertEqual(facets.stored(), {('France', 'Nice', 2001): 1, ('France', 'Lyon', 2002): 1})
+        self.assertFalse(FacetCount.objects.filter(city='Paris').exists())
+        book.delete()
+        self.lyon.delete()
+        self.assertEqual(facets.stored(), {('France', 'Nice', 2001): 1})
+        self.assertNoDrift()
+
+    def test_import_and_purge(self):
+        import_catalog(io.BytesIO(b''.join(
+            b'{"title": "Book %d", "publication_date": "200%d-01-01", "publisher": "Orbit", '
+            b'"publisher_city": "York", "publisher_country": "UK"}\n' % (i, i % 2) for i in range(6))), 'jsonl')
+        self.assertEqual(facets.stored(), {('UK', 'York', 2000): 3, ('UK', 'York', 2001): 3})
+        import_catalog(io.BytesIO(b'{"title": "Book 0", "publication_date": "2005-01-01", "publisher": "Orbit"}\n'),
+                       'jsonl')
+        self.assertNoDrift()
+        with self.settings(BOOK_PURGE_BATCH_SIZE=2):
+            publisher = Publisher.objects.get(name='Orbit')
+            self.assertTrue(request_deletion(publisher))
+            purge(publisher.pk, pause=0)
+        self.assertEqual(facets.stored(), {})
+
+    def test_counts_and_rebuild(self):
+        for publisher, n in ((self.paris, 3), (self.lyon, 1)):
+            for _ in range(n):
+                mommy.make(Book, publisher=publisher, publication_date=year(2001))
+        mommy.make(Book, publisher=self.lyon, publication_date=year(1999))
+        counts = facets.counts({'country': 'France'})
+        self.assertEqual(counts['city'], [('Paris', 3), ('Lyon', 2)])
+        self.assertEqual(counts['year'], [(2001, 4), (1999, 1)])
+        self.assertEqual(facets.counts({'year': 1999})['city'], [('Lyon', 1)])
+        self.assertEqual(facets.total({'city': 'Lyon', 'year': 2001}, facets.counts({'city': 'Lyon', 'year': 2001})), 1)
+        FacetCount.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_facets', '--check', stdout=out)
+        self.assertIn('3 facet counts drifted', out.getvalue())
+        call_command('rebuild_facets', stdout=out)
+        self.assertNoDrift()
+
+
+class FacetViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        paris = mommy.make(Publisher, country='France', city='Paris')
+        york = mommy.make(Publisher, country='UK', city='York')
+        for publisher, date in ((paris, year(2001)), (paris, year(2002)), (york, year(2001))):
+            mommy.make(Book, publisher=publisher, publication_date=date, title='%s %s' % (publisher.city, date.year))
+
+    def test_book_list_filters_by_selection(self):
+        response = self.client.get(reverse('books:book_list'), {'country': 'France', 'year': '2001'})
+        self.assertEqual([book.title for book in response.context['book_list']], ['Paris 2001'])
+        self.assertContains(response, 'published in 2001')
+        response = self.client.get(reverse('books:book_list'), {'year': 'soon'})
+        self.assertEqual(len(response.context['book_list']), 3)
+
+    def test_browse(self):
+        response = self.client.get(reverse('books:browse'), {'year': '2001'})
+        self.assertEqual(response.context['total'], 2)
+        self.assertContains(response, '<a href="?year=2001&amp;country=France">France</a> (1)', html=True)
+        self.assertContains(response, '<a href="?">(any year)</a>', html=True)
+        self.assertContains(response, reverse('books:book_list') + '?year=2001')
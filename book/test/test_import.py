@@ -0,0 +1,152 @@
+import datetime
+import gzip
+import io
+import json
+import tempfile
+
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..export import export
+from ..importer import import_catalog
+from ..models import Publisher, Author, Book
+
+
+def jsonl(*rows):
+    return io.BytesIO(''.join(json.dumps(row) + '\n' for row in rows).encode())
+
+
+class CatalogImportTest(TestCase):
+
+    def setUp(self):
+        self.publisher = mommy.make(Publisher, name='Penguin')
+        self.author = mommy.make(Author, name='Ali')
+
+    def test_creates_missing_rows_and_reuses_existing(self):
+        stats = import_catalog(jsonl(
+            {'title': 'One', 'publication_date': '2001-01-01', 'publisher': 'Penguin', 'authors': ['Ali', 'Bea']},
+            {'title': 'Two', 'publication_date': '2002-01-01', 'publisher': 'Orbit', 'publisher_city': 'NYC',
+             'authors': ['Bea']},
+        ), 'jsonl', batch_size=1)
+        self.assertEqual((stats.rows, stats.books_created, stats.publishers_created, stats.authors_created),
+                         (2, 2, 1, 1))
+        one = Book.objects.get(title='One')
+        self.assertEqual(one.publisher, self.publisher)
+        self.assertEqual(sorted(one.authors.values_list('name', flat=True)), ['Ali', 'Bea'])
+        self.assertEqual(Book.objects.get(title='Two').publisher.city, 'NYC')
+        self.assertEqual(Author.objects.filter(name='Bea').count(), 1)
+
+    def test_upsert_updates_existing_books(self):
+        book = mommy.make(Book, title='One', publisher=self.publisher, publication_date=datetime.date(2000, 1, 1))
+        book.authors.add(self.author)
+        stats = import_catalog(jsonl(
+            {'title': 'One', 'publication_date': '2005-05-05', 'publisher': 'Penguin', 'authors': 'Bea; Cy'},
+        ), 'jsonl')
+        self.assertEqual((stats.books_created, stats.books_updated, stats.links_deleted), (0, 1, 1))
+        book.refresh_from_db()
+        self.assertEqual(book.publication_date, datetime.date(2005, 5, 5))
+        self.assertEqual(sorted(book.authors.values_list('name', flat=True)), ['Bea', 'Cy'])
+
+    def test_no_update_leaves_existing_books(self):
+        book = mommy.make(Book, title='One', publisher=self.publisher, publication_date=datetime.date(2000, 1, 1))
+        import_catalog(jsonl({'title': 'One', 'publication_date': '2005-05-05', 'publisher': 'Penguin'}),
+                       'jsonl', update_existing=False)
+        book.refresh_from_db()
+        self.assertEqual(book.publication_date, datetime.date(2000, 1, 1))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def rows(count):
+            return jsonl(*[{'title': 'Book %d' % i, 'publication_date': '2001-01-01',
+                            'publisher': 'Pub %d' % (i % 3), 'authors': ['Author %d' % i]} for i in range(count)])
+        for count in (10, 400):
+            Publisher.objects.all().delete()
+            Author.objects.all().delete()
+            with self.assertNumQueries(23):
+                import_catalog(rows(count), 'jsonl')
+            self.assertEqual(Book.objects.count(), count)
+
+    def test_invalid_rows_are_skipped(self):
+        stats = import_catalog(jsonl({'title': 'One', 'publisher': 'Penguin'},
+                                     {'title': 'Two', 'publication_date': 'soon', 'publisher': 'Penguin'}), 'jsonl')
+        self.assertEqual((stats.rows, stats.skipped, stats.books_created), (2, 2, 0))
+        self.assertEqual(len(stats.errors), 2)
+
+    def test_malformed_rows_are_skipped(self):
+        valid = {'title': 'One', 'publication_date': '2001-01-01', 'publisher': 'Penguin'}
+        cases = [
+            (b'{"title": "One", \n', 'Row 1 is not valid JSON.'),
+            (b'["One", "2001-01-01", "Penguin"]\n', 'Row 1 is not a JSON object.'),
+            (b'"One"\n', 'Row 1 is not a JSON object.'),
+            (json.dumps(dict(valid, publication_date=2001)).encode() + b'\n',
+             'Row 1 needs a title, publisher and publication_date.'),
+            (json.dumps(dict(valid, title=1984)).encode() + b'\n', 'Row 1 has non-text title.'),
+            (json.dumps(dict(valid, publisher={'name': 'Penguin'})).encode() + b'\n', 'Row 1 has non-text publisher.'),
+            (json.dumps(dict(valid, authors=['Ali', 7])).encode() + b'\n', 'Row 1 needs authors as a list of names.'),
+            (json.dumps(dict(valid, authors={'name': 'Ali'})).encode() + b'\n',
+             'Row 1 needs authors as a list of names.'),
+        ]
+        for line, error in cases:
+            with self.subTest(line=line):
+                # The valid row after it is still imported.
+                stats = import_catalog(io.BytesIO(line + json.dumps(dict(valid, title='Two')).encode()), 'jsonl')
+                self.assertEqual((stats.rows, stats.skipped, stats.books_created), (2, 1, 1))
+                self.assertEqual(stats.errors, [error])
+                Book.objects.filter(title='Two').delete()
+
+    def test_undecodable_bytes_do_not_stop_the_import(self):
+        stats = import_catalog(io.BytesIO(b'{"title": "One\xff", "publication_date": "2001-01-01", '
+                                          b'"publisher": "Penguin"}\n'), 'jsonl')
+        self.assertEqual(stats.books_created, 1)
+        self.assertTrue(Book.objects.filter(title='One\ufffd').exists())
+
+    def test_round_trips_gzipped_csv_export(self):
+        book = mommy.make(Book, title='One', publisher=self.publisher)
+        book.authors.add(self.author)
+        data = b''.join(export('books', 'csv', compress=True))
+        Book.objects.all().delete()
+        stats = import_catalog(io.BytesIO(data), 'csv')
+        self.assertEqual(stats.books_created, 1)
+        self.assertEqual(list(Book.objects.get(title='One').authors.all()), [self.author])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.jsonl.gz') as source:
+            source.write(gzip.compress(b'{"title": "One", "publication_date": "2001-01-01", "publisher": "Penguin"}\n'))
+            source.flush()
+            out = io.StringIO()
+            call_command('import_catalog', source.name, stdout=out)
+        self.assertIn('1 books created', out.getvalue())
+        self.assertTrue(Book.objects.filter(title='One').exists())
+
+
+class CatalogImportViewTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='john', password='123')
+        self.upload = SimpleUploadedFile('books.jsonl', b'{"title": "One", "publication_date": "2001-01-01", '
+                                                        b'"publisher": "Penguin"}\n')
+
+    def test_requires_permission(self):
+        self.client.login(username='john', password='123')
+        response = self.client.post(reverse('books:import'), {'file': self.upload, 'format': 'jsonl'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_upload(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='add_book'))
+        self.client.login(username='john', password='123')
+        response = self.client.post(reverse('books:import'), {'file': self.upload, 'format': 'jsonl',
+                                                              'update_existing': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['books_created'], 1)
+        self.assertTrue(Book.objects.filter(title='One', publisher__name='Penguin').exists())
+
+    def test_malformed_upload_is_reported(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='add_book'))
+        self.client.login(username='john', password='123')
+        upload = SimpleUploadedFile('books.jsonl', b'not json\n[1, 2]\n{"title": 5}\n')
+        response = self.client.post(reverse('books:import'), {'file': upload, 'format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['skipped'], len(response.json()['errors'])), (3, 3))
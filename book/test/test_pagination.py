@@ -0,0 +1,97 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Publisher, Book
+from ..pagination import KeysetPaginator
+
+
+class PublisherCursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated names make the primary key the tie-breaker between pages.
+        for publisher_id in range(25):
+            Publisher.objects.create(name='ali {}'.format(publisher_id % 7), address='ryk', city='bwp',
+                                     state_province='punjab', country='pak', website='https://www.google.com/')
+
+    def get(self, cursor=''):
+        return self.client.get(reverse('books:publisher_list'), {'cursor': cursor})
+
+    def test_walks_every_row_in_order(self):
+        seen = []
+        response = self.get()
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(p.pk for p in response.context['publisher_list'])
+            page = response.context['page_obj']
+            if not page.has_next():
+                break
+            response = self.get(page.next_cursor)
+        expected = list(Publisher.objects.order_by('-name', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.get().context['page_obj']
+        second = self.get(first.next_cursor).context['page_obj']
+        back = self.get(second.previous_cursor).context['page_obj']
+        self.assertEqual([p.pk for p in back], [p.pk for p in first])
+        self.assertFalse(back.has_previous())
+        self.assertEqual(back.next_cursor, first.next_cursor)
+
+    def test_cursor_page_skips_count(self):
+        cursor = self.get().context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(cursor)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(len(response.context['publisher_list']), 10)
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.get('not-a-cursor').status_code, 404)
+
+    def test_page_parameter_still_paginates(self):
+        response = self.client.get(reverse('books:publisher_list'), {'page': 3})
+        self.assertEqual(len(response.context['publisher_list']), 5)
+        self.assertEqual(response.context['paginator'].count, 25)
+
+
+class KeysetPaginatorTest(TestCase):
+
+    def test_date_ordering_round_trips_through_cursor(self):
+        for day in (1, 1, 2, 3, 3):
+            mommy.make(Book, publication_date=datetime.date(2001, 1, day))
+        paginator = KeysetPaginator(Book.objects.order_by('-publication_date'), 2)
+        pages = [paginator.page('')]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        seen = [book.pk for page in pages for book in page]
+        self.assertEqual(seen, list(Book.objects.order_by('-publication_date', 'id').values_list('pk', flat=True)))
+
+
+class BooksByPublisherTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = mommy.make(Publisher, name='Penguin')
+        for day in range(1, 13):
+            mommy.make(Book, publisher=cls.publisher, publication_date=datetime.date(2001, 1, day))
+        mommy.make(Book, _quantity=3)
+
+    def test_lists_only_the_publishers_books_newest_first(self):
+        url = reverse('books:publisher-books', kwargs={'pk': self.publisher.pk})
+        first = self.client.get(url, {'cursor': ''})
+        second = self.client.get(url, {'cursor': first.context['page_obj'].next_cursor})
+        books = list(first.context['book_list']) + list(second.context['book_list'])
+        self.assertEqual([book.publication_date.day for book in books], list(range(12, 0, -1)))
+        self.assertFalse(second.context['page_obj'].has_next())
+
+    def test_detail_shows_book_count(self):
+        response = self.client.get(reverse('books:publisher-detail', kwargs={'pk': self.publisher.pk}))
+        self.assertContains(response, '>12</a>')
+        self.assertNotIn('book_list', response.context)
+
+    def test_unknown_publisher_is_404(self):
+        self.assertEqual(self.client.get(reverse('books:publisher-books', kwargs={'pk': 999})).status_code, 404)
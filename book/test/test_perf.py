@@ -0,0 +1,100 @@
+import io
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_mommy import mommy
+
+from .. import perf
+from ..cache import get_cache, stats
+from ..models import Book
+
+
+class HistogramTest(TestCase):
+
+    def test_percentiles_are_within_a_bucket(self):
+        histogram = perf.Histogram(perf.BOUNDS['time_ms'])
+        for value in range(1, 1001):
+            histogram.record(value)
+        self.assertAlmostEqual(histogram.percentile(50), 500, delta=500 * 0.19)
+        self.assertAlmostEqual(histogram.percentile(99), 990, delta=990 * 0.19)
+        self.assertEqual(histogram.percentile(100), 1000)
+        self.assertEqual(histogram.summary()['mean'], 500.5)
+
+    def test_merge_adds_up(self):
+        first, second = perf.Histogram(perf.BOUNDS['queries']), perf.Histogram(perf.BOUNDS['queries'])
+        first.record(3)
+        second.record(300)
+        first.merge(json.loads(json.dumps(second.as_dict())))
+        self.assertEqual((first.count, first.total, first.max), (2, 303, 300))
+
+
+class PerfMiddlewareTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        perf.registry.clear()
+        mommy.make(Book, make_m2m=True, _quantity=3)
+
+    def test_records_by_url_name(self):
+        self.client.get(reverse('books:book_list'))
+        self.client.get('/no-such-page/')
+        views = perf.registry.snapshot()
+        self.assertEqual(set(views), {'books:book_list', perf.UNRESOLVED})
+        book_list = views['books:book_list']
+        self.assertEqual(book_list['time_ms']['count'], 1)
+        self.assertGreaterEqual(book_list['queries']['total'], 4)
+        self.assertEqual(book_list['render_ms']['count'], 1)
+        self.assertGreater(book_list['bytes']['total'], 0)
+
+    @override_settings(BOOK_PERF_SLOW_REQUEST_MS=0)
+    def test_logs_sql_of_slow_requests(self):
+        with self.assertLogs('book.perf', 'WARNING') as logs:
+            self.client.get(reverse('books:book_list'))
+        self.assertIn('books:book_list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('books:perf')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        with override_settings(BOOK_PERF_STATS_DIR=None):
+            self.client.get(reverse('books:book_list'))
+            report = self.client.get(url).json()
+        self.assertEqual(report['books:book_list']['requests'], 1)
+
+    def test_command_merges_process_files(self):
+        self.client.get(reverse('books:book_list'))
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOOK_PERF_STATS_DIR=directory):
+            perf.registry.flush()
+            perf.registry.path = None
+            perf.registry.flush()
+            out = io.StringIO()
+            call_command('perfstats', '--json', stdout=out)
+            self.assertEqual(json.loads(out.getvalue())['books:book_list']['requests'], 2)
+            call_command('perfstats', stdout=out)
+            self.assertIn('books:book_list', out.getvalue())
+            call_command('perfstats', '--reset', stdout=out)
+            self.assertEqual(perf.load(), {})
+
+    def test_command_adds_up_page_cache_counts(self):
+        stats.clear()
+        url = reverse('books:book-detail', kwargs={'pk': Book.objects.first().pk})
+        self.client.get(url)
+        self.client.get(url)
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOOK_PERF_STATS_DIR=directory):
+            perf.registry.flush()
+            perf.registry.path = None
+            perf.registry.flush()
+            out = io.StringIO()
+            call_command('perfstats', '--cache', '--json', stdout=out)
+            counts = json.loads(out.getvalue())
+            self.assertEqual((counts['hits'], counts['misses']), (2, 2))
+            out = io.StringIO()
+            call_command('perfstats', stdout=out)
+            self.assertIn('Page cache: 2 hits, 2 misses (50.0% hit rate)', out.getvalue())
+            call_command('perfstats', '--reset', stdout=out)
+            self.assertEqual(perf.load_cache_stats()['hits'], 0)
@@ -0,0 +1,87 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..counters import drifted
+from ..export import records
+from ..models import Publisher, Author, Book
+from ..purge import purge
+from ..search import search
+
+
+@override_settings(BOOK_PURGE_BATCH_SIZE=3, BOOK_PURGE_PAUSE=0)
+class PublisherPurgeTest(TestCase):
+
+    def setUp(self):
+        self.publisher = mommy.make(Publisher, name='Penguin')
+        self.author = mommy.make(Author)
+        self.books = [mommy.make(Book, publisher=self.publisher, title='Doomed %d' % i) for i in range(7)]
+        for book in self.books[:5]:
+            book.authors.add(self.author)
+        self.kept = mommy.make(Book, authors=[self.author])
+
+    def delete(self, publisher):
+        return self.client.post(reverse('books:publisher-delete', kwargs={'pk': publisher.pk}))
+
+    def status(self):
+        return self.client.get(reverse('books:publisher-delete-status', kwargs={'pk': self.publisher.pk}))
+
+    def test_small_publishers_are_deleted_at_once(self):
+        small = mommy.make(Publisher)
+        mommy.make(Book, publisher=small, _quantity=2)
+        self.assertRedirects(self.delete(small), reverse('books:publisher_list'))
+        self.assertFalse(Publisher._base_manager.filter(pk=small.pk).exists())
+
+    def test_large_publishers_are_hidden_then_purged_in_batches(self):
+        self.assertEqual(self.status().json(), {'state': 'active', 'books': 7})
+        self.assertRedirects(self.delete(self.publisher), reverse('books:publisher_list'))
+        self.assertFalse(Publisher.objects.filter(pk=self.publisher.pk).exists())
+        detail = reverse('books:publisher-detail', kwargs={'pk': self.publisher.pk})
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        self.assertEqual(Book._base_manager.filter(publisher=self.publisher).count(), 7)
+        self.assertEqual(self.status().json()['books_remaining'], 7)
+
+        progress = []
+        self.assertEqual(purge(self.publisher.pk, progress=progress.append), 7)
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertFalse(Publisher._base_manager.filter(pk=self.publisher.pk).exists())
+        self.assertEqual(list(Book.objects.all()), [self.kept])
+        self.assertEqual(Book.authors.through.objects.count(), 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.book_count, 1)
+        self.assertEqual((drifted(Author), drifted(Publisher)), ([], []))
+        self.assertEqual(search('doomed'), [])
+        self.assertEqual(self.status().status_code, 404)
+
+    def test_books_are_hidden_with_their_publisher(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        book = self.books[0]
+        detail = reverse('books:book-detail', kwargs={'pk': book.pk})
+        self.assertContains(self.client.get(detail), book.title)
+        self.delete(self.publisher)
+
+        self.assertEqual(list(Book.objects.all()), [self.kept])
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        update = reverse('books:book-update', kwargs={'pk': book.pk})
+        self.assertEqual(self.client.get(update).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('books:book_list')), 'Doomed')
+        self.assertEqual(search('doomed'), [])
+        self.assertEqual([row['id'] for row in records('books')], [self.kept.pk])
+        response = self.client.get(reverse('books:api-list', kwargs={'resource': 'books'}))
+        self.assertEqual([row['id'] for row in response.json()['data']], [self.kept.pk])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.book_count, 6)
+
+        self.assertEqual(purge(self.publisher.pk), 7)
+        self.assertFalse(Book._base_manager.filter(publisher=self.publisher).exists())
+
+    def test_command_resumes_pending_deletions(self):
+        Publisher.objects.filter(pk=self.publisher.pk).update(deletion_requested_at='2001-01-01T00:00:00Z')
+        out = io.StringIO()
+        call_command('purge_publishers', '--batch-size', '5', stdout=out)
+        self.assertIn('Penguin: 5 of 7 books deleted', out.getvalue())
+        self.assertFalse(Publisher._base_manager.filter(pk=self.publisher.pk).exists())
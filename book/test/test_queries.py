@@ -0,0 +1,132 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..benchmark import SCENARIOS, generate_rows
+from ..explain import check_views, full_scans, plan, sorts, unbounded_sorts
+from ..importer import CatalogImporter
+from ..models import Publisher, Author, Book
+from ..queue import work
+from .utils import QueryCountMixin
+
+
+class ListQueryCountTest(QueryCountMixin, TestCase):
+
+    def test_book_list(self):
+        # MAX(updated_at) of books, publishers and authors for the ETag, the
+        # page itself joined to its publisher, and the authors prefetch.
+        self.assertConstantQueries(5, reverse('books:book_list'),
+                                   lambda: mommy.make(Book, make_m2m=True, _quantity=5))
+
+    def test_publisher_list(self):
+        # MAX(updated_at) of publishers and books for the ETag, and the page.
+        self.assertConstantQueries(3, reverse('books:publisher_list'),
+                                   lambda: mommy.make(Publisher, _quantity=5))
+
+    def test_author_list(self):
+        self.assertConstantQueries(3, reverse('books:author-list'),
+                                   lambda: mommy.make(Author, _quantity=5))
+
+    def test_book_list_only_loads_rendered_columns(self):
+        mommy.make(Book, make_m2m=True)
+        response = self.client.get(reverse('books:book_list'))
+        book = response.context['book_list'][0]
+        self.assertIn('publication_date', book.get_deferred_fields())
+        self.assertNotIn('title', book.get_deferred_fields())
+
+
+class DetailQueryCountTest(QueryCountMixin, TestCase):
+
+    def test_book_detail(self):
+        book = mommy.make(Book)
+
+        def add_rows():
+            authors = mommy.make(Author, _quantity=5)
+            book.authors.add(*authors)
+            mommy.make(Book, authors=authors, _quantity=5)
+            work(once=True)
+        # The ETag lookup, the book joined to its publisher, its authors, its
+        # related books and their collaborators.
+        self.assertConstantQueries(5, reverse('books:book-detail', kwargs={'pk': book.pk}), add_rows)
+
+    def test_publisher_detail(self):
+        publisher = mommy.make(Publisher)
+        # The ETag lookup and the publisher, whose book count is a column.
+        self.assertConstantQueries(2, reverse('books:publisher-detail', kwargs={'pk': publisher.pk}),
+                                   lambda: (mommy.make(Publisher, _quantity=5),
+                                            mommy.make(Book, publisher=publisher, _quantity=5)))
+
+    def test_books_by_publisher(self):
+        publisher = mommy.make(Publisher)
+        # The publisher, MAX(updated_at) of its books and of publishers for the
+        # ETag, then the page itself.
+        self.assertConstantQueries(4, reverse('books:publisher-books', kwargs={'pk': publisher.pk}),
+                                   lambda: mommy.make(Book, publisher=publisher, _quantity=5))
+
+    def test_author_detail(self):
+        author = mommy.make(Author)
+        # The ETag lookup, the author and its collaborators.
+        self.assertConstantQueries(3, reverse('books:author-detail', kwargs={'pk': author.pk}),
+                                   lambda: mommy.make(Book, authors=[author] + mommy.make(Author, _quantity=2),
+                                                      _quantity=5))
+
+
+class QueryPlanTest(TestCase):
+
+    def test_no_view_scans_a_whole_table(self):
+        CatalogImporter().run(generate_rows(100))
+        # Signed in, so the API, export and staff pages are planned as well.
+        client = Client()
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        report = check_views(client=client)
+        self.assertEqual(len(report), len(SCENARIOS))
+        scans = {label: scans for label, queries in report.items() for _, _, scans, _ in queries if scans}
+        self.assertEqual(scans, {})
+        sorts = {label: sorts for label, queries in report.items() for _, _, _, sorts in queries if sorts}
+        self.assertEqual(sorts, {})
+
+    def test_publisher_list_orderings_use_their_indexes(self):
+        mommy.make(Publisher, _quantity=5)
+        for sort in ('', 'popular'):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('books:publisher_list'), {'sort': sort})
+            page = queries.captured_queries[-1]['sql']
+            details = plan(page, ())
+            self.assertEqual(sorts(details), [], sort)
+            self.assertIn('publisher_live_', ' '.join(details), sort)
+
+    def test_full_scans(self):
+        details = ['SCAN book_book', 'SCAN TABLE book_author USING INDEX author_name_idx',
+                   'SEARCH book_publisher USING INTEGER PRIMARY KEY (rowid=?)',
+                   'SCAN book_search VIRTUAL TABLE INDEX 0:M2', 'SCAN CONSTANT ROW', 'SCAN TABLE U0']
+        self.assertEqual(full_scans(details, 'SELECT ... WHERE ... LIMIT 10'), ['book_book', 'U0'])
+        self.assertEqual(full_scans(['SCAN book_book'], 'SELECT id FROM book_book ORDER BY id LIMIT 51'), [])
+        self.assertEqual(full_scans(['SCAN book_book'], 'SELECT id FROM book_book WHERE title = %s LIMIT 51'),
+                         ['book_book'])
+        hidden = ('SELECT id FROM book_book WHERE NOT (publisher_id IN (SELECT U0.id FROM book_publisher U0 '
+                  'WHERE U0.deletion_requested_at IS NOT NULL)) ORDER BY id LIMIT 51')
+        self.assertEqual(full_scans(['SCAN book_book'], hidden), [])
+        # Counting, skipping ahead or aggregating walks the whole index.
+        walk = ['SCAN book_book USING COVERING INDEX book_publication_date_idx']
+        self.assertEqual(full_scans(walk, 'SELECT COUNT(*) AS "__count" FROM "book_book"'), ['book_book'])
+        self.assertEqual(full_scans(walk, 'SELECT id FROM book_book ORDER BY publication_date LIMIT 10 OFFSET 680'),
+                         ['book_book'])
+        self.assertEqual(full_scans(walk, 'SELECT id FROM book_book ORDER BY publication_date LIMIT 10'), [])
+
+    def test_unbounded_sorts(self):
+        sql = 'SELECT id FROM book_publisher WHERE deletion_requested_at IS NULL ORDER BY name LIMIT 10'
+        details = ['SEARCH book_publisher USING INDEX publisher_deletion_idx (deletion_requested_at=?)',
+                   'USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(unbounded_sorts(details, sql), ['USE TEMP B-TREE FOR ORDER BY'])
+        self.assertEqual(unbounded_sorts(details, sql.replace(' LIMIT 10', '')), [])
+        keyed = ['SEARCH book_coauthor USING COVERING INDEX coauthor_top_idx (author_id=?)',
+                 'USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(unbounded_sorts(keyed, 'SELECT ... LIMIT 5'), [])
+
+    def test_default_orderings_end_with_the_primary_key(self):
+        for model in (Publisher, Author, Book):
+            self.assertTrue(model._meta.ordering, model)
+            self.assertIn(model._meta.ordering[-1].lstrip('-'), ('pk', 'id'), model)
@@ -0,0 +1,110 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from model_mommy import mommy
+
+from .. import queue
+from ..models import Author, Book, Publisher, Task
+from ..purge import request_deletion
+
+
+@override_settings(BOOK_TASK_RETRY_DELAY=60)
+class TaskQueueTest(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.register('test.record', lambda value: self.calls.append(value))
+
+    def register(self, name, func, **options):
+        queue.task(name, **options)(func)
+        self.addCleanup(queue.TASKS.pop, name)
+
+    def test_runs_tasks_by_priority_then_age(self):
+        self.register('test.urgent', lambda value: self.calls.append('urgent %s' % value), priority=5)
+        queue.enqueue('test.record', value='first')
+        queue.enqueue('test.record', value='later', delay=60)
+        queue.enqueue('test.urgent', value='second')
+        queue.enqueue('test.record', priority=-1, value='last')
+        self.assertEqual(queue.work(once=True), 3)
+        self.assertEqual(self.calls, ['urgent second', 'first', 'last'])
+        self.assertEqual(queue.counts(), {Task.DONE: 3, Task.QUEUED: 1})
+
+    def test_key_keeps_one_copy_waiting(self):
+        first = queue.enqueue('test.record', key='record:1', value=1)
+        self.assertEqual(queue.enqueue('test.record', key='record:1', value=1), first)
+        claimed = queue.claim()
+        self.assertEqual((claimed, claimed.key, claimed.attempts), (first, None, 1))
+        # Asked for again while it runs: queued again, not merged into the running task.
+        self.assertNotEqual(queue.enqueue('test.record', key='record:1', value=1), first)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        def fail(value):
+            raise ValueError(value)
+        self.register('test.fail', fail, max_attempts=2)
+        queued = queue.enqueue('test.fail', value='boom')
+        self.assertFalse(queue.run(queue.claim()))
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts), (Task.QUEUED, 1))
+        self.assertIn('ValueError: boom', queued.error)
+        self.assertGreater(queued.run_after, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertIsNone(queue.claim())
+
+        Task.objects.update(run_after=timezone.now())
+        self.assertFalse(queue.run(queue.claim()))
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts), (Task.FAILED, 2))
+
+    def test_unknown_task_fails(self):
+        Task.objects.create(name='test.gone', run_after=timezone.now(), max_attempts=1)
+        self.assertFalse(queue.run(queue.claim()))
+        self.assertIn('LookupError', Task.objects.get().error)
+
+    def test_requeues_tasks_of_dead_workers(self):
+        queue.enqueue('test.record', value=1)
+        queue.enqueue('test.record', value=2)
+        queue.claim()
+        Task.objects.filter(attempts=1).update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        queue.claim()
+        self.assertEqual(queue.requeue_stale(3600), 1)
+        self.assertEqual(queue.counts(), {Task.QUEUED: 1, Task.RUNNING: 1})
+
+    def test_prunes_old_finished_tasks(self):
+        queue.enqueue('test.record', value=1)
+        queue.work(once=True)
+        self.assertEqual(queue.prune(days=1), 0)
+        Task.objects.update(finished_at=timezone.now() - datetime.timedelta(days=8))
+        self.assertEqual(queue.prune(days=7), 1)
+
+    def test_command_runs_due_tasks(self):
+        queue.enqueue('test.record', value=1)
+        out = io.StringIO()
+        call_command('runworker', '--once', stdout=out)
+        self.assertEqual(self.calls, [1])
+        self.assertIn('Ran 1 tasks; 0 queued, 0 running, 1 done, 0 failed.', out.getvalue())
+
+
+@override_settings(BOOK_PURGE_BATCH_SIZE=2, BOOK_PURGE_PAUSE=0)
+class QueuedWorkTest(TestCase):
+
+    def test_publisher_deletion_is_queued_once(self):
+        publisher = mommy.make(Publisher)
+        mommy.make(Book, publisher=publisher, _quantity=5)
+        publisher.refresh_from_db()
+        self.assertTrue(request_deletion(publisher))
+        request_deletion(publisher)
+        self.assertEqual(list(Task.objects.values_list('name', 'kwargs')),
+                         [('purge_publisher', '{"publisher_pk": %d}' % publisher.pk)])
+        queue.work(once=True)
+        self.assertFalse(Publisher._base_manager.filter(pk=publisher.pk).exists())
+        self.assertFalse(Book.objects.exists())
+
+    def test_headshot_saves_queue_derivatives(self):
+        author = Author.objects.create(name='ali', headshot='author_headshots/KPK.png')
+        author.save()
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.key, task.priority), ('generate_headshots',
+                                                               'generate_headshots:%d' % author.pk, 10))
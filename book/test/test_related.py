@@ -0,0 +1,132 @@
+import io
+from itertools import permutations
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from .. import related
+from ..importer import import_catalog
+from ..models import Author, Book, CoAuthor, Publisher, RelatedBook
+from ..purge import request_deletion
+from ..queue import work
+
+
+def jsonl(*rows):
+    return io.BytesIO(''.join('{"title": "%s", "publication_date": "2001-01-01", "publisher": "%s", "authors": %s}\n'
+                              % (title, publisher, '["%s"]' % '", "'.join(authors)) for title, publisher, authors in rows)
+                      .encode())
+
+
+class RelatedTest(TestCase):
+
+    def setUp(self):
+        self.publisher, self.other = mommy.make(Publisher, _quantity=2)
+        self.ann, self.bob, self.cy, self.dee = [mommy.make(Author, name=name) for name in ('Ann', 'Bob', 'Cy', 'Dee')]
+
+    def book(self, *authors, publisher=None):
+        return mommy.make(Book, publisher=publisher or self.publisher, authors=list(authors))
+
+    def assertNoDrift(self):
+        work(once=True)
+        self.assertEqual(related.stored(), related.computed())
+        stored = {}
+        for book, other, score in RelatedBook.objects.order_by('book_id', '-score', '-related_id').values_list(
+                'book_id', 'related_id', 'score'):
+            stored.setdefault(book, []).append((other, score))
+        wanted = {book: top for book, top in related.scored(Book.objects.values_list('pk', flat=True)).items() if top}
+        self.assertEqual(stored, wanted)
+
+    def test_graph_follows_author_changes(self):
+        one = self.book(self.ann, self.bob)
+        two = self.book(self.ann)
+        two.authors.add(self.bob, self.cy)
+        self.assertEqual(related.stored()[self.ann.pk, self.bob.pk], 2)
+        two.authors.remove(self.cy)
+        self.cy.book_set.add(one)
+        self.assertNoDrift()
+        self.bob.book_set.clear()
+        self.assertNotIn((self.ann.pk, self.bob.pk), related.stored())
+        one.delete()
+        self.dee.book_set.add(two)
+        self.cy.delete()
+        self.assertNoDrift()
+        self.assertEqual(related.stored(), {(self.ann.pk, self.dee.pk): 1, (self.dee.pk, self.ann.pk): 1})
+
+    def test_add_reads_pairs_by_author(self):
+        self.book(self.ann, self.bob, self.cy)
+        deltas = {pair: 1 for pair in permutations([self.ann.pk, self.bob.pk, self.cy.pk], 2)}
+        # One read of the authors' rows, matched in Python, and one UPDATE for the +1s.
+        with self.assertNumQueries(2):
+            related.add(deltas)
+        self.assertEqual(related.stored(), {pair: 2 for pair in deltas})
+
+    def test_related_books_are_ranked(self):
+        book = self.book(self.ann, self.bob)
+        both = self.book(self.ann, self.bob, publisher=self.other)
+        same_publisher = self.book(self.ann)
+        other_publisher = self.book(self.ann, publisher=self.other)
+        # Cy wrote with Bob, so Cy's books score a little too.
+        with_cy = self.book(self.bob, self.cy)
+        by_collaborator = self.book(self.cy)
+        self.book(self.dee)
+        self.assertNoDrift()
+        self.assertEqual(related.related_books(book), [both, with_cy, same_publisher, other_publisher, by_collaborator])
+        self.assertNotIn(book, related.related_books(book))
+        self.assertEqual([(author, author.books_together) for author in related.collaborators([self.bob.pk])],
+                         [(self.ann, 2), (self.cy, 1)])
+
+    def test_lists_are_refreshed_by_the_worker(self):
+        book = self.book(self.ann)
+        later = self.book(self.ann)
+        self.assertEqual(related.related_books(book), [])
+        work(once=True)
+        self.assertEqual(related.related_books(book), [later])
+        later.title = 'Renamed'
+        later.save()
+        work(once=True)
+        self.assertEqual(related.related_books(book)[0].title, 'Renamed')
+        later.delete()
+        self.assertNoDrift()
+        self.assertEqual(related.related_books(book), [])
+
+    def test_import_and_purge(self):
+        import_catalog(jsonl(('One', 'Orbit', ['Ann', 'Bob']), ('Two', 'Orbit', ['Ann', 'Eve']),
+                             ('Three', 'Tor', ['Bob'])), 'jsonl')
+        self.assertNoDrift()
+        import_catalog(jsonl(('Two', 'Orbit', ['Bob', 'Eve'])), 'jsonl')
+        self.assertNoDrift()
+        self.assertEqual(related.stored()[self.bob.pk, Author.objects.get(name='Eve').pk], 1)
+        with self.settings(BOOK_PURGE_BATCH_SIZE=1):
+            publisher = Publisher.objects.get(name='Orbit')
+            self.assertTrue(request_deletion(publisher))
+            work(once=True)
+        self.assertNoDrift()
+        self.assertFalse(CoAuthor.objects.exists())
+        self.assertFalse(RelatedBook.objects.exists())
+
+    def test_rebuild_command(self):
+        self.book(self.ann, self.bob)
+        self.book(self.bob)
+        work(once=True)
+        CoAuthor.objects.all().delete()
+        RelatedBook.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_related', '--check', stdout=out)
+        self.assertIn('2 co-author counts drifted', out.getvalue())
+        call_command('rebuild_related', stdout=out)
+        self.assertIn('Rebuilt 2 co-author counts; 2 related lists changed.', out.getvalue())
+        self.assertNoDrift()
+
+    def test_detail_pages(self):
+        book = self.book(self.ann, self.bob)
+        other = self.book(self.ann)
+        work(once=True)
+        response = self.client.get(reverse('books:book-detail', kwargs={'pk': book.pk}))
+        self.assertEqual(response.context['related_books'], [other])
+        self.assertContains(response, reverse('books:book-detail', kwargs={'pk': other.pk}))
+        self.assertEqual(response.context['collaborators'], [])
+        response = self.client.get(reverse('books:author-detail', kwargs={'pk': self.ann.pk}))
+        self.assertEqual(response.context['collaborators'], [self.bob])
+        self.assertContains(response, 'Frequent Collaborators')
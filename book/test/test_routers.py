@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Publisher, Book
+from ..routers import STICKY_COOKIE, CatalogRouter, ReplicaRoutingMiddleware
+from ..views import BookList, BookUpdate, PublisherDetail
+
+
+@override_settings(BOOK_READ_REPLICAS=['replica'])
+class CatalogRouterTest(TestCase):
+    router = CatalogRouter()
+
+    def route(self, view, method='get', cookies=None, write=False):
+        """Return where Book reads go before and after an optional write, and the response."""
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(self.router.db_for_read(Book))
+            seen.append(self.router.db_for_read(User))
+            if write:
+                self.assertEqual(self.router.db_for_write(Book), 'default')
+            seen.append(self.router.db_for_read(Book))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        self.assertIsNone(self.router.db_for_read(Book))
+        return seen, response
+
+    def test_list_and_detail_reads_go_to_replicas(self):
+        for view in (BookList.as_view(), PublisherDetail.as_view()):
+            seen, response = self.route(view)
+            self.assertEqual(seen, ['replica', None, 'replica'])
+            self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_other_views_and_methods_use_the_primary(self):
+        self.assertEqual(self.route(BookUpdate.as_view())[0], [None, None, None])
+        self.assertEqual(self.route(BookList.as_view(), 'post')[0], [None, None, None])
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        seen, response = self.route(BookList.as_view(), write=True)
+        self.assertEqual(seen, ['replica', None, 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        seen, _ = self.route(BookList.as_view(), cookies={STICKY_COOKIE: '1'})
+        self.assertEqual(seen, [None, None, None])
+
+    @override_settings(BOOK_READ_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        self.assertEqual(self.route(BookList.as_view())[0], [None, None, None])
+
+    def test_replicas_are_never_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica', 'book'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'book'))
+
+
+@override_settings(BOOK_READ_REPLICAS=['default'])
+class ReplicaRequestTest(TestCase):
+
+    def test_update_view_sets_sticky_cookie(self):
+        publisher = mommy.make(Publisher)
+        self.assertEqual(self.client.get(reverse('books:publisher_list')).status_code, 200)
+        self.assertNotIn(STICKY_COOKIE, self.client.cookies)
+        self.client.post(reverse('books:publisher-update', kwargs={'pk': publisher.pk}), {
+            'name': 'Orbit', 'address': 'a', 'city': 'b', 'state_province': 'c', 'country': 'd',
+            'website': 'https://www.google.com/'})
+        self.assertIn(STICKY_COOKIE, self.client.cookies)
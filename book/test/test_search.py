@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Publisher, Author, Book
+from ..search import match_expression, rebuild_search_index, search
+
+
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.publisher = mommy.make(Publisher, name='Penguin', city='London', country='England')
+        self.book = mommy.make(Book, title='Django for Professionals', publisher=self.publisher)
+        self.author = mommy.make(Author, name='Will Vincent')
+
+    def found(self, query):
+        return [(hit.kind, hit.object.pk) for hit in search(query)]
+
+    def test_finds_each_kind(self):
+        self.assertEqual(self.found('django'), [('book', self.book.pk)])
+        self.assertEqual(self.found('vincent'), [('author', self.author.pk)])
+        self.assertEqual(self.found('london'), [('publisher', self.publisher.pk)])
+
+    def test_prefix_and_multiple_words(self):
+        self.assertEqual(self.found('prof djan'), [('book', self.book.pk)])
+        self.assertEqual(self.found('django flask'), [])
+
+    def test_title_matches_rank_first(self):
+        mommy.make(Publisher, name='Other', city='Penguin Bay', country='pak')
+        self.assertEqual(self.found('penguin')[0], ('publisher', self.publisher.pk))
+
+    def test_index_follows_updates_and_deletes(self):
+        Book.objects.filter(pk=self.book.pk).update(title='Flask Web Development')
+        self.assertEqual(self.found('django'), [])
+        self.assertEqual(self.found('flask'), [('book', self.book.pk)])
+        self.publisher.delete()
+        self.assertEqual(self.found('flask'), [])
+        self.assertEqual(self.found('london'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(match_expression('"django" OR -(vincent'), '"django"* "OR"* "vincent"*')
+        self.assertEqual(self.found('*:"'), [])
+
+    def test_rebuild(self):
+        rebuild_search_index()
+        self.assertEqual(self.found('django'), [('book', self.book.pk)])
+
+
+class SearchViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        mommy.make(Book, title='python', _quantity=12)
+
+    def test_paginates_without_count(self):
+        url = reverse('books:search')
+        response = self.client.get(url, {'q': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'book/search.html')
+        self.assertEqual(len(response.context['hits']), 10)
+        self.assertTrue(response.context['has_next'])
+        response = self.client.get(url, {'q': 'python', 'page': 2})
+        self.assertEqual(len(response.context['hits']), 2)
+        self.assertFalse(response.context['has_next'])
+
+    def test_empty_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('books:search'))
+        self.assertEqual(response.context['hits'], [])
+
+    def test_invalid_page(self):
+        response = self.client.get(reverse('books:search'), {'q': 'python', 'page': 'x'})
+        self.assertEqual(response.status_code, 404)
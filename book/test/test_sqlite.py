@@ -0,0 +1,32 @@
+from django.db import NotSupportedError, connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..benchmark import run_concurrency
+from ..sqlite import configure_connection, current_pragmas
+
+
+class ConfigureConnectionTest(SimpleTestCase):
+    allow_database_queries = True
+
+    def test_is_connected(self):
+        self.assertTrue(any('book.sqlite.configure_connection' in str(key) for key, _ in connection_created.receivers))
+
+    def test_applies_configured_pragmas(self):
+        with override_settings(BOOK_SQLITE_PRAGMAS={'cache_size': -1234, 'busy_timeout': 2500}):
+            configure_connection(None, connection)
+            self.assertEqual(current_pragmas(connection, ['cache_size', 'busy_timeout']),
+                             {'cache_size': -1234, 'busy_timeout': 2500})
+        with override_settings(BOOK_SQLITE_PRAGMAS={}):
+            configure_connection(None, connection)
+            self.assertEqual(current_pragmas(connection, ['cache_size'])['cache_size'], -1234)
+        configure_connection(None, connection)
+        self.assertEqual(current_pragmas(connection, ['cache_size'])['cache_size'], -64000)
+
+
+class RunConcurrencyTest(TestCase):
+
+    def test_needs_a_database_file(self):
+        # The test database lives in memory, which forked workers cannot share.
+        with self.assertRaises(NotSupportedError):
+            run_concurrency(seconds=0)
@@ -0,0 +1,69 @@
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import staticfiles
+
+CSS = 'book/vendor/bootstrap/css/bootstrap.min.css'
+
+
+class StaticFilesTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(STATIC_ROOT=cls.root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def get(self, url, encoding=''):
+        return self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_pages_link_hashed_vendored_assets(self):
+        response = self.client.get(reverse('books:book_list'))
+        self.assertNotContains(response, 'bootstrapcdn.com')
+        self.assertNotContains(response, 'googleapis.com')
+        self.assertContains(response, staticfiles_storage.url(CSS))
+        self.assertNotEqual(staticfiles_storage.url(CSS), '/static/' + CSS)
+
+    def test_serves_precompressed_siblings_for_a_year(self):
+        url = staticfiles_storage.url(CSS)
+        plain = self.get(url)
+        content = b''.join(plain.streaming_content)
+        self.assertEqual(plain['Cache-Control'], staticfiles.IMMUTABLE)
+        self.assertEqual(plain['Content-Type'], 'text/css')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        compressed = self.get(url, 'gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(compressed.streaming_content)), content)
+        self.assertLess(int(compressed['Content-Length']), len(content))
+        self.assertFalse(self.get(url, 'gzip;q=0').has_header('Content-Encoding'))
+
+    @unittest.skipIf(staticfiles.brotli is None, 'brotli is not installed')
+    def test_prefers_brotli(self):
+        response = self.get(staticfiles_storage.url(CSS), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn(b'Bootstrap v3.4.0', staticfiles.brotli.decompress(b''.join(response.streaming_content)))
+
+    def test_unhashed_names_are_revalidated(self):
+        self.assertEqual(self.get('/static/' + CSS)['Cache-Control'], 'no-cache')
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.get('/static/book/missing.css').status_code, 404)
+        self.assertEqual(self.get('/static/../books/settings.py').status_code, 404)
+        self.assertEqual(self.client.post(staticfiles_storage.url(CSS)).status_code, 405)
@@ -0,0 +1,100 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from model_mommy import mommy
+from PIL import Image
+
+from ..models import Author, Task
+from ..queue import work
+from ..thumbnails import SIZES, derivative_name, generate_derivatives
+
+
+class HeadshotDerivativeTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'author_headshots'))
+        shutil.copy(os.path.join(settings.MEDIA_ROOT, 'author_headshots', 'KPK.png'),
+                    os.path.join(self.media_root, 'author_headshots'))
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        with mock.patch('book.thumbnails.schedule_derivatives'):
+            self.author = mommy.make(Author, headshot='author_headshots/KPK.png')
+
+    def test_generates_every_size_and_format(self):
+        digest = generate_derivatives(self.author.pk)
+        for size in SIZES:
+            for fmt in ('webp', 'jpeg'):
+                with default_storage.open(derivative_name(digest, size, fmt)) as derived:
+                    image = Image.open(derived)
+                    self.assertEqual(image.size, (size, size))
+                    self.assertEqual(image.format, fmt.upper())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.headshot_digest, digest)
+        self.assertEqual(self.author.headshot_url(64, 'webp'), '/media/' + derivative_name(digest, 64, 'webp'))
+
+    def test_regenerating_reuses_content_hashed_names(self):
+        digest = generate_derivatives(self.author.pk)
+        with mock.patch('book.thumbnails._render') as render:
+            self.assertEqual(generate_derivatives(self.author.pk), digest)
+        render.assert_not_called()
+
+    def test_backfill_command_queues_missing_derivatives(self):
+        with mock.patch('book.thumbnails.schedule_derivatives'):
+            done = mommy.make(Author, headshot='author_headshots/KPK.png', headshot_digest='abc')
+            mommy.make(Author, headshot='')
+        out = io.StringIO()
+        call_command('backfill_headshots', stdout=out)
+        self.assertIn('Queued derivatives for 1 headshots.', out.getvalue())
+        self.assertEqual(Task.objects.filter(name='generate_headshots').count(), 1)
+        work(once=True)
+        self.author.refresh_from_db()
+        self.assertNotEqual(self.author.headshot_digest, '')
+        call_command('backfill_headshots', '--all', stdout=out)
+        self.assertIn('Queued derivatives for 2 headshots.', out.getvalue())
+        self.assertTrue(Task.objects.filter(key='generate_headshots:%d' % done.pk).exists())
+
+    def test_missing_original_is_skipped(self):
+        Author.objects.filter(pk=self.author.pk).update(headshot='author_headshots/missing.jpg')
+        self.assertIsNone(generate_derivatives(self.author.pk))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.headshot_digest, '')
+        self.assertEqual(self.author.headshot_url(64), '/media/author_headshots/missing.jpg')
+
+
+class HeadshotSignalTest(TestCase):
+
+    @mock.patch('book.thumbnails.schedule_derivatives')
+    def test_saving_a_headshot_schedules_work(self, schedule):
+        author = Author.objects.create(salutation='sir', name='ali', headshot='author_headshots/KPK.png')
+        schedule.assert_called_once_with(author)
+        author.save(update_fields=['name'])
+        Author.objects.create(salutation='sir', name='no picture')
+        self.assertEqual(schedule.call_count, 1)
+
+    @mock.patch('book.thumbnails.schedule_derivatives')
+    def test_replacing_a_headshot_forgets_its_derivatives(self, schedule):
+        author = Author.objects.create(salutation='sir', name='ali', headshot='author_headshots/KPK.png')
+        Author.objects.filter(pk=author.pk).update(headshot_digest='abc')
+        author.refresh_from_db()
+        author.name = 'Ali'
+        author.save()
+        self.assertEqual(Author.objects.get(pk=author.pk).headshot_digest, 'abc')
+        author.headshot = 'author_headshots/new.png'
+        author.save()
+        self.assertEqual(author.headshot_url(64), '/media/author_headshots/new.png')
+        self.assertEqual(Author.objects.get(pk=author.pk).headshot_digest, '')
+        Author.objects.filter(pk=author.pk).update(headshot_digest='def')
+        author.refresh_from_db()
+        author.headshot = 'author_headshots/KPK.png'
+        author.save(update_fields=['headshot'])
+        self.assertEqual(Author.objects.get(pk=author.pk).headshot_digest, '')
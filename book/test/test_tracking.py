@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.urls import reverse
+from model_mommy import mommy
+
+from ..models import Author, Book
+from ..tracking import AccessBuffer, access_buffer
+
+
+class AccessTrackingViewTest(TestCase):
+
+    def setUp(self):
+        access_buffer.clear()
+        self.book = mommy.make(Book)
+        self.author = mommy.make(Author)
+
+    def tearDown(self):
+        access_buffer.clear()
+
+    def test_detail_get_does_not_write(self):
+        url = reverse('books:book-detail', kwargs={'pk': self.book.pk})
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        self.assertEqual(access_buffer.pending(Book, self.book.pk), 1)
+
+    def test_hits_are_flushed_in_bulk(self):
+        for _ in range(3):
+            self.client.get(reverse('books:book-detail', kwargs={'pk': self.book.pk}))
+            self.client.get(reverse('books:author-detail', kwargs={'pk': self.author.pk}))
+        # One UPDATE per model, however many hits were buffered.
+        with self.assertNumQueries(2):
+            access_buffer.flush()
+        self.book.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.book.view_count, 3)
+        self.assertEqual(self.author.view_count, 3)
+        self.assertIsNotNone(self.book.last_accessed)
+
+    def test_missing_object_is_not_recorded(self):
+        self.client.get(reverse('books:author-detail', kwargs={'pk': self.author.pk + 1}))
+        self.assertEqual(access_buffer.pending(Author, self.author.pk + 1), 0)
+
+
+class AccessBufferTest(TestCase):
+
+    def test_flush_adds_to_stored_count(self):
+        books = mommy.make(Book, view_count=5, _quantity=3)
+        buffer = AccessBuffer()
+        buffer.batch_size = 2
+        for book in books:
+            buffer.record(Book, book.pk)
+        buffer.record(Book, str(books[0].pk))
+        self.assertEqual(buffer.flush(), 3)
+        counts = dict(Book.objects.values_list('pk', 'view_count'))
+        self.assertEqual(counts, {books[0].pk: 7, books[1].pk: 6, books[2].pk: 6})
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_flush_if_due_waits_for_interval(self):
+        book = mommy.make(Book)
+        buffer = AccessBuffer(flush_interval=3600)
+        buffer.record(Book, book.pk)
+        buffer.flush_if_due()
+        self.assertEqual(buffer.pending(Book, book.pk), 1)
+        buffer.flush_interval = 0
+        buffer.flush_if_due()
+        self.assertEqual(buffer.pending(Book, book.pk), 0)
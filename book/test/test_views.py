@@ -2,14 +2,31 @@ from model_mommy import mommy
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import resolve, reverse
-from ..models import Publisher, Author, Book
 from ..views import PublisherUpdate, home, AuthorUpdate, BookCreate, BookUpdate
-from model_mommy.recipe import Recipe, foreign_key
+from .utils import bulk_make_recipe
+
+
+class LoggedInTestCase(TestCase):
+    """Rows made once per class in ``setUpTestData`` and rolled back after each test."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.username = 'john'
+        cls.password = '123'
+        cls.user = User.objects.create_user(username=cls.username, email='john@doe.com', password=cls.password)
+
+    def setUp(self):
+        # No password check per test.
+        self.client.force_login(self.user)
 
 
 class HomeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.board = mommy.make_recipe('book.publisher', name='Django', address='Django board.')
+
     def setUp(self):
-        self.board = Publisher.objects.create(name='Django', address='Django board.')
         url = reverse('books:home')
         self.response = self.client.get(url)
 
@@ -24,15 +41,8 @@ class HomeTests(TestCase):
 class PublisherListViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
-        # Create 13 authors for pagination tests
-        number_of_publisher = 15
-
-        for publisher_id in range(number_of_publisher):
-            Publisher.objects.create(
-                name='ali {publisher_id}', address='ryk {publisher_id}', city='bwp {publisher_id}',
-                state_province='punjab {publisher_id}',
-                country='pak {publisher_id}', website='https://www.google.com/ {publisher_id}'
-            )
+        # 15 publishers for pagination tests
+        bulk_make_recipe('book.publisher', 15)
 
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get('/publishers/')
@@ -55,20 +65,28 @@ class PublisherListViewTest(TestCase):
         self.assertTrue(len(response.context['publisher_list']) == 10)
 
     def test_lists_all_publishers(self):
-        # Get second page and confirm it has (exactly) remaining 3 items
+        # Get second page and confirm it has (exactly) remaining 5 items
         response = self.client.get(reverse('books:publisher_list') + '?page=2')
         self.assertEqual(response.status_code, 200)
         self.assertTrue('is_paginated' in response.context)
         self.assertTrue(response.context['is_paginated'] == True)
         self.assertTrue(len(response.context['publisher_list']) == 5)
 
+    def test_rows_share_one_delete_modal(self):
+        response = self.client.get(reverse('books:publisher_list'))
+        self.assertTemplateUsed(response, 'base.html')
+        self.assertContains(response, 'class="delete-link"', count=10)
+        self.assertContains(response, 'id="delete-modal"', count=1)
+        self.assertContains(response, 'csrfmiddlewaretoken', count=1)
+
 
 class PublisherCreateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher1 = mommy.make_recipe('book.publisher', name='ali')
+
     def setUp(self):
-        self.user = User.objects.create_user(username='john', password='123')
         self.create_url = reverse('books:publisher-add')
-        self.publisher1 = Publisher.objects.create(name="ali", address="ryk", city="bwp", state_province="punjab",
-                                                   country="pak", website="https://www.google.com/")
 
     def test_create_success_url(self):
         response = self.client.post(self.create_url,
@@ -89,36 +107,28 @@ class PublisherCreateTest(TestCase):
         self.assertEquals(response.status_code, 200)
 
 
-class PublisherUpdateTestCase(TestCase):
-    def setUp(self):
-        self.publisher = Publisher.objects.create(name='Django', address='Django board.')
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.update_url = reverse('books:publisher-update', args={'pk': self.user.id})
-
-        self.url = reverse('books:publisher-update', kwargs={
-            'pk': self.publisher.pk,
-
-        })
-        self.url_delete = reverse('books:publisher-delete', kwargs={
-            'pk': self.publisher.pk,
+class PublisherUpdateTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.publisher = mommy.make_recipe('book.publisher', name='Django', address='Django board.')
 
-        })
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('books:publisher-update', kwargs={'pk': self.publisher.pk})
+        self.url_delete = reverse('books:publisher-delete', kwargs={'pk': self.publisher.pk})
 
 
 class PublisherUpdateViewTests(PublisherUpdateTestCase):
     def setUp(self):
         super().setUp()
-        self.client.login(username=self.username, password=self.password)
         self.response = self.client.get(self.url)
 
     def test_status_code(self):
         self.assertEquals(self.response.status_code, 200)
 
     def test_update_publisher(self):
-        book = Publisher.objects.create(name='The Catcher in the Rye')
+        book = mommy.make_recipe('book.publisher', name='The Catcher in the Rye', address='')
 
         response = self.client.post(
             reverse('books:publisher-update', kwargs={'pk': book.id}),
@@ -143,9 +153,6 @@ class PublisherUpdateViewTests(PublisherUpdateTestCase):
 
 
 class TestDeletePublisher(PublisherUpdateTestCase):
-    def setUp(self):
-        super().setUp()
-        self.client.login(username=self.username, password=self.password)
 
     def test_my_get_request(self):
         response = self.client.get(self.url_delete)
@@ -156,41 +163,24 @@ class TestDeletePublisher(PublisherUpdateTestCase):
         self.assertRedirects(response, '/publishers/', status_code=302)
 
 
-class PublisherDetailViewTestCase(TestCase):
+class PublisherDetailViewTestCase(LoggedInTestCase):
 
-    def setUp(self):
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.publisher = Publisher.objects.create(
-            name="ali", address="ryk", city="bwp", state_province="punjab",
-            country="pak", website="https://www.google.com/"
-        )
-        self.url_delete = reverse('books:publisher-detail', kwargs={
-                    'pk': self.publisher.pk,
-
-                })
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.publisher = mommy.make_recipe('book.publisher', name='ali')
 
     def test_detail_template(self):
-
-        resp = self.client.get(self.url_delete)
-        self.assertEqual(resp.status_code,200)
-        self.assertTemplateUsed(resp,'book/publisher_detail.html')
+        resp = self.client.get(reverse('books:publisher-detail', kwargs={'pk': self.publisher.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'book/publisher_detail.html')
 
 
 class AuthorListViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
-        # Create 13 authors for pagination tests
-        number_of_publisher = 15
-
-        for publisher_id in range(number_of_publisher):
-            Author.objects.create(
-                salutation='ali {publisher_id}', name='ryk {publisher_id}',
-                email='https://www.google.com/ {publisher_id}',
-                headshot='punjab {publisher_id}'
-            )
+        # 15 authors for pagination tests
+        bulk_make_recipe('book.author', 15, headshot='punjab')
 
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get('/authors/')
@@ -209,7 +199,7 @@ class AuthorListViewTest(TestCase):
         self.assertTrue(len(response.context['author_list']) == 10)
 
     def test_lists_all_authors(self):
-        # Get second page and confirm it has (exactly) remaining 3 items
+        # Get second page and confirm it has (exactly) remaining 5 items
         response = self.client.get(reverse('books:author-list') + '?page=2')
         self.assertEqual(response.status_code, 200)
         self.assertTrue('is_paginated' in response.context)
@@ -218,10 +208,12 @@ class AuthorListViewTest(TestCase):
 
 
 class AuthorCreateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author1 = mommy.make_recipe('book.author', name='ali', headshot='bwp')
+
     def setUp(self):
-        self.user = User.objects.create_user(username='john', password='123')
         self.create_url = reverse('books:author-add')
-        self.author1 = Author.objects.create(salutation="sir", name="ali", email="shah870@gmail.com", headshot="bwp")
 
     def test_create_success_url(self):
         response = self.client.post(self.create_url,
@@ -240,36 +232,28 @@ class AuthorCreateTest(TestCase):
         self.assertEquals(response.status_code, 200)
 
 
-class AuthorUpdateTestCase(TestCase):
-    def setUp(self):
-        self.author = Author.objects.create(salutation='sir', name='Django')
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.update_url = reverse('books:author-update', args={'pk': self.user.id})
-
-        self.url = reverse('books:author-update', kwargs={
-            'pk': self.author.pk,
-
-        })
-        self.url_delete = reverse('books:author-delete', kwargs={
-            'pk': self.author.pk,
+class AuthorUpdateTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = mommy.make_recipe('book.author', name='Django', email='')
 
-        })
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('books:author-update', kwargs={'pk': self.author.pk})
+        self.url_delete = reverse('books:author-delete', kwargs={'pk': self.author.pk})
 
 
 class AuthorUpdateViewTests(AuthorUpdateTestCase):
     def setUp(self):
         super().setUp()
-        self.client.login(username=self.username, password=self.password)
         self.response = self.client.get(self.url)
 
     def test_status_code(self):
         self.assertEquals(self.response.status_code, 200)
 
     def test_update_author(self):
-        book = Author.objects.create(name='The Catcher in the Rye')
+        book = mommy.make_recipe('book.author', name='The Catcher in the Rye', email='')
 
         response = self.client.post(
             reverse('books:author-update', kwargs={'pk': book.id}),
@@ -294,9 +278,6 @@ class AuthorUpdateViewTests(AuthorUpdateTestCase):
 
 
 class TestDeleteAuthor(AuthorUpdateTestCase):
-    def setUp(self):
-        super().setUp()
-        self.client.login(username=self.username, password=self.password)
 
     def test_my_get_request(self):
         response = self.client.get(self.url_delete)
@@ -306,34 +287,26 @@ class TestDeleteAuthor(AuthorUpdateTestCase):
         response = self.client.post(self.url_delete)
         self.assertRedirects(response, '/authors/', status_code=302)
 
-class AuthorDetailViewTestCase(TestCase):
-    '''Tests for the Article detail view'''
 
-    def setUp(self):
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.author = Author.objects.create(salutation="sir", name="ali", email="shah870@gmail.com", headshot="bwp")
-        self.url_delete = reverse('books:author-detail', kwargs={
-                    'pk': self.author.pk,
+class AuthorDetailViewTestCase(LoggedInTestCase):
+    '''Tests for the Article detail view'''
 
-                })
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = mommy.make_recipe('book.author', name='ali', headshot='bwp')
 
     def test_detail_template(self):
-
-        resp = self.client.get(self.url_delete)
-        self.assertEqual(resp.status_code,200)
-        self.assertTemplateUsed(resp,'book/author_detail.html')
+        resp = self.client.get(reverse('books:author-detail', kwargs={'pk': self.author.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'book/author_detail.html')
 
 
 class BooklistTest(TestCase):
 
-    def setUp(self):
-        number_of_publisher = 15
-
-        for publisher_id in range(number_of_publisher):
-            self.kid = mommy.make(Book, make_m2m=True)
+    @classmethod
+    def setUpTestData(cls):
+        mommy.make_recipe('book.book', make_m2m=True, _quantity=15)
 
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get('/books/')
@@ -352,7 +325,7 @@ class BooklistTest(TestCase):
         self.assertTrue(len(response.context['book_list']) == 10)
 
     def test_lists_all_books(self):
-        # Get second page and confirm it has (exactly) remaining 3 items
+        # Get second page and confirm it has (exactly) remaining 5 items
         response = self.client.get(reverse('books:book_list') + '?page=2')
         self.assertEqual(response.status_code, 200)
         self.assertTrue('is_paginated' in response.context)
@@ -360,41 +333,28 @@ class BooklistTest(TestCase):
         self.assertTrue(len(response.context['book_list']) == 5)
 
 
-# class BookCreateTest(TestCase):
-#     def setUp(self):
-#         self.user = User.objects.create_user(username='john', password='123')
-#         self.create_url = reverse('books:book-add')
-#         self.author1 = mommy.make(Book, make_m2m=True)
-#
-#     def test_publisher_POST_data(self):
-#         response = self.client.post(self.create_url)
-#         self.assertEquals(response.status_code, 200)
-#
+class BookCreateTests(LoggedInTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.publisher = mommy.make_recipe('book.publisher', name='ali')
+        cls.author = mommy.make_recipe('book.author', name='ali', headshot='bwp')
+        cls.book = mommy.make_recipe('book.book', make_m2m=True)
 
-class BookCreateTests(TestCase):
     def setUp(self):
-        self.publisher = Publisher.objects.create(
-            name="ali", address="ryk", city="bwp", state_province="punjab",
-            country="pak", website="https://www.google.com/"
-        )
-        user = User.objects.create_user(username='john', email='john@doe.com', password='123')
-        self.author = Author.objects.create(salutation="sir", name="ali", email="shah870@gmail.com", headshot="bwp")
-        self.book = mommy.make(Book, make_m2m=True)
-        # Book.objects.create(title='python', authors=self.author.id, publisher=self.publisher.id,
-        #                     publication_date="2001-01-01", created_by=user)
-        url = reverse('books:book_list')
-        self.response = self.client.get(url)
+        super().setUp()
+        self.response = self.client.get(reverse('books:book_list'))
         self.create_url = reverse('books:book-add')
 
     def test_create_success_url(self):
 
         response = self.client.post(self.create_url,
-                                            {'title': 'sir',
-                                             'publisher': self.publisher.id,
-                                             'authors': self.author.id,
-                                             'publication_date': '2001-01-01',
-                                             }
-                                            )
+                                    {'title': 'sir',
+                                     'publisher': self.publisher.id,
+                                     'authors': self.author.id,
+                                     'publication_date': '2001-01-01',
+                                     }
+                                    )
 
         self.assertEquals(response.status_code, 302)
         self.assertRedirects(response, '/books/')
@@ -407,41 +367,30 @@ class BookCreateTests(TestCase):
         self.assertEquals(view.func.view_class, BookCreate)
 
 
-class BookUpdateTestCase(TestCase):
-    def setUp(self):
-        self.publisher = Publisher.objects.create(
-            name="ali", address="ryk", city="bwp", state_province="punjab",
-            country="pak", website="https://www.google.com/"
-        )
-        self.author = Author.objects.create(salutation="sir", name="ali", email="shah870@gmail.com", headshot="bwp")
-        self.book = mommy.make(Book, make_m2m=True)
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.update_url = reverse('books:book-update', args={'pk': self.user.id})
-
-        self.url = reverse('books:book-update', kwargs={
-            'pk': self.author.pk,
-
-        })
-        self.url_delete = reverse('books:book-delete', kwargs={
-            'pk': self.author.pk,
+class BookUpdateTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.publisher = mommy.make_recipe('book.publisher', name='ali')
+        cls.author = mommy.make_recipe('book.author', name='ali', headshot='bwp')
+        cls.book = mommy.make_recipe('book.book', make_m2m=True)
 
-        })
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('books:book-update', kwargs={'pk': self.book.pk})
+        self.url_delete = reverse('books:book-delete', kwargs={'pk': self.book.pk})
 
 
 class BookUpdateViewTests(BookUpdateTestCase):
     def setUp(self):
         super().setUp()
-        self.client.login(username=self.username, password=self.password)
         self.response = self.client.get(self.url)
 
     def test_status_code(self):
         self.assertEquals(self.response.status_code, 200)
 
     def test_update_author(self):
-        book = mommy.make(Book, make_m2m=True)
+        book = mommy.make_recipe('book.book', make_m2m=True)
 
         response = self.client.post(
             reverse('books:book-update', kwargs={'pk': book.id}),
@@ -458,16 +407,13 @@ class BookUpdateViewTests(BookUpdateTestCase):
 
     def test_update_inputs(self):
         self.assertContains(self.response, '<title', 0)
-        #self.assertContains(self.response, '<headshot', 0)
 
     def test_view_class(self):
         view = resolve('/bookupdate/1/')
         self.assertEquals(view.func.view_class, BookUpdate)
 
+
 class TestDeleteBook(BookUpdateTestCase):
-    def setUp(self):
-        super().setUp()
-        self.client.login(username=self.username, password=self.password)
 
     def test_my_get_request(self):
         response = self.client.get(self.url_delete)
@@ -478,23 +424,15 @@ class TestDeleteBook(BookUpdateTestCase):
         self.assertRedirects(response, '/books/', status_code=302)
 
 
-class BookDetailViewTestCase(TestCase):
+class BookDetailViewTestCase(LoggedInTestCase):
     '''Tests for the Article detail view'''
 
-    def setUp(self):
-        self.username = 'john'
-        self.password = '123'
-        self.user = User.objects.create_user(username=self.username, email='john@doe.com', password=self.password)
-        self.client.login(username='john', password='123')
-        self.book = mommy.make(Book, make_m2m=True)
-        self.url_delete = reverse('books:book-detail', kwargs={
-                    'pk': self.book.pk,
-
-                })
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.book = mommy.make_recipe('book.book', make_m2m=True)
 
     def test_detail_template(self):
-
-        resp = self.client.get(self.url_delete)
-        self.assertEqual(resp.status_code,200)
-        self.assertTemplateUsed(resp,'book/book_detail.html')
-
+        resp = self.client.get(reverse('books:book-detail', kwargs={'pk': self.book.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'book/book_detail.html')
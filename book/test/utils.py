@@ -0,0 +1,25 @@
+from model_mommy import mommy
+
+from ..cache import get_cache
+from ..tracking import access_buffer
+
+
+class QueryCountMixin:
+    """Assert that a page runs the same number of queries however many rows it shows."""
+
+    def assertConstantQueries(self, num, url, add_rows, rounds=2):
+        for _ in range(rounds):
+            add_rows()
+            # Measure the rendering path, not a page cache hit.
+            get_cache().clear()
+            # Restart the flush interval, or the page's own hit may be flushed inside the count.
+            access_buffer.flush()
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+
+def bulk_make_recipe(name, quantity, **attrs):
+    """Insert ``quantity`` rows of the ``book.mommy_recipes`` recipe ``name`` with one bulk INSERT."""
+    objects = mommy.prepare_recipe(name, _quantity=quantity, **attrs)
+    return type(objects[0]).objects.bulk_create(objects)
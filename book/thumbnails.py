@@ -0,0 +1,95 @@
+"""
+Fixed-size WebP/JPEG derivatives of ``Author.headshot``.
+
+Derivatives are named after a hash of the original's content, so a name never
+changes meaning and can be served with a far-future cache lifetime. They are
+generated by a ``book.queue`` worker, never inside the AuthorCreate/AuthorUpdate
+request.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+SIZES = getattr(settings, 'BOOK_HEADSHOT_SIZES', (64, 256))
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+DERIVED_DIR = 'author_headshots/derived'
+
+
+def derivative_name(digest, size, fmt):
+    return '%s/%s-%d.%s' % (DERIVED_DIR, digest, size, fmt)
+
+
+def _render(image, size, fmt):
+    thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if thumbnail.mode not in ('RGB', 'L'):
+        thumbnail = thumbnail.convert('RGB')
+    output = io.BytesIO()
+    thumbnail.save(output, FORMATS[fmt], quality=85)
+    return output.getvalue()
+
+
+def generate_derivatives(author_pk, storage=None):
+    """Write any missing derivatives of an author's headshot and record their digest."""
+    from book.cache import invalidate
+    from book.models import Author
+
+    storage = storage or default_storage
+    author = Author.objects.only('headshot', 'headshot_digest').get(pk=author_pk)
+    name = author.headshot.name
+    if not name:
+        return None
+    try:
+        with storage.open(name) as original:
+            data = original.read()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (IOError, OSError):
+        logger.warning('Cannot read headshot %r of author %s.', name, author_pk)
+        return None
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    for size in SIZES:
+        for fmt in FORMATS:
+            derived = derivative_name(digest, size, fmt)
+            if not storage.exists(derived):
+                storage.save(derived, ContentFile(_render(image, size, fmt)))
+    # Only record the digest if the headshot was not replaced while we worked.
+    if Author.objects.filter(pk=author_pk, headshot=name).update(
+            headshot_digest=digest, updated_at=timezone.now()):
+        invalidate(Author, [author_pk])
+    return digest
+
+
+def schedule_derivatives(author):
+    from book import queue
+
+    queue.enqueue('generate_headshots', key='generate_headshots:%d' % author.pk, author_pk=author.pk)
+
+
+def headshot_pre_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._headshot_replaced = False
+    if raw or instance.pk is None or (update_fields is not None and 'headshot' not in update_fields):
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).values_list('headshot').first()
+    if previous is not None and (previous[0] or '') != (instance.headshot.name or ''):
+        # The derivatives are of the old image; serve the original until new ones exist.
+        instance.headshot_digest = ''
+        instance._headshot_replaced = True
+
+
+def headshot_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'headshot' not in update_fields:
+        return
+    replaced = getattr(instance, '_headshot_replaced', False)
+    if replaced and update_fields is not None and 'headshot_digest' not in update_fields:
+        # save(update_fields=...) did not write the digest headshot_pre_save cleared.
+        sender._base_manager.filter(pk=instance.pk).update(headshot_digest='')
+    if instance.headshot:
+        schedule_derivatives(instance)
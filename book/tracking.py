@@ -0,0 +1,78 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, F, IntegerField, Value, When
+from django.utils import timezone
+
+
+class AccessBuffer:
+    """
+    Aggregate detail-page hits in memory and write them back in bulk.
+
+    ``record()`` only touches a dict, so serving a detail page stays read-only.
+    ``flush()`` turns everything collected since the last flush into one
+    ``UPDATE ... SET view_count = view_count + CASE ...`` per model (and per
+    ``batch_size`` rows), instead of one write transaction per request.
+    """
+    batch_size = 200
+
+    def __init__(self, flush_interval=10):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, model, pk, when=None):
+        key = (model, model._meta.pk.to_python(pk))
+        when = when or timezone.now()
+        with self._lock:
+            count, _ = self._hits.get(key, (0, None))
+            self._hits[key] = (count + 1, when)
+
+    def pending(self, model, pk):
+        return self._hits.get((model, model._meta.pk.to_python(pk)), (0, None))[0]
+
+    def clear(self):
+        with self._lock:
+            self._hits = {}
+
+    def flush(self):
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            self._last_flush = time.monotonic()
+        by_model = {}
+        for (model, pk), value in hits.items():
+            by_model.setdefault(model, []).append((pk, value))
+        for model, rows in by_model.items():
+            for start in range(0, len(rows), self.batch_size):
+                self._update(model, rows[start:start + self.batch_size])
+        return len(hits)
+
+    def flush_if_due(self):
+        if self._hits and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _update(self, model, rows):
+        counts = [When(pk=pk, then=Value(count)) for pk, (count, _) in rows]
+        times = [When(pk=pk, then=Value(when)) for pk, (_, when) in rows]
+        model._base_manager.filter(pk__in=[pk for pk, _ in rows]).update(
+            view_count=F('view_count') + Case(*counts, default=Value(0), output_field=IntegerField()),
+            last_accessed=Case(*times, default=F('last_accessed'), output_field=DateTimeField()),
+        )
+
+
+access_buffer = AccessBuffer(getattr(settings, 'BOOK_ACCESS_FLUSH_INTERVAL', 10))
+
+
+def flush_access_buffer(**kwargs):
+    access_buffer.flush_if_due()
+
+
+class AccessTrackingMixin:
+    """Count successful GETs of a DetailView without writing to its row."""
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        access_buffer.record(self.get_queryset().model, self.kwargs[self.pk_url_kwarg])
+        return response
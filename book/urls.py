@@ -1,17 +1,30 @@
-from django.urls import path
+from django.urls import path, re_path
+import book.api
 import book.views
 from book.views import PublisherDetail, PublisherList, BookList,  BookDetail, AuthorDetailView, \
     AuthorCreate, AuthorUpdate, AuthorDelete, AuthorList, PublisherCreate, PublisherUpdate, PublisherDelete, BookCreate, \
-    BookUpdate, BookDelete
+    BookUpdate, BookDelete, SearchView, CatalogImport, BooksByPublisher, BrowseView
 
 app_name = 'books'
 urlpatterns = [
     path('', book.views.home, name="home"),
+    path('search/', SearchView.as_view(), name='search'),
+    path('browse/', BrowseView.as_view(), name='browse'),
+    re_path(r'^autocomplete/(?P<kind>authors|publishers)/$', book.views.autocomplete, name='autocomplete'),
+    re_path(r'^export/(?P<kind>books|authors|publishers)\.(?P<fmt>csv|jsonl)(?P<gz>\.gz)?$',
+            book.views.export_catalog, name='export'),
+    path('import/', CatalogImport.as_view(), name='import'),
+    path('perf/', book.views.perf_stats, name='perf'),
+    re_path(r'^api/v1/(?P<resource>books|authors|publishers)/$', book.api.resource_list, name='api-list'),
+    re_path(r'^api/v1/(?P<resource>books|authors|publishers)/(?P<pk>[0-9]+)/$', book.api.resource_detail,
+            name='api-detail'),
     path('publishers/', PublisherList.as_view(), name='publisher_list'),
     path('publisheradd/', PublisherCreate.as_view(), name='publisher-add'),
     path('publisherupdate/<pk>/', PublisherUpdate.as_view(), name='publisher-update'),
     path('publisher/<pk>/delete/', PublisherDelete.as_view(), name='publisher-delete'),
+    path('publisher/<int:pk>/delete/status/', book.views.publisher_deletion_status, name='publisher-delete-status'),
     path('<int:pk>/', PublisherDetail.as_view(), name='publisher-detail'),
+    path('<int:pk>/books/', BooksByPublisher.as_view(), name='publisher-books'),
     path('books/', BookList.as_view(), name='book_list'),
     path('bookadd/', BookCreate.as_view(), name='book-add'),
     path('bookupdate/<pk>/', BookUpdate.as_view(), name='book-update'),
@@ -1,20 +1,123 @@
-from book.forms import MyCommentForm
-from django.utils import timezone
+from book.forms import BookForm, MyCommentForm, CatalogImportForm
 from django.views.generic import DetailView
 from django.views.generic import ListView
+from django.views.generic import TemplateView
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.views.generic.edit import FormView
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from book.models import Book, Publisher
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from book.models import Author
-from django.shortcuts import render, redirect
+from book.cache import CachedPageMixin, model_key
+from book.conditional import ConditionalGetMixin
+from book.export import export
+from book.facets import FacetFilterMixin
+from book.importer import import_catalog
+from book.pagination import KeysetPaginationMixin, SortMixin
+from book.purge import deletion_status, request_deletion
+from book import facets, perf, related
+from book.search import complete, search
+from book.tracking import AccessTrackingMixin
+from django.shortcuts import get_object_or_404, render, redirect
 
 
 def home(request):
     return render(request, 'book/home.html')
 
 
-class PublisherList(ListView):
-    model = Publisher
+def export_catalog(request, kind, fmt, gz=None):
+    # Author rows carry email addresses, so each kind needs its own view permission.
+    if not request.user.has_perm('book.view_%s' % kind[:-1]):
+        raise PermissionDenied
+    since = request.GET.get('since')
+    if since is not None:
+        since = int(since) if since.isdigit() else parse_datetime(since)
+        if since is None:
+            return HttpResponseBadRequest('since must be the last exported id or an ISO 8601 timestamp.')
+    content_type = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}[fmt]
+    filename = '%s.%s' % (kind, fmt)
+    if gz:
+        content_type, filename = 'application/gzip', filename + '.gz'
+    response = StreamingHttpResponse(export(kind, fmt, since=since, compress=bool(gz)),
+                                     content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+class CatalogImport(PermissionRequiredMixin, FormView):
+    template_name = 'book/import_form.html'
+    form_class = CatalogImportForm
+    permission_required = 'book.add_book'
+    raise_exception = True
+
+    def form_valid(self, form):
+        stats = import_catalog(form.cleaned_data['file'], form.cleaned_data['format'],
+                               update_existing=form.cleaned_data['update_existing'])
+        return JsonResponse(stats.as_dict())
+
+
+@staff_member_required
+def perf_stats(request):
+    perf.registry.flush()
+    return JsonResponse(perf.summarize(perf.load()))
+
+
+def autocomplete(request, kind):
+    model = {'authors': Author, 'publishers': Publisher}[kind]
+    results = [{'id': obj.pk, 'text': obj.name} for obj in complete(model, request.GET.get('q', ''))]
+    return JsonResponse({'results': results})
+
+
+class SearchView(TemplateView):
+    template_name = 'book/search.html'
+    paginate_by = 10
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404('Invalid page.')
+        # One row past the page tells us whether there is a next page, without a COUNT.
+        hits = search(query, limit=self.paginate_by + 1, offset=(page - 1) * self.paginate_by)
+        context.update(query=query, hits=hits[:self.paginate_by], page=page,
+                       has_next=len(hits) > self.paginate_by)
+        return context
+
+
+class BrowseView(CachedPageMixin, TemplateView):
+    template_name = 'book/browse.html'
+
+    def get_cache_keys(self):
+        return [model_key(Book), model_key(Publisher)]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        selected = facets.selection(self.request.GET)
+        counts = facets.counts(selected)
+        # (facet, selected value, [(value, books, query selecting it)], query without the facet)
+        context['facets'] = [
+            (facet, selected.get(facet),
+             [(value, books, urlencode(dict(selected, **{facet: value}))) for value, books in rows],
+             urlencode({other: value for other, value in selected.items() if other != facet}))
+            for facet, rows in counts.items()]
+        context.update(selected=selected, total=facets.total(selected, counts), facet_query=urlencode(selected))
+        return context
+
+
+class PublisherList(SortMixin, KeysetPaginationMixin, ConditionalGetMixin, CachedPageMixin, ListView):
+    queryset = Publisher.objects.for_list()
+    sort_orderings = {'popular': ('-book_count', 'name', 'pk')}
+    # The page shows book counts.
+    cache_related_models = (Book,)
+    last_modified_models = (Book,)
+    cache_varies_on_csrf = True
     paginate_by = 10
     template_name = 'book/publisher_list.html'
 
@@ -45,24 +148,51 @@ class PublisherDelete(DeleteView):
     model = Publisher
     fields = ['name']
 
+    def delete(self, request, *args, **kwargs):
+        # Large publishers are hidden now and deleted in batches by book.purge.
+        self.object = self.get_object()
+        request_deletion(self.object)
+        return redirect(self.get_success_url())
+
     def get_success_url(self):
         return reverse_lazy('books:publisher_list')
 
 
-class PublisherDetail(DetailView):
+def publisher_deletion_status(request, pk):
+    publisher = get_object_or_404(Publisher._base_manager.only('book_count', 'deletion_requested_at'), pk=pk)
+    return JsonResponse(deletion_status(publisher))
 
-    model = Publisher
+
+class PublisherDetail(ConditionalGetMixin, CachedPageMixin, DetailView):
+
+    queryset = Publisher.objects.for_detail()
+    # The page shows the publisher's book count.
+    cache_related_models = (Book,)
+    last_modified_models = (Book,)
+
+
+class BooksByPublisher(KeysetPaginationMixin, ConditionalGetMixin, CachedPageMixin, ListView):
+    cache_related_models = (Publisher,)
+    last_modified_models = (Publisher,)
+    paginate_by = 10
+    template_name = 'book/books_by_publisher.html'
+
+    def get_queryset(self):
+        if not hasattr(self, 'publisher'):
+            self.publisher = get_object_or_404(Publisher.objects.for_list(), pk=self.kwargs['pk'])
+        return Book.objects.for_publisher(self.publisher)
 
     def get_context_data(self, **kwargs):
-        # Call the base implementation first to get a context
         context = super().get_context_data(**kwargs)
-        # Add in a QuerySet of all the Publisher
-        context['book_list'] = Publisher.objects.all()
+        context['publisher'] = self.publisher
         return context
 
 
-class BookList(ListView):
-    model = Book
+class BookList(FacetFilterMixin, KeysetPaginationMixin, ConditionalGetMixin, CachedPageMixin, ListView):
+    queryset = Book.objects.for_list()
+    cache_related_models = (Publisher, Author)
+    last_modified_models = (Publisher, Author)
+    cache_varies_on_csrf = True
     paginate_by = 10
     template_name = 'book/book_list.html'
 
@@ -71,7 +201,7 @@ class BookCreate(CreateView):
     template_name = 'book/book_form.html'
     queryset = Book.objects.all()
     model = Book
-    fields = ['title', 'authors', 'publisher', 'publication_date']
+    form_class = BookForm
 
     def get_success_url(self):
         return reverse_lazy('books:book_list')
@@ -81,7 +211,7 @@ class BookUpdate(UpdateView):
     template_name = 'book/book_update_form.html'
     queryset = Book.objects.all()
     model = Book
-    fields = ['title', 'authors', 'publisher', 'publication_date']
+    form_class = BookForm
 
     def get_success_url(self):
         return reverse_lazy('books:book_list')
@@ -97,31 +227,41 @@ class BookDelete(DeleteView):
         return reverse_lazy('books:book_list')
 
 
-class BookDetail(DetailView):
-    queryset = Book.objects.all()
+class BookDetail(AccessTrackingMixin, ConditionalGetMixin, CachedPageMixin, DetailView):
+    queryset = Book.objects.for_detail()
+    cache_related_models = (Publisher, Author)
+    last_modified_fields = ('updated_at', 'publisher__updated_at', 'authors__updated_at')
+    # Collaborators are other authors. Related books are covered by updated_at,
+    # which book.related bumps when the list or a listed book changes.
+    last_modified_models = (Author,)
 
-    def get_object(self):
-        obj = super().get_object()
-        # Record the last accessed date
-        obj.last_accessed = timezone.now()
-        obj.save()
-        return obj
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Precomputed by book.related; two index range reads whatever the catalog size.
+        context['related_books'] = related.related_books(self.object)
+        context['collaborators'] = related.collaborators([author.pk for author in self.object.authors.all()])
+        return context
 
 
-class AuthorDetailView(DetailView):
+class AuthorDetailView(AccessTrackingMixin, ConditionalGetMixin, CachedPageMixin, DetailView):
 
-    queryset = Author.objects.all()
+    queryset = Author.objects.for_detail()
+    # The page shows the author's book count and their collaborators.
+    cache_related_models = (Book, Author)
+    last_modified_models = (Book, Author)
 
-    def get_object(self):
-        obj = super().get_object()
-        # Record the last accessed date
-        obj.last_accessed = timezone.now()
-        obj.save()
-        return obj
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['collaborators'] = related.collaborators([self.object.pk])
+        return context
 
 
-class AuthorList(ListView):
-    model = Author
+class AuthorList(SortMixin, KeysetPaginationMixin, ConditionalGetMixin, CachedPageMixin, ListView):
+    queryset = Author.objects.for_list()
+    sort_orderings = {'popular': ('-book_count', 'name', 'pk')}
+    cache_related_models = (Book,)
+    last_modified_models = (Book,)
+    cache_varies_on_csrf = True
     paginate_by = 10
     template_name = 'book/author_list.html'
 
@@ -0,0 +1,54 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    """
+    A select that renders only its selected options and loads the others from
+    the ``books:autocomplete`` endpoint as the user types, instead of one
+    ``<option>`` per row of the table.
+    """
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    class Media:
+        js = ('book/autocomplete.js',)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse('books:autocomplete', kwargs={'kind': self.kind})
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = {str(v) for v in value if str(v) not in field.empty_values}
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', field.empty_label or '', not selected, 0))
+        # Submitted values are raw POST data; ones that are not valid keys are
+        # left for the field to reject.
+        opts = field.queryset.model._meta
+        key = field.to_field_name or opts.pk.name
+        model_field = opts.get_field(key)
+        valid = set()
+        for v in selected:
+            try:
+                valid.add(model_field.to_python(v))
+            except ValidationError:
+                pass
+        if valid:
+            for obj in field.queryset.filter(**{'%s__in' % key: valid}):
+                options.append(self.create_option(
+                    name, field.prepare_value(obj), field.label_from_instance(obj), True, len(options)))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
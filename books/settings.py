@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,9 +24,10 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '=#m8^dsgvkx07rsx_sht3ia=pc54uh1kk0mdgd2gev+4q=i8e8'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Production sets DJANGO_DEBUG=0 and lists its host names in DJANGO_ALLOWED_HOSTS.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') != '0'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'book.perf.PerfMiddleware',
+    'book.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,11 +56,15 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'books.urls'
 
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ['books/templates'],
-        'APP_DIRS': True,
+        'DIRS': [os.path.join(BASE_DIR, 'books', 'templates')],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,6 +72,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Without DEBUG every template is parsed once per process and kept
+            # compiled; with it, edits show up on the next request.
+            'loaders': template_loaders if DEBUG else [('django.template.loaders.cached.Loader', template_loaders)],
         },
     },
 ]
@@ -78,9 +89,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep each worker's connection (and its book.sqlite pragmas) between requests.
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# book.sqlite applies its PRAGMAS to every new SQLite connection; see that
+# module. WAL lets list and detail pages read while a book is being saved.
+# Set BOOK_SQLITE_PRAGMAS to replace them, or to {} to keep SQLite's defaults.
+
+# List and detail pages read the catalog from these aliases, e.g. a copy of
+# db.sqlite3 or a Postgres standby added to DATABASES above. Clients stay on
+# the primary for a few seconds (BOOK_REPLICA_STICKY_SECONDS) after a write.
+
+DATABASE_ROUTERS = ['book.routers.CatalogRouter']
+
+BOOK_READ_REPLICAS = []
+
+BOOK_REPLICA_STICKY_SECONDS = 15
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Shared by every process on the host: manage.py runworker tasks invalidate
+# pages that the web processes cached, which a per-process backend such as
+# LocMemCache would keep serving until they expire. Several hosts need a
+# networked backend (Memcached, Redis) instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Seconds a rendered catalog page is kept; changes invalidate it sooner.
+
+BOOK_PAGE_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -119,3 +168,60 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# collectstatic writes content-hashed copies of every static file here, with
+# .gz/.br siblings, and book.staticfiles.serve hands them out with far-future
+# cache headers. Bootstrap and jQuery are vendored under book/static/book/vendor.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STATICFILES_STORAGE = 'book.staticfiles.CompressedManifestStaticFilesStorage'
+
+# Brotli quality (0-11) for the .br siblings. 11 is the smallest and by far the
+# slowest to write, which only collectstatic pays for.
+BOOK_STATIC_BROTLI_QUALITY = 11
+
+# Uploaded headshots and their generated derivatives; served by Django only
+# with DEBUG on (see books/urls.py), by the web server otherwise.
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+MEDIA_URL = '/media/'
+
+
+# Detail-page hits are buffered in memory and written back at most this often (seconds).
+
+BOOK_ACCESS_FLUSH_INTERVAL = 10
+
+# Square headshot derivatives (pixels).
+
+BOOK_HEADSHOT_SIZES = (64, 256)
+
+# Background tasks (book.queue): worker processes started by runworker, how often
+# (seconds) an idle worker looks for due tasks, the delay before the first retry
+# of a failed task (doubling with every attempt), how long a task may run before
+# its worker is presumed dead, and how many days finished tasks are kept.
+
+BOOK_TASK_WORKERS = 2
+
+BOOK_TASK_POLL_INTERVAL = 1.0
+
+BOOK_TASK_RETRY_DELAY = 10
+
+BOOK_TASK_STALE_AFTER = 3600
+
+BOOK_TASK_KEEP_DAYS = 7
+
+# Publishers with more books than this are deleted in the background, this many
+# books per transaction, pausing this long (seconds) between batches.
+
+BOOK_PURGE_BATCH_SIZE = 500
+
+BOOK_PURGE_PAUSE = 0.05
+
+# Per-view latency histograms: where each process writes them, how often (seconds),
+# and the wall time (ms) above which a request's SQL is logged (None to disable).
+
+BOOK_PERF_STATS_DIR = os.path.join(tempfile.gettempdir(), 'books-perf')
+
+BOOK_PERF_FLUSH_INTERVAL = 30
+
+BOOK_PERF_SLOW_REQUEST_MS = None
@@ -1,9 +1,15 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+import book.staticfiles
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), book.staticfiles.serve, name='static'),
     path('', include('book.urls')),
-
-
 ]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
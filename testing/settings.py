@@ -0,0 +1,27 @@
+"""
+Settings for the test suite, used by pytest (see pytest.ini) and by
+``manage.py test --settings=testing.settings``.
+"""
+from books.settings import *  # noqa: F401,F403
+
+# The production hasher is slow on purpose; tests create and log in users all the time.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# The static files tests check that .br siblings are written and served, not how small they are.
+BOOK_STATIC_BROTLI_QUALITY = 5
+
+# The test database stays in memory, so every process has its own: each
+# pytest-xdist worker (-n) and each manage.py test --parallel worker, which
+# gets a copy when it is forked. It must not be a file: book.queue.work closes
+# connections between tasks, which only an in-memory database survives inside
+# a test's transaction.
+DATABASES['default']['TEST'] = {'NAME': ':memory:'}
+
+# Tests clear the cache as they go; with the shared file cache, parallel
+# workers would clear each other's. book.test.test_cache covers sharing.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'books',
+    }
+}